@@ -2,10 +2,20 @@
 Flask API服务器 - 为前端提供数据接口
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from data_processor import DataProcessor
+from event_stream import SnapshotEventStream
+from periods import OFFSET_EXAMPLES, PERIOD_EXAMPLES, PeriodError, parse_offset, parse_period
+from pivot import DIMENSIONS, MEASURES, TIME_DIMENSIONS, PivotError, parse_output, parse_pivot
+from metrics import (HTTP_REQUEST_DURATION, HTTP_REQUESTS, REGISTRY, begin_request_stages,
+                     format_server_timing, stage_timer)
+from profiling import MAX_REPORT_LIMIT, REPORT_SORT_KEYS, RequestProfiler
+from query_executor import QueryExecutor, QueryTimeout
+from warmup import WarmupCache
 import sys
+import threading
+import time
 from pathlib import Path
 import os
 
@@ -22,15 +32,200 @@ app = Flask(
 )
 CORS(app)  # 允许跨域请求，支持前端开发服务器访问
 
-# 初始化数据处理器
-processor = DataProcessor()
 
-# 允许的 period 取值（函数级中文注释）：
-# - day: 当日
-# - last7d: 近7天
-# - last30d: 近30天
-# 统一在路由层做白名单校验，避免传入非法值导致后续处理异常。
-ALLOWED_PERIODS = {"day", "last7d", "last30d"}
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON 序列化计入 serialize 阶段耗时"""
+
+    def dumps(self, obj, **kwargs):
+        with stage_timer('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+app.json = TimedJSONProvider(app)
+
+class LazyProcessor:
+    """
+    DataProcessor 的延迟构建代理
+
+    说明（函数级中文注释）：
+    - 首次访问属性时才导入 data_processor（pandas/numpy 等重量级依赖）并构建实例；
+    - 导入 api_server（测试脚本、工具、未预加载的工作进程）不再承担数据处理依赖的加载开销，
+      健康检查等不涉及数据的接口在依赖加载完成前即可响应；
+    - 属性读写均转发到真实实例，对路由与其他模块透明。
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def get(self):
+        """获取（必要时构建）真实的 DataProcessor 实例"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._factory()
+                    object.__setattr__(self, '_instance', instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get(), name, value)
+
+
+def _create_processor():
+    from data_processor import DataProcessor
+    return DataProcessor()
+
+
+# 初始化数据处理器（延迟构建，首次使用时加载）
+processor = LazyProcessor(_create_processor)
+
+# 查询执行器（函数级中文注释）：
+# - 查询放入分通道的有界线程池执行：heavy=全表筛选聚合类，light=日索引命中的轻量查询；
+# - 每个请求有截止时间，超时返回 503，避免慢查询无限期占用请求线程；
+# - 通道在途任务已满或线程被超时任务占满时，新请求立即返回 503（QueryRejected 为 QueryTimeout 子类）；
+# - 并发上限、排队上限与超时通过环境变量 QUERY_HEAVY_CONCURRENCY / QUERY_LIGHT_CONCURRENCY /
+#   QUERY_HEAVY_QUEUE / QUERY_LIGHT_QUEUE / QUERY_TIMEOUT_SECONDS 配置。
+query_executor = QueryExecutor.from_env()
+
+# 数据更新推送（函数级中文注释）：
+# - 前端通过 /api/stream 订阅快照版本变化，替代定时轮询；
+# - 连接时长与并发订阅数通过环境变量 SSE_STREAM_SECONDS / SSE_MAX_CLIENTS 配置；
+# - 推送的默认KPI在 heavy 通道中计算（受并发上限与截止时间约束），订阅连接只读取已保存的结果。
+event_stream = SnapshotEventStream.from_env(
+    processor, runner=lambda fn, *args: query_executor.run('heavy', fn, *args))
+
+# 按请求性能剖析（函数级中文注释）：
+# - 默认关闭，PROFILING_ENABLED=1 开启后，携带 X-Profile: 1（或 ?profile=1）的请求会采集 cProfile；
+# - 结果保存到 PROFILING_DIR（默认 data/profiles），通过 /api/profiles 下载。
+request_profiler = RequestProfiler.from_env(Path(__file__).resolve().parent.parent)
+
+# 启动预热（函数级中文注释）：
+# - 后台线程映射快照并预计算看板默认面板（无筛选、最新日期、两种数据口径）的响应，不阻塞 /api/health；
+# - 预热在每个工作进程处理第一个请求时启动（生产启动器在派生后立即启动），就绪状态通过 /api/health 报告；
+# - 通过环境变量 WARMUP_ENABLED=0 关闭。
+warmup_cache = WarmupCache.from_env(processor)
+
+
+def start_warmup():
+    """启动后台预热，完成后同时预计算 SSE 推送的默认KPI"""
+    return warmup_cache.start(after=event_stream.default_payload)
+
+
+def run_query(lane, fn, *args, **kwargs):
+    """
+    在查询执行器中运行 DataProcessor 方法
+
+    说明：
+    - 客户端可通过请求头 X-Request-Timeout（秒）缩短本次请求的截止时间，但不能超过服务端配置；
+    - 超时抛出 QueryTimeout，由路由转换为 503 响应。
+    """
+    # 默认面板请求直接返回预热结果（快照版本未变时）
+    hit, result = warmup_cache.get(fn, args, kwargs)
+    if hit:
+        return result
+
+    timeout = None
+    header = request.headers.get('X-Request-Timeout')
+    if header:
+        try:
+            timeout = float(header)
+        except ValueError:
+            timeout = None
+    return query_executor.run(lane, request_profiler.call, fn, *args, timeout=timeout, **kwargs)
+
+
+def timeout_response(error):
+    """将查询超时转换为 503 响应，并提示客户端稍后重试"""
+    g.query_timed_out = True
+    response = jsonify({
+        'success': False,
+        'message': f'服务繁忙，{error}，请稍后重试',
+        'timeout': error.timeout
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '5'
+    return response
+
+
+@app.before_request
+def start_request_timer():
+    """
+    请求开始时的准备（函数级中文注释）：
+    - 记录开始时间，用于请求耗时指标与 Server-Timing 总耗时；
+    - /api/* 请求开启阶段耗时收集；请求要求剖析且已开启剖析功能时启动剖析会话。
+    """
+    g.request_start = time.perf_counter()
+    if warmup_cache.state == 'pending':
+        start_warmup()
+    if request.path.startswith('/api/'):
+        g.request_stages = begin_request_stages()
+        if request_profiler.requested(request.headers, request.args):
+            g.profiling = request_profiler.start()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    记录请求指标并附加 Server-Timing 响应头（函数级中文注释）：
+    - 路由标签使用 URL 规则（如 /api/kpi-windows），未匹配的路径统一记为 unmatched，避免标签基数膨胀；
+    - SSE 等流式响应的耗时只统计到响应头返回为止；
+    - Server-Timing 列出各阶段独占耗时（queue/load/filter/validation/aggregate/serialize 等）与总耗时，
+      浏览器开发者工具的 Timing 面板可直接查看；
+    - 剖析请求在响应头 X-Profile-Id 中返回剖析编号。
+    """
+    start = g.pop('request_start', None)
+    elapsed = time.perf_counter() - start if start is not None else None
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    if elapsed is not None:
+        HTTP_REQUEST_DURATION.observe(elapsed, route=route, method=request.method)
+
+    stages = g.pop('request_stages', None)
+    if stages is not None:
+        timing = format_server_timing(stages, total=elapsed)
+        if g.pop('profiling', False):
+            profile_id = request_profiler.finish(route, save=not g.get('query_timed_out', False))
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+                timing += f', profile;desc="{profile_id}"'
+        response.headers['Server-Timing'] = timing
+        response.headers['Timing-Allow-Origin'] = '*'
+    return response
+
+
+@app.teardown_request
+def release_profiler(error=None):
+    """请求异常终止（未经过 after_request）时结束剖析会话，释放剖析锁"""
+    if g.pop('profiling', False):
+        request_profiler.finish('aborted', save=False)
+
+
+def normalize_period(value):
+    """
+    解析并规范化 period 参数（函数级中文注释）：
+    - 支持 day / lastNd / mtd / qtd / ytd 及 {"start", "end"} 自定义区间（见 periods.py）；
+    - 统一在路由层校验，非法取值由调用方返回 400，避免传入后续处理；
+    - 返回规范化字符串（如 'last7d'、'2025-10-01~2025-10-31'），默认请求与预热项的参数保持一致。
+
+    Raises:
+        PeriodError: 参数不合法
+    """
+    return str(parse_period(value))
+
+
+def period_error_response(error):
+    """period 参数不合法时的 400 响应"""
+    return jsonify({
+        'success': False,
+        'message': f'参数错误: {error}',
+        'allowed': PERIOD_EXAMPLES
+    }), 400
 
 
 @app.route('/', methods=['GET'])
@@ -61,10 +256,16 @@ def root_index():
             'POST /api/refresh',
             'POST /api/kpi-windows',
             'POST /api/week-comparison',
+            'POST /api/period-comparison',
+            'POST /api/pivot',
+            'POST /api/leaderboard',
             'GET  /api/filter-options',
             'GET  /api/daily-report',
             'GET  /api/week-trend',
             'GET  /api/latest-date',
+            'GET  /api/stream',
+            'GET  /api/metrics',
+            'GET  /api/profiles',
             'GET  /api/health'
         ]
     })
@@ -77,10 +278,18 @@ def refresh_data():
     """
     try:
         processor.scan_and_process_new_files()
+        # 预计算新版本的默认KPI并通知订阅者；推送失败不影响刷新结果
+        try:
+            event_stream.publish()
+        except Exception as e:
+            print(f"⚠️  推送数据更新失败: {e}")
+        # 后台重新预热新版本的默认面板
+        warmup_cache.start()
         return jsonify({
             'success': True,
             'message': '数据刷新成功',
-            'latest_date': processor.get_latest_date()
+            'latest_date': processor.get_latest_date(),
+            'version': event_stream.current_version()
         })
     except Exception as e:
         return jsonify({
@@ -100,7 +309,7 @@ def get_daily_report():
     date = request.args.get('date', None)
 
     try:
-        report = processor.get_daily_report(date)
+        report = run_query('light', processor.get_daily_report, date)
 
         if report is None:
             return jsonify({
@@ -112,6 +321,8 @@ def get_daily_report():
             'success': True,
             'data': report
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -127,17 +338,35 @@ def get_week_trend():
     Query参数:
         weeks: 周数(默认1,可选1或3)
         end_date: 结束日期(可选,格式: YYYY-MM-DD)
+        period: 统计周期(可选，如 mtd / qtd / ytd / last90d；指定时忽略 weeks)
+        start, end: 自定义区间(可选,格式: YYYY-MM-DD；end 缺省为 end_date 或最新日期)
     """
     weeks = int(request.args.get('weeks', 1))
     end_date = request.args.get('end_date', None)
+    period = request.args.get('period', None)
+    if request.args.get('start'):
+        period = {'start': request.args['start'], 'end': request.args.get('end')}
+
+    # 仅在指定统计周期时传入 period，默认请求参数与预热项保持一致
+    kwargs = {'end_date': end_date, 'weeks': weeks}
+    if period is not None:
+        try:
+            kwargs['period'] = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
 
     try:
-        trend = processor.get_week_trend(end_date=end_date, weeks=weeks)
+        trend = run_query('light', processor.get_week_trend, **kwargs)
 
         return jsonify({
             'success': True,
             'data': trend
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -151,11 +380,13 @@ def get_latest_date():
     获取数据中的最新日期
     """
     try:
-        latest = processor.get_latest_date()
+        latest = run_query('light', processor.get_latest_date)
         return jsonify({
             'success': True,
             'latest_date': latest
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -163,13 +394,136 @@ def get_latest_date():
         }), 500
 
 
+@app.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """
+    订阅数据更新（Server-Sent Events）
+
+    说明：
+    - 连接后立即推送当前快照版本（若与 Last-Event-ID 相同则不推送），此后每当数据刷新生成
+      新快照时推送 snapshot 事件：{version, latest_date, kpi: {exclude_correction, include_correction}}；
+    - 事件中的 kpi 为默认筛选条件下的结果，客户端无筛选时可直接使用，有筛选时再按需拉取；
+    - 连接到期后浏览器按 retry 间隔自动重连；订阅数超过上限时返回 503。
+    """
+    if not event_stream.try_acquire():
+        response = jsonify({
+            'success': False,
+            'message': '订阅连接数已达上限，请稍后重试'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = Response(
+        stream_with_context(event_stream.events(last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # 关闭反向代理（如 Nginx）缓冲，确保事件即时送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    # 连接关闭（正常结束或客户端断开）时释放订阅名额
+    response.call_on_close(event_stream.release)
+    return response
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    运行指标（Prometheus 文本格式）
+
+    包含：各路由请求数与耗时直方图、数据处理阶段耗时（load/csv_parse/scope_filter/filter/
+    validation/aggregate/serialize）、缓存命中、快照加载耗时、数据集行数、进程常驻内存。
+    多进程部署时返回处理本次请求的工作进程的指标（样本中的 pid 区分进程）。
+    """
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """
+    列出已保存的请求剖析结果（需开启 PROFILING_ENABLED，并在设置 PROFILING_TOKEN 时携带 X-Profile-Token）
+    """
+    if not request_profiler.enabled:
+        return jsonify({'success': False, 'message': '性能剖析未开启'}), 404
+    if request_profiler.token and request.headers.get('X-Profile-Token') != request_profiler.token:
+        return jsonify({'success': False, 'message': '无权访问剖析结果'}), 403
+    return jsonify({'success': True, 'data': request_profiler.list_profiles()})
+
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """
+    下载剖析结果
+
+    Query参数:
+        format: prof（默认，pstats 二进制，可用 snakeviz 等工具打开）| text（按累计耗时排序的文本报告）
+        sort: 文本报告排序字段（默认 cumulative，可选值见 profiling.REPORT_SORT_KEYS）
+        limit: 文本报告行数（默认 50，1~1000）
+
+    参数不合法时返回 400。
+    """
+    if not request_profiler.enabled:
+        return jsonify({'success': False, 'message': '性能剖析未开启'}), 404
+    if request_profiler.token and request.headers.get('X-Profile-Token') != request_profiler.token:
+        return jsonify({'success': False, 'message': '无权访问剖析结果'}), 403
+    path = request_profiler.profile_path(profile_id)
+    if path is None:
+        return jsonify({'success': False, 'message': '剖析结果不存在'}), 404
+
+    text = request.args.get('format') == 'text'
+    sort = request.args.get('sort', 'cumulative')
+    limit = request.args.get('limit', 50)
+    if text:
+        if sort not in REPORT_SORT_KEYS:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: 不支持的排序字段 {sort}',
+                'allowed': list(REPORT_SORT_KEYS)
+            }), 400
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = None
+        if limit is None or not 1 <= limit <= MAX_REPORT_LIMIT:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: limit 需为 1~{MAX_REPORT_LIMIT} 之间的整数'
+            }), 400
+
+    try:
+        if text:
+            report = request_profiler.text_report(path, sort=sort, limit=limit)
+            return Response(report, content_type='text/plain; charset=utf-8')
+        return send_file(path, mimetype='application/octet-stream',
+                         as_attachment=True, download_name=path.name)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'读取剖析结果失败: {str(e)}'
+        }), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """健康检查"""
-    return jsonify({
+    """
+    健康检查
+
+    说明：
+    - 始终立即返回（预热在后台进行），ready 表示首次预热是否已结束，warmup 为预热详情；
+    - Query参数 ready=1 时作为就绪探针使用：未就绪返回 503，便于滚动发布时等待预热完成再接入流量。
+    """
+    ready = warmup_cache.ready
+    response = jsonify({
         'status': 'healthy',
-        'message': 'API服务运行正常'
+        'message': 'API服务运行正常' if ready else 'API服务运行正常，正在预热',
+        'ready': ready,
+        'warmup': warmup_cache.status()
     })
+    if request.args.get('ready') in ('1', 'true') and not ready:
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+    return response
 
 
 @app.route('/api/filter-options', methods=['GET'])
@@ -178,11 +532,13 @@ def get_filter_options():
     获取所有筛选器的可选值
     """
     try:
-        options = processor.get_filter_options()
+        options = run_query('heavy', processor.get_filter_options)
         return jsonify({
             'success': True,
             'data': options
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -201,11 +557,13 @@ def get_policy_mapping():
     - 返回可能存在的姓名冲突信息，供前端提示。
     """
     try:
-        mapping = processor.get_policy_mapping()
+        mapping = run_query('heavy', processor.get_policy_mapping)
         return jsonify({
             'success': True,
             'data': mapping
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -239,7 +597,7 @@ def get_week_comparison():
         anchor_date = data.get('date', None)
         data_scope = data.get('data_scope', 'exclude_correction')  # 默认不含批改
 
-        result = processor.get_week_comparison(metric=metric, filters=filters, anchor_date=anchor_date, data_scope=data_scope)
+        result = run_query('heavy', processor.get_week_comparison, metric=metric, filters=filters, anchor_date=anchor_date, data_scope=data_scope)
 
         if result is None:
             return jsonify({
@@ -251,6 +609,8 @@ def get_week_comparison():
             'success': True,
             'data': result
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -258,6 +618,309 @@ def get_week_comparison():
         }), 500
 
 
+# 单次对比请求的对比周期数量上限
+MAX_COMPARE_PERIODS = 8
+
+# 排行榜可用维度与名次数量上限
+LEADERBOARD_DIMENSIONS = ('业务员', '团队', '三级机构')
+MAX_LEADERBOARD_SIZE = 200
+
+
+@app.route('/api/period-comparison', methods=['POST'])
+def get_period_comparison():
+    """
+    多周期对比（同比/环比）：基准周期与 K 个对比周期的逐日数据与合计
+
+    Request Body:
+    {
+        "metric": "premium",          // 或 "count"（保单件数，保费≥50）
+        "period": "last7d",           // 基准统计周期，写法同分布类接口（mtd / ytd / {"start", "end"} 等）
+        "compare": ["previous", "yoy"],  // 对比周期偏移：previous / -Nd / -Nw / -Nm / -Nq / -Ny / wow / mom / qoq / yoy
+        "align_weekday": true,        // 可选，按星期对齐（默认 true；去年同期取 364 天前，逐日星期一致）
+        "filters": {...},
+        "date": "YYYY-MM-DD",         // 可选，锚定日期
+        "data_scope": "exclude_correction" | "include_correction"
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        metric = data.get('metric', 'premium')
+        period = data.get('period', 'last7d')
+        compare = data.get('compare', ['previous'])
+        align_weekday = data.get('align_weekday', True)
+        filters = data.get('filters', {})
+        date = data.get('date', None)
+        data_scope = data.get('data_scope', 'exclude_correction')
+
+        # 参数校验
+        if metric not in ('premium', 'count'):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: metric 仅支持 premium/count'
+            }), 400
+        if not isinstance(filters, dict):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: filters 必须为对象(JSON字典)'
+            }), 400
+        if isinstance(compare, str):
+            compare = [compare]
+        if not isinstance(compare, list) or not 1 <= len(compare) <= MAX_COMPARE_PERIODS:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: compare 须为 1~{MAX_COMPARE_PERIODS} 个对比周期',
+                'allowed': OFFSET_EXAMPLES
+            }), 400
+        if not isinstance(align_weekday, bool):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: align_weekday 必须为布尔值(true/false)'
+            }), 400
+        try:
+            period = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
+        try:
+            compare = [str(parse_offset(value)) for value in compare]
+        except PeriodError as e:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: {e}',
+                'allowed': OFFSET_EXAMPLES
+            }), 400
+
+        result = run_query('heavy', processor.get_period_comparison, metric=metric, period=period, compare=compare,
+                           align_weekday=align_weekday, date=date, filters=filters, data_scope=data_scope)
+
+        if result is None:
+            return jsonify({
+                'success': False,
+                'message': '未找到数据'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # 锚定日与偏移组合超出可计算的日期范围
+        return jsonify({
+            'success': False,
+            'message': f'参数错误: {e}',
+            'allowed': OFFSET_EXAMPLES
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取多周期对比数据失败: {str(e)}'
+        }), 500
+
+
+@app.route('/api/leaderboard', methods=['POST'])
+def get_leaderboard():
+    """
+    排行榜：业务员 / 团队 / 三级机构的前 N 名或后 N 名（含对比期变化）
+
+    Request Body:
+    {
+        "dimension": "业务员",            // 业务员 / 团队 / 三级机构
+        "metric": "premium",              // 或 "count"（保单件数，保费≥50）
+        "rank_by": "value",               // value（本期数值）/ change（变化量）/ change_pct（变化率）
+        "n": 10,                          // 名次数量（1~200）
+        "direction": "top",               // top（前 N 名）/ bottom（后 N 名）
+        "period": "last7d",               // 本期统计周期（写法同分布类接口）
+        "compare": "previous",            // 对比周期偏移（previous / -Nd / wow / mom / yoy 等）
+        "align_weekday": true,
+        "filters": {...},
+        "date": "YYYY-MM-DD",
+        "data_scope": "exclude_correction" | "include_correction"
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        dimension = data.get('dimension', '业务员')
+        metric = data.get('metric', 'premium')
+        rank_by = data.get('rank_by', 'value')
+        n = data.get('n', 10)
+        direction = data.get('direction', 'top')
+        period = data.get('period', 'last7d')
+        compare = data.get('compare', 'previous')
+        align_weekday = data.get('align_weekday', True)
+        filters = data.get('filters', {})
+        date = data.get('date', None)
+        data_scope = data.get('data_scope', 'exclude_correction')
+
+        # 参数校验
+        if dimension not in LEADERBOARD_DIMENSIONS:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: dimension 仅支持 {"/".join(LEADERBOARD_DIMENSIONS)}'
+            }), 400
+        if metric not in ('premium', 'count'):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: metric 仅支持 premium/count'
+            }), 400
+        if rank_by not in ('value', 'change', 'change_pct'):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: rank_by 仅支持 value/change/change_pct'
+            }), 400
+        if direction not in ('top', 'bottom'):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: direction 仅支持 top/bottom'
+            }), 400
+        if isinstance(n, bool) or not isinstance(n, int) or not 1 <= n <= MAX_LEADERBOARD_SIZE:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: n 须为 1~{MAX_LEADERBOARD_SIZE} 的整数'
+            }), 400
+        if not isinstance(filters, dict):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: filters 必须为对象(JSON字典)'
+            }), 400
+        if not isinstance(align_weekday, bool):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: align_weekday 必须为布尔值(true/false)'
+            }), 400
+        try:
+            period = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
+        try:
+            compare = str(parse_offset(compare))
+        except PeriodError as e:
+            return jsonify({
+                'success': False,
+                'message': f'参数错误: {e}',
+                'allowed': OFFSET_EXAMPLES
+            }), 400
+
+        result = run_query('heavy', processor.get_leaderboard, dimension=dimension, metric=metric, rank_by=rank_by,
+                           n=n, direction=direction, period=period, compare=compare,
+                           align_weekday=align_weekday, date=date, filters=filters, data_scope=data_scope)
+
+        if result is None:
+            return jsonify({
+                'success': False,
+                'message': '未找到数据'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # 锚定日与偏移组合超出可计算的日期范围
+        return jsonify({
+            'success': False,
+            'message': f'参数错误: {e}',
+            'allowed': OFFSET_EXAMPLES
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取排行榜失败: {str(e)}'
+        }), 500
+
+
+def pivot_error_response(error):
+    """透视参数不合法时的 400 响应（附可用维度与度量）"""
+    return jsonify({
+        'success': False,
+        'message': f'参数错误: {error}',
+        'dimensions': [*DIMENSIONS, *TIME_DIMENSIONS],
+        'measures': list(MEASURES)
+    }), 400
+
+
+@app.route('/api/pivot', methods=['POST'])
+def get_pivot():
+    """
+    透视分析：任意行维度 × 列维度的分组汇总，支持下钻与流式输出
+
+    Request Body:
+    {
+        "rows": ["三级机构", "团队"],           // 行维度（数据列或 投保日期/投保周/投保月份）
+        "columns": ["是否续保"],               // 可选，列维度
+        "measures": ["premium", "policy_count"],  // premium / count / commission / policy_count（保费≥50 的件数）
+        "where": {"三级机构": "达州"},          // 可选，下钻条件：{维度: 取值或取值列表}，null 表示缺失值
+        "sort": "premium", "order": "desc",     // 可选，按某度量的行合计排序（或 "key" 按维度取值排序）
+        "period": "mtd",                        // 可选，统计周期（默认全部数据）
+        "date": "YYYY-MM-DD",                   // 可选，锚定日期（配合 period）
+        "filters": {...},
+        "data_scope": "exclude_correction" | "include_correction",
+        "format": "json" | "ndjson" | "csv",    // 可选，默认 json；ndjson/csv 为流式输出
+        "limit": 1000                           // 可选，返回行数（json 默认 1000，上限 PIVOT_MAX_ROWS）
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        filters = data.get('filters', {})
+        date = data.get('date', None)
+        data_scope = data.get('data_scope', 'exclude_correction')
+
+        # 参数校验
+        if not isinstance(filters, dict):
+            return jsonify({
+                'success': False,
+                'message': '参数错误: filters 必须为对象(JSON字典)'
+            }), 400
+        try:
+            spec = parse_pivot(data)
+            fmt, limit = parse_output(data)
+        except PivotError as e:
+            return pivot_error_response(e)
+        kwargs = {'period': None, 'date': date, 'filters': filters, 'data_scope': data_scope}
+        if data.get('period') is not None:
+            try:
+                kwargs['period'] = normalize_period(data['period'])
+            except PeriodError as e:
+                return period_error_response(e)
+
+        try:
+            table = run_query('heavy', processor.get_pivot, spec, **kwargs)
+        except PivotError as e:
+            return pivot_error_response(e)
+
+        if table is None:
+            return jsonify({
+                'success': False,
+                'message': '未找到数据'
+            }), 404
+
+        if fmt == 'json':
+            return jsonify({
+                'success': True,
+                'data': table.to_dict(limit)
+            })
+        # 大结果流式输出：逐块序列化，不拼接完整响应体（生成器只读取透视结果，无需保留请求上下文）
+        if fmt == 'ndjson':
+            response = Response(table.iter_ndjson(limit), mimetype='application/x-ndjson')
+        else:
+            response = Response(table.iter_csv(limit), content_type='text/csv; charset=utf-8')
+            response.headers['Content-Disposition'] = 'attachment; filename=pivot.csv'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取透视数据失败: {str(e)}'
+        }), 500
+
+
 @app.route('/api/kpi-windows', methods=['POST'])
 def get_kpi_windows():
     """
@@ -278,7 +941,8 @@ def get_kpi_windows():
                 "吨位": "xxx"
             },
             "date": "YYYY-MM-DD",  // 可选，指定日期
-            "data_scope": "exclude_correction" | "include_correction"  // 可选，数据口径，默认不含批改
+            "data_scope": "exclude_correction" | "include_correction",  // 可选，数据口径，默认不含批改
+            "period": "mtd"  // 可选，追加一个统计周期（见 periods.py），各指标以周期标识为键返回该周期取值
         }
     """
     try:
@@ -287,7 +951,15 @@ def get_kpi_windows():
         date = data.get('date', None)
         data_scope = data.get('data_scope', 'exclude_correction')  # 默认不含批改
 
-        result = processor.get_kpi_windows(date=date, filters=filters, data_scope=data_scope)
+        # 仅在指定统计周期时传入 period，默认请求参数与预热项保持一致
+        kwargs = {'date': date, 'filters': filters, 'data_scope': data_scope}
+        if data.get('period') is not None:
+            try:
+                kwargs['period'] = normalize_period(data['period'])
+            except PeriodError as e:
+                return period_error_response(e)
+
+        result = run_query('heavy', processor.get_kpi_windows, **kwargs)
 
         if result is None:
             return jsonify({
@@ -299,6 +971,11 @@ def get_kpi_windows():
             'success': True,
             'data': result
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -320,7 +997,7 @@ def get_staff_performance_distribution():
 
     Request Body:
         {
-            "period": "day",        // 时间段: day(当日), last7d(近7天), last30d(近30天)
+            "period": "day",        // 统计周期: day / last7d / last30d / lastNd / mtd / qtd / ytd / {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}
             "filters": {
                 "三级机构": "xxx",
                 "团队": "xxx",
@@ -357,13 +1034,13 @@ def get_staff_performance_distribution():
     """
     try:
         data = request.get_json() or {}
-        period = data.get('period', 'day')  # 可选值: day / last7d / last30d
+        period = data.get('period', 'day')  # 可选值见 periods.py
         filters = data.get('filters', {})
         date = data.get('date', None)
         data_scope = data.get('data_scope', 'exclude_correction')  # 默认不含批改
 
         # 参数校验与错误返回说明（函数级中文注释）：
-        # - period 必须为字符串，且在 ALLOWED_PERIODS 白名单中；否则返回 400。
+        # - period 须为 periods.py 支持的写法；否则返回 400。
         # - filters 必须为字典；否则返回 400。
         # 目的：在路由层尽早拦截无效入参，减少后端处理与 IDE 报错来源。
 
@@ -374,24 +1051,13 @@ def get_staff_performance_distribution():
                 'message': '参数错误: filters 必须为对象(JSON字典)'
             }), 400
 
-        # 校验 period 类型
-        if not isinstance(period, str):
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 必须为字符串',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
-
-        # 归一化 period 并做白名单校验
-        period = period.strip().lower()
-        if period not in ALLOWED_PERIODS:
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 仅支持 day/last7d/last30d',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
+        # 解析并规范化 period（非法取值返回 400）
+        try:
+            period = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
 
-        result = processor.get_staff_performance_distribution(period=period, date=date, filters=filters, data_scope=data_scope)
+        result = run_query('heavy', processor.get_staff_performance_distribution, period=period, date=date, filters=filters, data_scope=data_scope)
 
         if result is None:
             return jsonify({
@@ -403,6 +1069,11 @@ def get_staff_performance_distribution():
             'success': True,
             'data': result
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -417,7 +1088,7 @@ def get_insurance_type_distribution():
 
     Request Body:
         {
-            "period": "day",        // 时间段: day(当日), last7d(近7天), last30d(近30天)
+            "period": "day",        // 统计周期: day / last7d / last30d / lastNd / mtd / qtd / ytd / {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}
             "filters": {
                 "三级机构": "xxx",
                 "团队": "xxx",
@@ -461,22 +1132,12 @@ def get_insurance_type_distribution():
                 'message': '参数错误: filters 必须为对象(JSON字典)'
             }), 400
 
-        if not isinstance(period, str):
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 必须为字符串',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
+        try:
+            period = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
 
-        period = period.strip().lower()
-        if period not in ALLOWED_PERIODS:
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 仅支持 day/last7d/last30d',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
-
-        result = processor.get_insurance_type_distribution(period=period, date=date, filters=filters, data_scope=data_scope)
+        result = run_query('heavy', processor.get_insurance_type_distribution, period=period, date=date, filters=filters, data_scope=data_scope)
 
         if result is None:
             return jsonify({
@@ -488,6 +1149,11 @@ def get_insurance_type_distribution():
             'success': True,
             'data': result
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -510,7 +1176,7 @@ def get_premium_range_distribution():
 
     Request Body:
         {
-            "period": "day",        // 时间段: day(当日), last7d(近7天), last30d(近30天)
+            "period": "day",        // 统计周期: day / last7d / last30d / lastNd / mtd / qtd / ytd / {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}
             "filters": {
                 "三级机构": "xxx",
                 "团队": "xxx",
@@ -560,22 +1226,12 @@ def get_premium_range_distribution():
                 'message': '参数错误: filters 必须为对象(JSON字典)'
             }), 400
 
-        if not isinstance(period, str):
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 必须为字符串',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
-
-        period = period.strip().lower()
-        if period not in ALLOWED_PERIODS:
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 仅支持 day/last7d/last30d',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
+        try:
+            period = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
 
-        result = processor.get_premium_range_distribution(period=period, date=date, filters=filters, data_scope=data_scope)
+        result = run_query('heavy', processor.get_premium_range_distribution, period=period, date=date, filters=filters, data_scope=data_scope)
 
         if result is None:
             return jsonify({
@@ -587,6 +1243,11 @@ def get_premium_range_distribution():
             'success': True,
             'data': result
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -601,7 +1262,7 @@ def get_renewal_type_distribution():
 
     Request Body:
         {
-            "period": "day",        // 时间段: day(当日), last7d(近7天), last30d(近30天)
+            "period": "day",        // 统计周期: day / last7d / last30d / lastNd / mtd / qtd / ytd / {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}
             "filters": {
                 "三级机构": "xxx",
                 "团队": "xxx",
@@ -652,22 +1313,12 @@ def get_renewal_type_distribution():
                 'message': '参数错误: filters 必须为对象(JSON字典)'
             }), 400
 
-        if not isinstance(period, str):
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 必须为字符串',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
-
-        period = period.strip().lower()
-        if period not in ALLOWED_PERIODS:
-            return jsonify({
-                'success': False,
-                'message': '参数错误: period 仅支持 day/last7d/last30d',
-                'allowed': sorted(list(ALLOWED_PERIODS))
-            }), 400
+        try:
+            period = normalize_period(period)
+        except PeriodError as e:
+            return period_error_response(e)
 
-        result = processor.get_renewal_type_distribution(period=period, date=date, filters=filters, data_scope=data_scope)
+        result = run_query('heavy', processor.get_renewal_type_distribution, period=period, date=date, filters=filters, data_scope=data_scope)
 
         if result is None:
             return jsonify({
@@ -679,6 +1330,11 @@ def get_renewal_type_distribution():
             'success': True,
             'data': result
         })
+    except QueryTimeout as e:
+        return timeout_response(e)
+    except PeriodError as e:
+        # end 缺省的自定义区间在按锚定日计算时才能校验跨度
+        return period_error_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -707,6 +1363,9 @@ if __name__ == '__main__':
     print("  POST /api/refresh                      - 刷新数据(处理新Excel)")
     print("  POST /api/kpi-windows                  - 获取KPI三口径数据")
     print("  POST /api/week-comparison              - 获取周对比图表数据")
+    print("  POST /api/period-comparison            - 多周期对比(同比/环比)")
+    print("  POST /api/pivot                        - 透视分析(任意维度分组汇总)")
+    print("  POST /api/leaderboard                  - 业务员/团队/机构排行榜")
     print("  POST /api/insurance-type-distribution  - 获取险别组合占比")
     print("  POST /api/premium-range-distribution   - 获取业务员保费区间占比")
     print("  POST /api/renewal-type-distribution    - 获取新转续占比")
@@ -714,7 +1373,10 @@ if __name__ == '__main__':
     print("  GET  /api/daily-report                 - 获取日报")
     print("  GET  /api/week-trend                   - 获取周趋势")
     print("  GET  /api/latest-date                  - 获取最新日期")
-    print("  GET  /api/health                       - 健康检查")
+    print("  GET  /api/stream                       - 订阅数据更新(SSE)")
+    print("  GET  /api/metrics                      - 运行指标(Prometheus)")
+    print("  GET  /api/profiles                     - 请求剖析结果(需开启)")
+    print("  GET  /api/health                       - 健康检查(含预热就绪状态)")
     print("\n" + "=" * 70)
     print("\n💡 开发提示:")
     print(f"  - 前端开发: 访问 {FRONTEND_URL}")
@@ -722,4 +1384,7 @@ if __name__ == '__main__':
     print("  - 数据目录: backend/车险日报/")
     print("\n" + "=" * 70 + "\n")
 
+    # 调试模式下由重载器子进程（实际处理请求的进程）启动预热
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup()
     app.run(host='0.0.0.0', port=PORT, debug=True)
@@ -0,0 +1,125 @@
+"""
+按日聚合索引 - 以列式快照为基础，按 (日期, 维度列) 预先汇总金额/件数
+
+设计说明：
+- 占比/分布类查询只需要“日期 + 若干低基数文本列 + 金额/件数求和”，逐行扫描的成本随区间长度线性增长；
+  按日聚合后每个 (日, 维度取值组合) 只保留一行，近一年与当日的查询扫描的是同一张小表；
+- 聚合表（cube）保留与原始数据相同的列名：日期列为规范化到天的 '投保确认时间'，维度列保持 category，
+  金额/件数列为组内求和。数据口径过滤、筛选条件、锚定日与区间掩码、分组求和的既有代码可原样作用于聚合表，
+  结果与逐行计算一致（求和满足结合律；浮点求和顺序不同可能带来末位舍入差异）；
+- 口径列（批单类型、签单/批改标识）始终作为维度保留，两种数据口径共用同一张聚合表；
+- 维度缺失值（NaN）作为独立分组保留，与逐行数据的过滤/分组语义一致；
+- 含保费列时额外汇总派生度量“保单件数”（保费≥50 的记录数，与周对比件数口径一致），
+  逐行数据经 with_policy_count 补充同名列后，两种来源可按同一列求和；
+- 聚合表按需构建并按维度组合缓存，随快照版本失效；缓存数量有上限（LRU）。
+
+环境变量：
+    DATA_DAILY_AGGREGATES   是否启用按日聚合索引，默认 1（0 关闭，查询回退为逐行计算）
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import record_cache
+from schema import DATE_COLUMN
+
+
+# 可求和的度量列
+MEASURE_COLUMNS = ('签单/批改保费', '签单数量', '手续费含税')
+
+# 派生度量：保费≥50 的记录数（保单件数口径）
+POLICY_COUNT_COLUMN = '保单件数'
+POLICY_COUNT_MIN_PREMIUM = 50
+
+# 始终保留的口径列（数据口径过滤所需）
+SCOPE_COLUMNS = ('批单类型', '签单/批改标识')
+
+# 每个快照版本缓存的聚合表数量上限
+MAX_CUBES = 32
+
+
+def with_policy_count(df):
+    """
+    确保数据包含保单件数列：聚合表已预先汇总；逐行数据按 保费≥50 记 1 条
+
+    Returns:
+        DataFrame: 已含该列时返回原对象，否则返回追加该列的新对象
+    """
+    if POLICY_COUNT_COLUMN in df.columns:
+        return df
+    return df.assign(**{POLICY_COUNT_COLUMN: (df['签单/批改保费'] >= POLICY_COUNT_MIN_PREMIUM).astype('int64')})
+
+
+def aggregates_enabled():
+    """是否启用按日聚合索引（环境变量 DATA_DAILY_AGGREGATES，默认启用）"""
+    return os.environ.get('DATA_DAILY_AGGREGATES', '1').lower() not in ('0', 'false', 'no')
+
+
+class DailyAggregates:
+    """
+    单个快照版本的按日聚合索引
+
+    Args:
+        snapshot: Snapshot 实例
+        max_cubes: 缓存的聚合表数量上限
+    """
+
+    def __init__(self, snapshot, max_cubes=MAX_CUBES):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        self.max_cubes = max_cubes
+        self._cubes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _layout(self, columns):
+        """按快照实际包含的列拆分为 (维度列, 度量列)"""
+        available = set(self.snapshot.columns)
+        wanted = [c for c in dict.fromkeys(columns) if c in available and c != DATE_COLUMN]
+        measures = tuple(c for c in wanted if c in MEASURE_COLUMNS)
+        dims = [c for c in wanted if c not in MEASURE_COLUMNS]
+        dims.extend(c for c in SCOPE_COLUMNS if c in available and c not in dims)
+        return tuple(dims), measures
+
+    def _build(self, dims, measures):
+        """由快照构建聚合表：按 (日, 维度列) 分组求和（含派生度量），按日期升序"""
+        frame = self.snapshot.to_frame(columns=[DATE_COLUMN, *dims, *measures])
+        frame = frame.assign(**{DATE_COLUMN: frame[DATE_COLUMN].dt.normalize()})
+        measures = list(measures)
+        if '签单/批改保费' in measures:
+            frame = with_policy_count(frame)
+            measures.append(POLICY_COUNT_COLUMN)
+        cube = frame.groupby([DATE_COLUMN, *dims], observed=True, dropna=False, sort=True)[measures].sum()
+        return cube.reset_index()
+
+    def frame(self, columns):
+        """
+        获取覆盖指定列的聚合表
+
+        Args:
+            columns: 查询所需的列（与逐行读取时的列投影相同）
+
+        Returns:
+            DataFrame | None: 聚合表；所需列中没有可求和的度量列时返回 None（调用方回退逐行读取）
+        """
+        dims, measures = self._layout(columns)
+        if not measures:
+            return None
+        key = (dims, measures)
+        with self._lock:
+            cube = self._cubes.get(key)
+            if cube is not None:
+                self._cubes.move_to_end(key)
+        record_cache('daily_aggregates', cube is not None)
+        if cube is not None:
+            return cube
+        # 构建在锁外进行：并发请求可能重复构建同一张表，结果相同，后写入者覆盖
+        cube = self._build(dims, measures)
+        with self._lock:
+            self._cubes[key] = cube
+            while len(self._cubes) > self.max_cubes:
+                self._cubes.popitem(last=False)
+        return cube
+
+    def __len__(self):
+        return len(self._cubes)
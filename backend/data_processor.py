@@ -2,24 +2,275 @@
 数据处理模块 - 负责Excel清洗、CSV合并和数据查询
 """
 
+import numpy as np
 import pandas as pd
 import json
 from pathlib import Path
 from datetime import datetime, timedelta
 import glob
+import time
+
+from daily_aggregates import POLICY_COUNT_COLUMN, DailyAggregates, aggregates_enabled, with_policy_count
+from date_parsing import parse_dates
+from metrics import (DATASET_ROWS, SNAPSHOT_BUILD_SECONDS, SNAPSHOT_LOAD_SECONDS,
+                     record_cache, timed_stage)
+from periods import MAX_ROLLING_DAYS, PeriodError, PeriodSpec, format_date_range, parse_offset, parse_period
+from pivot import build_pivot, parse_pivot
+from schema import align_categories, apply_schema, read_csv_dtypes
+from snapshot import SnapshotStore
 
 
 class DataProcessor:
     """数据处理器"""
 
-    def __init__(self, data_dir='data', staff_mapping_file='业务员机构团队归属.json'):
-        # 获取项目根目录(backend的上一级)
+    # 各查询所需的列（列投影）：CSV 回退路径只解析这些列，快照路径只映射这些列；
+    # 包含方法内按“列是否存在”分支判断的候选列，数据中不存在的列会被忽略
+    QUERY_COLUMNS = {
+        'daily_report': ('投保确认时间', '签单/批改保费', '签单数量', '手续费含税'),
+        'week_trend': ('投保确认时间', '签单/批改保费', '签单数量'),
+        'latest_date': ('投保确认时间',),
+        'filter_options': ('保单号', '是否续保', '是否新能源', '是否过户车', '是否异地车', '险种大类',
+                           '吨位分段', '客户类别3', '业务员'),
+        'policy_mapping': ('保单号', '业务员'),
+        'week_comparison': ('投保确认时间', '签单/批改保费', '业务员'),
+        'kpi_windows': ('投保确认时间', '签单/批改保费', '签单数量', '手续费含税', '终端来源', '是否新能源',
+                        '是否过户车', '险种代码', '险种名称', '是否异地车', '险别组合', '是否续保',
+                        '车险新业务分类', '保单号', '业务员', '团队', '三级机构'),
+        'staff_performance': ('投保确认时间', '签单/批改标识', '业务员', '签单/批改保费', '签单数量'),
+        'insurance_type': ('投保确认时间', '单套-险别', '签单数量', '签单/批改保费'),
+        'premium_range': ('投保确认时间', '业务员', '签单/批改保费'),
+        'renewal_type': ('投保确认时间', '是否续保', '车险新业务分类', '签单数量', '签单/批改保费'),
+        # 透视分析与排行榜的维度列按请求追加（见 get_pivot / get_leaderboard）
+        'pivot': ('投保确认时间', '签单/批改保费', '签单数量', '手续费含税'),
+        'leaderboard': ('投保确认时间', '签单/批改保费'),
+    }
+
+    # 数据口径过滤所需的列（_apply_data_scope_filter）
+    DATA_SCOPE_COLUMNS = {
+        'exclude_correction': ('批单类型',),
+    }
+
+    # 筛选条件所需的列（_apply_filters）；任一筛选条件存在时还需 '业务员'（业务员映射校验）
+    FILTER_COLUMNS = {
+        '保单号': ('保单号', '业务员'),
+        '业务员': ('业务员',),
+        '三级机构': ('业务员',),
+        '团队': ('业务员',),
+        '是否续保': ('是否续保', '车险新业务分类'),
+        '是否新能源': ('是否新能源',),
+        '是否过户车': ('是否过户车',),
+        '险种大类': ('险种大类',),
+        '吨位': ('吨位分段',),
+        'is_dianxiao': ('终端来源',),
+        '是否异地车': ('是否异地车',),
+        'business_type': ('客户类别3',),
+    }
+
+    def __init__(self, data_dir='data', staff_mapping_file='业务员机构团队归属.json', snapshot_dir='data/snapshot',
+                 merged_csv='车险清单_2025年10-11月_合并.csv'):
+        # 获取项目根目录(backend的上一级)；相对路径均以项目根目录为基准，也可传入绝对路径（如基准测试数据集）
         project_root = Path(__file__).parent.parent
 
         self.data_dir = project_root / data_dir
         self.staff_mapping_file = project_root / staff_mapping_file
-        self.merged_csv = project_root / '车险清单_2025年10-11月_合并.csv'
-        self.staff_mapping = self._load_staff_mapping()
+        self.merged_csv = project_root / merged_csv
+        # 业务员映射在首次使用时加载（构造处理器不读取任何数据文件）
+        self._staff_mapping = None
+
+        # 列式快照（只读 mmap，多进程共享页缓存）；首次查询时才映射
+        self.snapshot_store = SnapshotStore(project_root / snapshot_dir)
+        self._snapshot = None
+        # 按日聚合索引（随快照版本重建）
+        self._aggregates = None
+
+    @property
+    def staff_mapping(self):
+        """业务员机构团队映射（首次访问时从映射文件加载）"""
+        if self._staff_mapping is None:
+            self._staff_mapping = self._load_staff_mapping()
+        return self._staff_mapping
+
+    @staff_mapping.setter
+    def staff_mapping(self, value):
+        self._staff_mapping = value
+
+    def _current_snapshot(self):
+        """
+        获取与合并CSV一致的当前快照
+
+        说明：
+        - 每次调用读取 CURRENT 指针，若版本变化（其他进程刷新了数据）则重新映射；
+        - 快照签名与合并CSV不一致（例如CSV被手工替换）时视为不可用，调用方回退到CSV读取。
+
+        Returns:
+            Snapshot | None
+        """
+        version = self.snapshot_store.current_version()
+        if version is None:
+            return None
+        snapshot = self._snapshot
+        reused = snapshot is not None and snapshot.version == version
+        record_cache('snapshot', reused)
+        if not reused:
+            start = time.perf_counter()
+            try:
+                snapshot = self.snapshot_store.open(version)
+            except Exception as e:
+                print(f"警告: 快照加载失败，回退到CSV读取: {e}")
+                return None
+            SNAPSHOT_LOAD_SECONDS.set(time.perf_counter() - start)
+            DATASET_ROWS.set(snapshot.row_count)
+            self._snapshot = snapshot
+        if not snapshot.matches_source(self.merged_csv):
+            return None
+        return snapshot
+
+    def _query_columns(self, query, filters=None, data_scope=None):
+        """
+        计算查询所需的列：查询自身所需列 + 数据口径过滤列 + 当前筛选条件涉及的列
+
+        Args:
+            query: QUERY_COLUMNS 中的查询名
+            filters: 筛选条件字典
+            data_scope: 数据口径
+
+        Returns:
+            list[str]: 去重后的列名（保持声明顺序）
+        """
+        columns = list(self.QUERY_COLUMNS[query])
+        columns.extend(self.DATA_SCOPE_COLUMNS.get(data_scope, ()))
+        if filters:
+            columns.append('业务员')
+            for key in filters:
+                columns.extend(self.FILTER_COLUMNS.get(key, ()))
+        return list(dict.fromkeys(columns))
+
+    def current_snapshot_version(self):
+        """与合并CSV一致的当前快照版本号；快照不可用时返回 None"""
+        snapshot = self._current_snapshot()
+        return snapshot.version if snapshot is not None else None
+
+    @timed_stage('load')
+    def _load_dataframe(self, rows_between=None, columns=None):
+        """
+        读取合并数据：优先使用列式快照（零拷贝 mmap），不可用时回退到CSV解析
+
+        Args:
+            rows_between: 可选 (start, end) 日期闭区间；命中快照时通过日索引只取区间内的行
+            columns: 可选列投影（见 _query_columns）；默认读取全部列
+
+        Returns:
+            DataFrame: '投保确认时间' 列为 datetime 类型
+        """
+        snapshot = self._current_snapshot()
+        if snapshot is not None:
+            rows = snapshot.rows_between(*rows_between) if rows_between else None
+            return snapshot.to_frame(columns=columns, rows=rows)
+
+        df = self._read_merged_csv(columns=columns)
+        if rows_between:
+            start, end = (pd.Timestamp(d).normalize() for d in rows_between)
+            date_col = df['投保确认时间'].dt.normalize()
+            df = df[(date_col >= start) & (date_col <= end)]
+        return df
+
+    def _load_aggregated(self, query, filters=None, data_scope=None, rows_between=None, extra_columns=()):
+        """
+        读取按日聚合数据（见 daily_aggregates.py），不满足条件时回退为逐行读取
+
+        说明：
+        - 聚合表与逐行数据列名一致（日期规范化到天，金额/件数为组内求和），
+          调用方的口径过滤、筛选条件、区间掩码与分组求和无需区分两种来源；
+        - 保单号筛选依赖逐行数据（按首行业务员修正机构/团队），快照不可用或未启用聚合索引时均回退逐行读取。
+
+        Args:
+            query: QUERY_COLUMNS 中的查询名
+            filters: 筛选条件字典
+            data_scope: 数据口径
+            rows_between: 回退逐行读取时的日期区间（聚合表始终覆盖全部日期）
+            extra_columns: 查询自身所需列之外按请求追加的维度列（如透视分析的行/列维度）
+
+        Returns:
+            DataFrame
+        """
+        columns = list(dict.fromkeys([*self._query_columns(query, filters, data_scope), *extra_columns]))
+        if aggregates_enabled() and not (filters or {}).get('保单号'):
+            snapshot = self._current_snapshot()
+            if snapshot is not None:
+                index = self._aggregates
+                if index is None or index.version != snapshot.version:
+                    index = self._aggregates = DailyAggregates(snapshot)
+                cube = index.frame(columns)
+                if cube is not None:
+                    return cube
+        return self._load_dataframe(rows_between=rows_between, columns=columns)
+
+    @staticmethod
+    def _select_period(df, spec, date=None):
+        """
+        按统计周期截取数据
+
+        Args:
+            df: 已完成口径过滤与筛选的数据（逐行数据或聚合表）
+            spec: PeriodSpec
+            date: 锚定日期（默认为 df 中的最新日期）
+
+        Returns:
+            tuple | None: (period_data, start, end)；无法确定锚定日期时返回 None
+        """
+        anchor = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
+        if pd.isna(anchor):
+            return None
+        start, end = spec.resolve(anchor)
+        date_col = df['投保确认时间'].dt.normalize()
+        return df[(date_col >= start) & (date_col <= end)], start, end
+
+    @timed_stage('csv_parse')
+    def _read_merged_csv(self, columns=None):
+        """
+        解析合并CSV，按列类型声明（schema.py）压缩内存，并将 '投保确认时间' 转换为 datetime
+
+        Args:
+            columns: 只解析这些列（默认全部列）；CSV 中不存在的列会被忽略
+        """
+        usecols = None
+        if columns is not None:
+            wanted = set(columns) | {'投保确认时间'}
+            usecols = lambda name: name in wanted  # noqa: E731
+        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False, usecols=usecols,
+                         dtype=read_csv_dtypes(columns))
+        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        apply_schema(df)
+        DATASET_ROWS.set(len(df))
+        return df
+
+    def build_snapshot(self):
+        """
+        由合并CSV构建新的列式快照并切换为当前版本
+
+        Returns:
+            str | None: 新版本号；合并CSV不存在时返回 None
+        """
+        if not self.merged_csv.exists():
+            return None
+        df = self._read_merged_csv()
+        start = time.perf_counter()
+        version = self.snapshot_store.build(df, self.merged_csv)
+        SNAPSHOT_BUILD_SECONDS.set(time.perf_counter() - start)
+        print(f"  快照已生成: {version} ({len(df)} 行)")
+        return version
+
+    def ensure_snapshot(self):
+        """
+        确保存在与合并CSV一致的快照（生产启动器在派生工作进程前调用）
+
+        Returns:
+            str | None: 当前可用的快照版本号
+        """
+        snapshot = self._current_snapshot()
+        if snapshot is not None:
+            return snapshot.version
+        return self.build_snapshot()
 
     def _build_name_to_info(self):
         """
@@ -57,6 +308,7 @@ class DataProcessor:
             }
         return name_to_info, sorted(list(set(conflicts)))
 
+    @timed_stage('aggregate')
     def get_policy_mapping(self):
         """
         获取保单号→业务员→团队/机构映射信息
@@ -76,7 +328,7 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return {'policy_to_staff': {}, 'staff_to_info': {}, 'conflicts': []}
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
+        df = self._load_dataframe(columns=self._query_columns('policy_mapping'))
         # 仅保留有效列
         cols = df.columns
         if '保单号' not in cols or '业务员' not in cols:
@@ -137,11 +389,11 @@ class DataProcessor:
         # 1. 删除完全为空的行
         df = df.dropna(how='all')
 
-        # 2. 确保日期格式正确
+        # 2. 确保日期格式正确（多格式整列解析，兼容同一列混用 YYYY-MM-DD / YYYY/MM/DD / YYYYMMDD 等写法）
         date_columns = ['刷新时间', '投保确认时间', '保险起期']
         for col in date_columns:
             if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce')
+                df[col] = parse_dates(df[col])
 
         # 3. 数值类型转换
         numeric_columns = ['签单/批改保费', '签单数量', '手续费', '手续费含税', '增值税']
@@ -152,6 +404,9 @@ class DataProcessor:
         # 4. 填充缺失值
         df = df.fillna('')
 
+        # 5. 按列类型声明转换（低基数文本列转 category 等），降低入库合并时的内存占用
+        apply_schema(df)
+
         print(f"  数据清洗完成")
 
         return df
@@ -168,10 +423,12 @@ class DataProcessor:
         """
         if self.merged_csv.exists():
             print(f"读取现有数据: {self.merged_csv}")
-            existing_df = pd.read_csv(self.merged_csv, encoding='utf-8-sig')
+            existing_df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False,
+                                      dtype=read_csv_dtypes())
+            apply_schema(existing_df)
 
-            # 合并数据
-            merged_df = pd.concat([existing_df, new_df], ignore_index=True)
+            # 合并数据（先统一 category 列的类别集合，避免合并后退化为 object）
+            merged_df = pd.concat(align_categories([existing_df, new_df]), ignore_index=True)
 
             # 去重 - 根据保单号和投保确认时间（改用 duplicated 保留最后一条）
             # 函数级中文注释：
@@ -243,8 +500,12 @@ class DataProcessor:
             # 保存
             self.save_merged_data(final_df)
 
+            # 重建列式快照，其他工作进程在下次查询时自动切换到新版本
+            self.build_snapshot()
+
             print(f"数据更新完成!")
 
+    @timed_stage('aggregate')
     def get_daily_report(self, date=None):
         """
         获取日报数据
@@ -264,17 +525,18 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig')
-
-        # 确保日期格式
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
-
         # 如果未指定日期,使用最新日期
         if date is None:
-            date = df['投保确认时间'].max()
+            latest = self.get_latest_date()
+            if latest is None:
+                return None
+            date = pd.to_datetime(latest)
         else:
             date = pd.to_datetime(date)
 
+        # 仅读取当日数据（命中快照时通过日索引定位，无需扫描全表）
+        df = self._load_dataframe(rows_between=(date, date), columns=self._query_columns('daily_report'))
+
         # 筛选指定日期的数据（使用规范化日期避免类型不一致）
         # 函数级中文注释：
         # - 修复点：用 .dt.normalize() 与锚定日期的 normalize() 比较，避免 .dt.date 产生的 Python 对象类型与 NaT 混合导致的隐性错误。
@@ -297,42 +559,49 @@ class DataProcessor:
 
         return report
 
-    def get_week_trend(self, end_date=None, weeks=1):
+    @timed_stage('aggregate')
+    def get_week_trend(self, end_date=None, weeks=1, period=None):
         """
-        获取连续N周的趋势数据
+        获取连续N周（或指定统计周期）的逐日趋势数据
 
         Args:
             end_date: 结束日期(默认为最新日期)
             weeks: 周数(1=7天, 3=21天)
+            period: 可选统计周期（见 periods.py，如 mtd / ytd / last90d / {'start', 'end'}），指定时忽略 weeks
 
         Returns:
             [
                 {'date': '2025-10-30', 'weekday': '周三', 'premium': 125000},
                 ...
             ]
+
+        Raises:
+            PeriodError: period 不合法
         """
         if not self.merged_csv.exists():
             return []
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig')
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        spec = parse_period(period) if period is not None else PeriodSpec('rolling', days=weeks * 7)
 
         # 如果未指定日期,使用最新日期
         if end_date is None:
-            end_date = df['投保确认时间'].max()
+            latest = self.get_latest_date()
+            if latest is None:
+                return []
+            end_date = pd.to_datetime(latest)
         else:
             end_date = pd.to_datetime(end_date)
 
-        # 计算开始日期(连续N周)
-        days = weeks * 7 - 1
-        start_date = end_date - timedelta(days=days)
+        # 计算区间（连续N周即近 N*7 天）
+        start_norm, end_norm = spec.resolve(end_date)
+
+        # 优先读取按日聚合表（区间长度不影响扫描量）；回退逐行读取时仅读取区间内数据
+        df = self._load_aggregated('week_trend', rows_between=(start_norm, end_norm))
 
         # 筛选时间范围（规范化到日，避免 .dt.date 的dtype差异）
         # 函数级中文注释：
         # - 修复点：用 .dt.normalize() 进行日期区间筛选与分组，提升稳定性与向量化性能。
         date_col = df['投保确认时间'].dt.normalize()
-        start_norm = start_date.normalize()
-        end_norm = end_date.normalize()
         mask = (date_col >= start_norm) & (date_col <= end_norm)
         period_data = df[mask]
 
@@ -357,17 +626,24 @@ class DataProcessor:
 
         return trend_data
 
+    @timed_stage('aggregate')
     def get_latest_date(self):
         """获取数据中的最新日期"""
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        # 快照可用时直接读取日索引的最大日期
+        snapshot = self._current_snapshot()
+        if snapshot is not None:
+            latest = snapshot.latest_day()
+            return latest.strftime('%Y-%m-%d') if latest is not None else None
+
+        df = self._load_dataframe(columns=self._query_columns('latest_date'))
         latest = df['投保确认时间'].max()
 
         return latest.strftime('%Y-%m-%d') if pd.notna(latest) else None
 
+    @timed_stage('aggregate')
     def get_filter_options(self):
         """
         获取所有筛选器的可选值
@@ -384,7 +660,7 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return {}
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
+        df = self._load_dataframe(columns=self._query_columns('filter_options'))
 
         # 从映射文件中提取三级机构和团队
         institutions = set()
@@ -426,6 +702,7 @@ class DataProcessor:
             '业务员': sorted(df['业务员'].dropna().unique().tolist()) if '业务员' in df.columns else []
         }
 
+    @timed_stage('aggregate')
     def get_week_comparison(self, metric='premium', filters=None, anchor_date=None, data_scope='exclude_correction'):
         """
         获取3个7天周期对比数据
@@ -479,9 +756,8 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        # 读取数据
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        # 读取数据（优先按日聚合表）
+        df = self._load_aggregated('week_comparison', filters, data_scope)
 
         # 应用数据口径过滤
         df = self._apply_data_scope_filter(df, data_scope)
@@ -494,57 +770,19 @@ class DataProcessor:
         if pd.isna(latest_date):
             return None
 
-        # 计算3个周期的日期范围
-        periods = []
-        for i in range(3):
-            end_date = latest_date - timedelta(days=i*7)
-            start_date = end_date - timedelta(days=6)
-            periods.append({
-                'name': '',  # 暂时留空，后面根据数据填充
-                'start': start_date,
-                'end': end_date
-            })
+        # 3个周期：最近7天及其前移 7 / 14 天（对比引擎，逐日数据只分组一次）
+        base_start, base_end = PeriodSpec('rolling', days=7).resolve(latest_date)
+        offsets = [parse_offset('-7d'), parse_offset('-14d')]
+        windows = self._compare_windows(df, metric, base_start, base_end, offsets)
 
         # 构建X轴(从最近7天的第一天开始的星期序列)
         weekday_map = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
-        # 使用 pandas 的 dayofweek 保持与向量化索引一致
-        first_weekday = periods[0]['start'].dayofweek  # 最近7天的第一天是星期几(由anchor_date决定)
-        x_axis = []
-        for i in range(7):
-            x_axis.append(weekday_map[(first_weekday + i) % 7])
+        first_weekday = base_start.dayofweek  # 最近7天的第一天是星期几(由anchor_date决定)
+        x_axis = [weekday_map[(first_weekday + i) % 7] for i in range(7)]
 
-        # 统计每个周期的数据
         series = []
-        for idx, period in enumerate(periods):
-            # 筛选时间范围（规范化到日）
-            date_col = df['投保确认时间'].dt.normalize()
-            start_norm = period['start'].normalize()
-            end_norm = period['end'].normalize()
-            mask = (date_col >= start_norm) & (date_col <= end_norm)
-            period_data = df[mask].copy()
-
-            # 按日期分组统计 - 使用向量化计算 weekday_index
-            period_data['weekday_index'] = (period_data['投保确认时间'].dt.normalize() - start_norm).dt.days
-            # 仅保留当前周期的7天索引范围
-            period_data = period_data[(period_data['weekday_index'] >= 0) & (period_data['weekday_index'] < 7)]
-
-            # 根据指标选择聚合列
-            if metric == 'count':
-                # 保单件数: 保费>=50的记录数
-                period_data = period_data[period_data['签单/批改保费'] >= 50]
-                daily_stats = period_data.groupby('weekday_index').size()
-            else:  # premium
-                # 签单保费
-                daily_stats = period_data.groupby('weekday_index')['签单/批改保费'].sum()
-
-            # 构造完整7天数据(缺失的填0)
-            data = []
-            dates = []
-            for i in range(7):
-                data.append(float(daily_stats.get(i, 0)))
-                dates.append((period['start'] + timedelta(days=i)).strftime('%Y-%m-%d'))
-
-            # 计算该周期的总值（用于标签显示）
+        for idx, window in enumerate(windows):
+            data = window['data']
             total_value = sum(data)
 
             # 格式化总值：保费取整万，件数取整数
@@ -556,13 +794,13 @@ class DataProcessor:
             # 生成标签：D-X (日期): 数值
             # idx=0 → D, idx=1 → D-7, idx=2 → D-14
             period_label = 'D' if idx == 0 else f'D-{(idx) * 7}'
-            date_str = period['end'].strftime('%m-%d')  # 简化日期格式
+            date_str = window['end'].strftime('%m-%d')  # 简化日期格式
             label = f"{period_label} ({date_str}): {value_str}"
 
             series.append({
                 'name': label,
                 'data': data,
-                'dates': dates,
+                'dates': window['dates'],
                 'code': period_label,
                 'total_value': total_value,  # 保存原始总值用于前端计算趋势
                 'period_index': idx  # 保存周期索引
@@ -582,7 +820,342 @@ class DataProcessor:
             'validation': validation_result
         }
 
-    def get_kpi_windows(self, date=None, filters=None, data_scope='exclude_correction'):
+    @staticmethod
+    def _compare_windows(df, metric, base_start, base_end, offsets, align_weekday=True):
+        """
+        对比引擎：基准区间与各对比区间的逐日数值
+
+        说明：
+        - 先对覆盖全部区间的日期范围做一次逐日分组求和，得到连续的逐日数组（无数据的日期为 0），
+          各周期只是该数组的切片，K 个周期不再各自做整表掩码与分组；
+        - metric: premium=签单保费合计，count=保单件数（保费≥50 的记录数）。
+
+        Args:
+            df: 已完成口径过滤与筛选的数据（逐行数据或聚合表）
+            base_start, base_end: 基准区间（规范化到天）
+            offsets: PeriodOffset 列表
+
+        Returns:
+            list[dict]: 基准区间在前，随后按 offsets 顺序；每项 {offset, start, end, dates, data}
+
+        Raises:
+            PeriodError: 基准区间过长，或对比区间超出可计算的日期范围
+        """
+        # 基准区间不超过 MAX_ROLLING_DAYS、偏移数量受 parse_offset 限制，合并跨度因此有界；
+        # 逐日数组按合并跨度分配，超出可计算范围时按参数错误处理（路由层返回 400）
+        if (base_end - base_start).days + 1 > MAX_ROLLING_DAYS:
+            raise PeriodError(f'基准区间跨度需在 {MAX_ROLLING_DAYS} 天以内')
+        windows = [(None, base_start, base_end)]
+        windows.extend((offset, *offset.shift(base_start, base_end, align_weekday)) for offset in offsets)
+        origin = min(start for _, start, _ in windows)
+        last = max(end for _, _, end in windows)
+        try:
+            span = (last - origin).days + 1
+        except (OverflowError, pd.errors.OutOfBoundsDatetime, pd.errors.OutOfBoundsTimedelta):
+            raise PeriodError('对比周期超出可计算的日期范围')
+
+        if metric == 'count':
+            df = with_policy_count(df)
+            column = POLICY_COUNT_COLUMN
+        else:
+            column = '签单/批改保费'
+        date_col = df['投保确认时间'].dt.normalize()
+        in_range = (date_col >= origin) & (date_col <= last)
+        daily = df.loc[in_range, column].groupby(date_col[in_range]).sum()
+        values = np.zeros(span)
+        values[(daily.index - origin).days] = daily.to_numpy(dtype=float)
+
+        result = []
+        for offset, start, end in windows:
+            lo = (start - origin).days
+            hi = (end - origin).days + 1
+            result.append({
+                'offset': offset,
+                'start': start,
+                'end': end,
+                'dates': [d.strftime('%Y-%m-%d') for d in pd.date_range(start, end, freq='D')],
+                'data': [float(v) for v in values[lo:hi]],
+            })
+        return result
+
+    @timed_stage('aggregate')
+    def get_period_comparison(self, metric='premium', period='last7d', compare=('previous',), align_weekday=True,
+                              date=None, filters=None, data_scope='exclude_correction'):
+        """
+        多周期对比（同比/环比）：基准周期与任意 K 个对比周期的逐日数据与合计
+
+        Args:
+            metric: 'premium'(签单保费) 或 'count'(保单件数，保费≥50 的记录数)
+            period: 基准统计周期（见 periods.py，默认近7天）
+            compare: 对比周期偏移列表（见 periods.parse_offset，如 previous / -1w / mom / yoy）
+            align_weekday: 是否按星期对齐（月/季/年偏移取最接近的整周数，逐日星期一致）
+            date: 锚定日期（默认为筛选后数据的最新日期）
+            filters: 筛选条件字典
+            data_scope: 数据口径 ('exclude_correction' 或 'include_correction')
+
+        Returns:
+            {
+                'anchor_date': '2025-11-06',
+                'metric': 'premium',
+                'align_weekday': True,
+                'x_axis': ['周六', '周日', ...],   # 基准周期逐日（星期对齐时为星期，否则为 MM-DD）
+                'series': [
+                    {'code': 'current', 'label': '本期', 'date_range': '...', 'dates': [...], 'data': [...],
+                     'total_value': 1675458.74},
+                    {'code': '-1y', 'label': '去年同期', 'date_range': '...', 'dates': [...], 'data': [...],
+                     'total_value': 1502000.0, 'change': 173458.74, 'change_pct': 11.5},
+                    ...
+                ]
+            }
+
+        Raises:
+            PeriodError: period / compare 不合法
+        """
+        if not self.merged_csv.exists():
+            return None
+
+        spec = parse_period(period)
+        offsets = [parse_offset(value) for value in compare]
+
+        df = self._load_aggregated('week_comparison', filters, data_scope)
+        df = self._apply_data_scope_filter(df, data_scope)
+        df = self._apply_filters(df, filters)
+
+        anchor = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
+        if pd.isna(anchor):
+            return None
+        base_start, base_end = spec.resolve(anchor)
+        windows = self._compare_windows(df, metric, base_start, base_end, offsets, align_weekday)
+
+        weekday_map = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+        base_days = pd.date_range(base_start, base_end, freq='D')
+        if align_weekday:
+            x_axis = [weekday_map[d.dayofweek] for d in base_days]
+        else:
+            x_axis = [d.strftime('%m-%d') for d in base_days]
+
+        base_total = sum(windows[0]['data'])
+        series = []
+        for window in windows:
+            offset = window['offset']
+            total_value = sum(window['data'])
+            item = {
+                'code': offset.code if offset is not None else 'current',
+                'label': offset.label if offset is not None else '本期',
+                'date_range': format_date_range(window['start'], window['end']),
+                'dates': window['dates'],
+                'data': window['data'],
+                'total_value': total_value,
+            }
+            if offset is not None:
+                item['change'] = base_total - total_value
+                item['change_pct'] = round((base_total - total_value) / abs(total_value) * 100, 1) if total_value else None
+            series.append(item)
+
+        return {
+            'anchor_date': anchor.strftime('%Y-%m-%d'),
+            'metric': metric,
+            'period': spec.key,
+            'period_label': spec.label,
+            'align_weekday': bool(align_weekday),
+            'x_axis': x_axis,
+            'series': series
+        }
+
+    @staticmethod
+    def _select_ranked(keys, names, n, largest=True):
+        """
+        部分选择：取排序键最大（或最小）的 n 项并排好序
+
+        说明：
+        - np.argpartition 以 O(m) 找到第 n 名的排序键，只对达到该键值的项排序，避免对全部 m 个分组做完整排序；
+        - 与第 n 名键值相同的项一并参与排序，按名称决定先后，保证结果稳定。
+
+        Returns:
+            ndarray: 选中项在 keys 中的下标（按名次排列）
+        """
+        m = len(keys)
+        if n < m:
+            kth = m - n if largest else n - 1
+            threshold = keys[np.argpartition(keys, kth)[kth]]
+            picked = np.flatnonzero(keys >= threshold if largest else keys <= threshold)
+        else:
+            picked = np.arange(m)
+        ordered = np.lexsort((names[picked], -keys[picked] if largest else keys[picked]))
+        return picked[ordered][:n]
+
+    @timed_stage('aggregate')
+    def get_leaderboard(self, dimension='业务员', metric='premium', rank_by='value', n=10, direction='top',
+                        period='last7d', compare='previous', align_weekday=True, date=None, filters=None,
+                        data_scope='exclude_correction'):
+        """
+        排行榜：按业务员 / 团队 / 三级机构排名的前 N 名或后 N 名
+
+        说明：
+        - 本期与对比期的分组求和在同一次计算中完成：按两个区间的并集截取一次，
+          以维度编码为下标 bincount 得到两个窗口的合计，环比变化无需再次分组；
+        - 只对有数据（本期或对比期）的分组排名，按 rank_by 排序：
+          value=本期数值，change=本期−对比期，change_pct=变化率（对比期为 0 的分组不参与变化率排名）；
+        - 维度取值缺失的记录不参与排名。
+
+        Args:
+            dimension: '业务员' | '团队' | '三级机构'
+            metric: 'premium'(签单保费) 或 'count'(保单件数，保费≥50 的记录数)
+            rank_by: 'value' | 'change' | 'change_pct'
+            n: 返回名次数量
+            direction: 'top'(前 N 名，数值大者在前) 或 'bottom'(后 N 名，数值小者在前)
+            period: 本期统计周期（见 periods.py，默认近7天）
+            compare: 对比周期偏移（见 periods.parse_offset，默认上一周期）
+            align_weekday: 是否按星期对齐对比周期
+            date: 锚定日期（默认为筛选后数据的最新日期）
+            filters: 筛选条件字典
+            data_scope: 数据口径 ('exclude_correction' 或 'include_correction')
+
+        Returns:
+            {
+                'dimension': '业务员',
+                'metric': 'premium',
+                'rank_by': 'value',
+                'direction': 'top',
+                'anchor_date': '2025-11-06',
+                'period': 'last7d', 'period_label': '近7天', 'date_range': '...',
+                'compare': {'code': 'previous', 'label': '上一周期', 'date_range': '...'},
+                'total_entities': 236,          # 参与排名的分组数
+                'total_value': 1675458.74,      # 本期合计（参与排名的分组）
+                'total_previous': 1502000.0,
+                'items': [
+                    {'rank': 1, 'name': '...', 'value': 52000.0, 'previous': 41000.0,
+                     'change': 11000.0, 'change_pct': 26.8},
+                    ...
+                ]
+            }
+
+        Raises:
+            PeriodError: period / compare 不合法
+        """
+        if not self.merged_csv.exists():
+            return None
+
+        spec = parse_period(period)
+        offset = parse_offset(compare)
+
+        df = self._load_aggregated('leaderboard', filters, data_scope, extra_columns=(dimension,))
+        df = self._apply_data_scope_filter(df, data_scope)
+        df = self._apply_filters(df, filters)
+
+        anchor = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
+        if pd.isna(anchor):
+            return None
+        start, end = spec.resolve(anchor)
+        prev_start, prev_end = offset.shift(start, end, align_weekday)
+
+        if metric == 'count':
+            df = with_policy_count(df)
+            column = POLICY_COUNT_COLUMN
+        else:
+            column = '签单/批改保费'
+
+        # 一次截取两个区间的并集，按维度编码分别累加本期与对比期（按天精度的 datetime64 比较，无需逐行规范化）
+        days = df['投保确认时间'].to_numpy().astype('datetime64[D]')
+        in_current = (days >= start.to_datetime64()) & (days <= end.to_datetime64())
+        in_previous = (days >= prev_start.to_datetime64()) & (days <= prev_end.to_datetime64())
+        in_window = in_current | in_previous
+        groups = df[dimension]
+        if isinstance(groups.dtype, pd.CategoricalDtype):
+            codes, names = groups.cat.codes.to_numpy(), groups.cat.categories
+        else:
+            codes, names = pd.factorize(groups)
+        names = np.asarray(names, dtype=object).astype(str)
+        keep = in_window & (codes >= 0)
+        codes = codes[keep]
+        values = df[column].to_numpy(dtype=float)[keep]
+        size = len(names)
+        current = np.bincount(codes, weights=np.where(in_current[keep], values, 0.0), minlength=size)
+        previous = np.bincount(codes, weights=np.where(in_previous[keep], values, 0.0), minlength=size)
+        present = np.bincount(codes, minlength=size) > 0
+
+        change = current - previous
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_pct = np.where(previous != 0, change / np.abs(previous) * 100, np.nan)
+        keys = {'value': current, 'change': change, 'change_pct': change_pct}[rank_by]
+        candidates = np.flatnonzero(present & np.isfinite(keys))
+        picked = candidates[self._select_ranked(keys[candidates], names[candidates], n, direction == 'top')]
+
+        as_number = (lambda v: int(round(v))) if metric == 'count' else float
+        items = []
+        for rank, i in enumerate(picked, start=1):
+            items.append({
+                'rank': rank,
+                'name': str(names[i]),
+                'value': as_number(current[i]),
+                'previous': as_number(previous[i]),
+                'change': as_number(change[i]),
+                'change_pct': round(float(change_pct[i]), 1) if np.isfinite(change_pct[i]) else None,
+            })
+
+        return {
+            'dimension': dimension,
+            'metric': metric,
+            'rank_by': rank_by,
+            'direction': direction,
+            'anchor_date': anchor.strftime('%Y-%m-%d'),
+            'period': spec.key,
+            'period_label': spec.label,
+            'date_range': format_date_range(start, end),
+            'compare': {
+                'code': offset.code,
+                'label': offset.label,
+                'date_range': format_date_range(prev_start, prev_end),
+            },
+            'total_entities': int(len(candidates)),
+            'total_value': as_number(current[candidates].sum()),
+            'total_previous': as_number(previous[candidates].sum()),
+            'items': items
+        }
+
+    @timed_stage('aggregate')
+    def get_pivot(self, spec, period=None, date=None, filters=None, data_scope='exclude_correction'):
+        """
+        透视分析：任意行维度 × 列维度的分组汇总（见 pivot.py）
+
+        Args:
+            spec: 透视定义（PivotSpec 或字典：rows / columns / measures / where / sort / order）
+            period: 可选统计周期（见 periods.py）；默认不限日期，统计全部数据
+            date: 锚定日期（仅指定 period 时生效，默认为筛选后数据的最新日期）
+            filters: 筛选条件字典
+            data_scope: 数据口径 ('exclude_correction' 或 'include_correction')
+
+        Returns:
+            PivotTable | None: 透视结果（由路由层按 JSON 或流式格式输出）；无法确定锚定日期时返回 None
+
+        Raises:
+            PivotError: 透视定义不合法、数据中缺少所需维度或列维度取值组合过多
+            PeriodError: period 不合法
+        """
+        if not self.merged_csv.exists():
+            return None
+
+        spec = parse_pivot(spec)
+        df = self._load_aggregated('pivot', filters, data_scope, extra_columns=spec.source_dimensions())
+        df = self._apply_data_scope_filter(df, data_scope)
+        df = self._apply_filters(df, filters)
+
+        meta = {}
+        if period is not None:
+            period_spec = parse_period(period)
+            selected = self._select_period(df, period_spec, date)
+            if selected is None:
+                return None
+            df, start, end = selected
+            meta = {
+                'period': period_spec.key,
+                'period_label': period_spec.label,
+                'date_range': format_date_range(start, end),
+            }
+        return build_pivot(df, spec, meta)
+
+    @timed_stage('aggregate')
+    def get_kpi_windows(self, date=None, filters=None, data_scope='exclude_correction', period=None):
         """
         获取KPI三口径数据：当日(指定日期)、近7天(截至指定日期)、近30天(截至指定日期)
 
@@ -590,6 +1163,8 @@ class DataProcessor:
             date: 指定日期，默认为最新日期
             filters: 筛选条件字典
             data_scope: 数据口径 ('exclude_correction' 或 'include_correction')
+            period: 可选统计周期（见 periods.py）；指定时各指标追加该周期的取值（键为周期标识），
+                    并返回 period 字段 {'key', 'label', 'date_range'}
 
         Returns:
             {
@@ -603,8 +1178,7 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        df = self._load_dataframe(columns=self._query_columns('kpi_windows', filters, data_scope))
 
         # 应用数据口径过滤（中文注释：根据是否包含批改决定样本范围）
         df = self._apply_data_scope_filter(df, data_scope)
@@ -902,7 +1476,7 @@ class DataProcessor:
             'policy_consistency': validation_policy
         }
 
-        return {
+        result = {
             'anchor_date': anchor.strftime('%Y-%m-%d'),
             'premium': {
                 'day': premium_day,
@@ -1042,6 +1616,40 @@ class DataProcessor:
             'validation': validation_result
         }
 
+        # 自定义统计周期（可选）：各指标按周期标识（如 mtd / last90d / custom）追加该周期的取值
+        if period is not None:
+            spec = parse_period(period)
+            start, end = spec.resolve(anchor)
+            key = spec.key
+            if key not in result['premium']:
+                window_df = df[(date_col >= start) & (date_col <= end)]
+                result['premium'][key] = sum_float(window_df['签单/批改保费'])
+                result['policy_count'][key] = sum_int(window_df['签单数量'])
+                result['commission'][key] = sum_float(window_df['手续费含税'])
+                ratio_masks = {
+                    'telesales': _mask_telesales,
+                    'new_energy': _mask_new_energy,
+                    'transfer': _mask_transfer,
+                    'mandatory': _mask_mandatory,
+                    'commercial': _mask_commercial,
+                    'non_local': _mask_non_local,
+                    'single_mandatory': _mask_single_mandatory,
+                    'new_policy': _mask_new_policy,
+                    'loss_business': _mask_loss_business,
+                }
+                for name, mask_fn in ratio_masks.items():
+                    cond_mask = mask_fn(window_df)
+                    result['ratios'][name]['premium'][key] = _ratio_premium(window_df, cond_mask)
+                    result['ratios'][name]['count'][key] = _ratio_count(window_df, cond_mask)
+            result['period'] = {
+                'key': key,
+                'label': spec.label,
+                'date_range': format_date_range(start, end)
+            }
+
+        return result
+
+    @timed_stage('scope_filter')
     def _apply_data_scope_filter(self, df, data_scope='exclude_correction'):
         """
         应用数据口径过滤 - 根据批改状态过滤数据
@@ -1061,6 +1669,7 @@ class DataProcessor:
             return df
         return df
 
+    @timed_stage('filter')
     def _apply_filters(self, df, filters):
         """
         应用筛选条件
@@ -1088,8 +1697,9 @@ class DataProcessor:
         if not filters:
             return df
 
-        # 复制一份避免修改原数据
-        filtered_df = df.copy()
+        # 筛选均通过布尔索引生成新对象，不修改原数据；
+        # 无需整表复制（快照数据为只读 mmap，整表复制会抵消多进程共享内存的收益）
+        filtered_df = df
 
         # 验证业务员匹配情况
         self._validate_staff_mapping(filtered_df)
@@ -1138,7 +1748,8 @@ class DataProcessor:
                         m = re.search(r'[\u4e00-\u9fa5]+', str(value))
                         return m.group() if m else ''
 
-                    filtered_df = filtered_df[filtered_df['业务员'].apply(lambda v: extract_name(v) == requested)]
+                    # 先转为字符串再逐值匹配：快照中的文本列为 category 类型，缺失值需统一为 'nan'
+                    filtered_df = filtered_df[filtered_df['业务员'].astype(str).apply(lambda v: extract_name(v) == requested)]
 
         # 三级机构筛选(通过业务员映射)
         if filters.get('三级机构') and filters['三级机构'] != '全部':
@@ -1216,6 +1827,7 @@ class DataProcessor:
 
         return filtered_df
 
+    @timed_stage('validation')
     def _validate_policy_consistency(self, df):
         """
         校验保单号→业务员→团队/三级机构的一致性
@@ -1266,6 +1878,7 @@ class DataProcessor:
             'mismatch_count': len(mismatches)
         }
 
+    @timed_stage('aggregate')
     def get_staff_performance_distribution(self, period='day', date=None, filters=None, data_scope='exclude_correction'):
         """
         获取各机构业务员业绩区间分布
@@ -1279,7 +1892,7 @@ class DataProcessor:
         - >=3万
 
         Args:
-            period: 时间段 (day=当日, last7d=近7天, last30d=近30天)
+            period: 统计周期（见 periods.py：day / lastNd / mtd / qtd / ytd / {'start', 'end'}）
             date: 指定日期 (默认为最新日期)
             filters: 筛选条件
             data_scope: 数据口径 (exclude_correction=不含批改, include_correction=含批改)
@@ -1301,8 +1914,12 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        try:
+            spec = parse_period(period)
+        except PeriodError:
+            return None
+
+        df = self._load_aggregated('staff_performance', filters)
 
         # 应用筛选条件
         df = self._apply_filters(df, filters)
@@ -1311,39 +1928,17 @@ class DataProcessor:
         if data_scope == 'exclude_correction' and '签单/批改标识' in df.columns:
             df = df[df['签单/批改标识'] != '批改']
 
-        # 获取锚定日期
-        anchor_date = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
-        if pd.isna(anchor_date):
+        # 按统计周期截取数据（锚定日期默认为筛选后数据的最新日期）
+        selected = self._select_period(df, spec, date)
+        if selected is None:
             return None
-
-        # 时间范围映射
-        if period == 'day':
-            start_date = anchor_date
-            period_label = '当日'
-            date_range = anchor_date.strftime('%Y-%m-%d')
-        elif period == 'last7d':
-            start_date = anchor_date - timedelta(days=6)
-            period_label = '近7天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        elif period == 'last30d':
-            start_date = anchor_date - timedelta(days=29)
-            period_label = '近30天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        else:
-            return None
-
-        # 筛选时间范围（规范化到日，避免 .dt.date 的dtype差异）
-        date_col = df['投保确认时间'].dt.normalize()
-        if period == 'day':
-            mask = date_col == anchor_date.normalize()
-        else:
-            mask = (date_col >= start_date.normalize()) & (date_col <= anchor_date.normalize())
-
-        period_data = df[mask].copy()
+        period_data, start_date, end_date = selected
+        period_label = spec.label
+        date_range = format_date_range(start_date, end_date)
 
         if period_data.empty:
             return {
-                'period': period,
+                'period': spec.key,
                 'period_label': period_label,
                 'date_range': date_range,
                 'distribution': [
@@ -1359,17 +1954,13 @@ class DataProcessor:
             }
 
         # 按业务员分组统计保费
-        staff_stats = period_data.groupby('业务员').agg({
+        staff_stats = period_data.groupby('业务员', observed=True).agg({
             '签单/批改保费': 'sum',
             '签单数量': 'sum'
         }).reset_index()
 
         # 根据时间周期确定天数, 区间阈值按“当日阈值 * 天数”自适应
-        period_days = {
-            'day': 1,
-            'last7d': 7,
-            'last30d': 30
-        }.get(period, 1)
+        period_days = (end_date - start_date).days + 1
 
         def _scale_bound(value):
             if value in (float('-inf'), float('inf')):
@@ -1433,7 +2024,7 @@ class DataProcessor:
             })
 
         return {
-            'period': period,
+            'period': spec.key,
             'period_label': period_label,
             'date_range': date_range,
             'distribution': distribution,
@@ -1441,6 +2032,7 @@ class DataProcessor:
             'total_premium': total_premium
         }
 
+    @timed_stage('validation')
     def _validate_staff_mapping(self, df):
         """
         验证业务员映射匹配情况
@@ -1483,12 +2075,13 @@ class DataProcessor:
             'unmatched_count': len(unmatched_staff)
         }
 
+    @timed_stage('aggregate')
     def get_insurance_type_distribution(self, period='day', date=None, filters=None, data_scope='exclude_correction'):
         """
         获取险别组合占比分析
 
         Args:
-            period: 时间段 (day=当日, last7d=近7天, last30d=近30天)
+            period: 统计周期（见 periods.py：day / lastNd / mtd / qtd / ytd / {'start', 'end'}）
             date: 指定日期 (默认为最新日期)
             filters: 筛选条件
             data_scope: 数据口径 (exclude_correction=不含批改, include_correction=含批改)
@@ -1510,8 +2103,12 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        try:
+            spec = parse_period(period)
+        except PeriodError:
+            return None
+
+        df = self._load_aggregated('insurance_type', filters, data_scope)
 
         # 应用数据口径过滤（必须在筛选条件之前）
         df = self._apply_data_scope_filter(df, data_scope)
@@ -1519,40 +2116,18 @@ class DataProcessor:
         # 应用筛选条件
         df = self._apply_filters(df, filters)
 
-        # 获取锚定日期
-        anchor_date = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
-        if pd.isna(anchor_date):
+        # 按统计周期截取数据（锚定日期默认为筛选后数据的最新日期）
+        selected = self._select_period(df, spec, date)
+        if selected is None:
             return None
-
-        # 时间范围映射
-        if period == 'day':
-            start_date = anchor_date
-            period_label = '当日'
-            date_range = anchor_date.strftime('%Y-%m-%d')
-        elif period == 'last7d':
-            start_date = anchor_date - timedelta(days=6)
-            period_label = '近7天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        elif period == 'last30d':
-            start_date = anchor_date - timedelta(days=29)
-            period_label = '近30天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        else:
-            return None
-
-        # 筛选时间范围（规范化到日，避免 .dt.date 的dtype差异）
-        date_col = df['投保确认时间'].dt.normalize()
-        if period == 'day':
-            mask = date_col == anchor_date.normalize()
-        else:
-            mask = (date_col >= start_date.normalize()) & (date_col <= anchor_date.normalize())
-
-        period_data = df[mask].copy()
+        period_data, start_date, end_date = selected
+        period_label = spec.label
+        date_range = format_date_range(start_date, end_date)
 
         # 检查字段存在性
         if '单套-险别' not in period_data.columns:
             return {
-                'period': period,
+                'period': spec.key,
                 'period_label': period_label,
                 'date_range': date_range,
                 'distribution': [],
@@ -1563,7 +2138,7 @@ class DataProcessor:
 
         if period_data.empty:
             return {
-                'period': period,
+                'period': spec.key,
                 'period_label': period_label,
                 'date_range': date_range,
                 'distribution': [],
@@ -1572,7 +2147,7 @@ class DataProcessor:
             }
 
         # 按险别组合分组统计
-        insurance_stats = period_data.groupby('单套-险别').agg({
+        insurance_stats = period_data.groupby('单套-险别', observed=True).agg({
             '签单数量': 'sum',
             '签单/批改保费': 'sum'
         }).reset_index()
@@ -1598,7 +2173,7 @@ class DataProcessor:
         distribution.sort(key=lambda x: x['premium'], reverse=True)
 
         return {
-            'period': period,
+            'period': spec.key,
             'period_label': period_label,
             'date_range': date_range,
             'distribution': distribution,
@@ -1606,6 +2181,7 @@ class DataProcessor:
             'total_premium': total_premium
         }
 
+    @timed_stage('aggregate')
     def get_premium_range_distribution(self, period='day', date=None, filters=None, data_scope='exclude_correction'):
         """
         获取业务员保费区间占比分析
@@ -1619,7 +2195,7 @@ class DataProcessor:
         - >=3万
 
         Args:
-            period: 时间段 (day=当日, last7d=近7天, last30d=近30天)
+            period: 统计周期（见 periods.py：day / lastNd / mtd / qtd / ytd / {'start', 'end'}）
             date: 指定日期 (默认为最新日期)
             filters: 筛选条件
             data_scope: 数据口径 (exclude_correction=不含批改, include_correction=含批改)
@@ -1641,8 +2217,12 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        try:
+            spec = parse_period(period)
+        except PeriodError:
+            return None
+
+        df = self._load_aggregated('premium_range', filters, data_scope)
 
         # 应用数据口径过滤（必须在筛选条件之前）
         df = self._apply_data_scope_filter(df, data_scope)
@@ -1650,39 +2230,17 @@ class DataProcessor:
         # 应用筛选条件
         df = self._apply_filters(df, filters)
 
-        # 获取锚定日期
-        anchor_date = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
-        if pd.isna(anchor_date):
+        # 按统计周期截取数据（锚定日期默认为筛选后数据的最新日期）
+        selected = self._select_period(df, spec, date)
+        if selected is None:
             return None
-
-        # 时间范围映射
-        if period == 'day':
-            start_date = anchor_date
-            period_label = '当日'
-            date_range = anchor_date.strftime('%Y-%m-%d')
-        elif period == 'last7d':
-            start_date = anchor_date - timedelta(days=6)
-            period_label = '近7天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        elif period == 'last30d':
-            start_date = anchor_date - timedelta(days=29)
-            period_label = '近30天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        else:
-            return None
-
-        # 筛选时间范围（规范化到日，避免 .dt.date 的dtype差异）
-        date_col = df['投保确认时间'].dt.normalize()
-        if period == 'day':
-            mask = date_col == anchor_date.normalize()
-        else:
-            mask = (date_col >= start_date.normalize()) & (date_col <= anchor_date.normalize())
-
-        period_data = df[mask].copy()
+        period_data, start_date, end_date = selected
+        period_label = spec.label
+        date_range = format_date_range(start_date, end_date)
 
         if period_data.empty or '业务员' not in period_data.columns:
             return {
-                'period': period,
+                'period': spec.key,
                 'period_label': period_label,
                 'date_range': date_range,
                 'distribution': [],
@@ -1691,7 +2249,7 @@ class DataProcessor:
             }
 
         # 按业务员分组统计保费
-        staff_stats = period_data.groupby('业务员').agg({
+        staff_stats = period_data.groupby('业务员', observed=True).agg({
             '签单/批改保费': 'sum'
         }).reset_index()
 
@@ -1733,7 +2291,7 @@ class DataProcessor:
             })
 
         return {
-            'period': period,
+            'period': spec.key,
             'period_label': period_label,
             'date_range': date_range,
             'distribution': distribution,
@@ -1741,12 +2299,13 @@ class DataProcessor:
             'total_premium': total_premium
         }
 
+    @timed_stage('aggregate')
     def get_renewal_type_distribution(self, period='day', date=None, filters=None, data_scope='exclude_correction'):
         """
         获取新转续占比分析
 
         Args:
-            period: 时间段 (day=当日, last7d=近7天, last30d=近30天)
+            period: 统计周期（见 periods.py：day / lastNd / mtd / qtd / ytd / {'start', 'end'}）
             date: 指定日期 (默认为最新日期)
             filters: 筛选条件
             data_scope: 数据口径 (exclude_correction=不含批改, include_correction=含批改)
@@ -1768,8 +2327,12 @@ class DataProcessor:
         if not self.merged_csv.exists():
             return None
 
-        df = pd.read_csv(self.merged_csv, encoding='utf-8-sig', low_memory=False)
-        df['投保确认时间'] = pd.to_datetime(df['投保确认时间'], errors='coerce')
+        try:
+            spec = parse_period(period)
+        except PeriodError:
+            return None
+
+        df = self._load_aggregated('renewal_type', filters, data_scope)
 
         # 应用数据口径过滤（必须在筛选条件之前）
         df = self._apply_data_scope_filter(df, data_scope)
@@ -1777,35 +2340,13 @@ class DataProcessor:
         # 应用筛选条件
         df = self._apply_filters(df, filters)
 
-        # 获取锚定日期
-        anchor_date = df['投保确认时间'].max() if date is None else pd.to_datetime(date)
-        if pd.isna(anchor_date):
+        # 按统计周期截取数据（锚定日期默认为筛选后数据的最新日期）
+        selected = self._select_period(df, spec, date)
+        if selected is None:
             return None
-
-        # 时间范围映射
-        if period == 'day':
-            start_date = anchor_date
-            period_label = '当日'
-            date_range = anchor_date.strftime('%Y-%m-%d')
-        elif period == 'last7d':
-            start_date = anchor_date - timedelta(days=6)
-            period_label = '近7天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        elif period == 'last30d':
-            start_date = anchor_date - timedelta(days=29)
-            period_label = '近30天'
-            date_range = f"{start_date.strftime('%Y-%m-%d')} ~ {anchor_date.strftime('%Y-%m-%d')}"
-        else:
-            return None
-
-        # 筛选时间范围（规范化到日，避免 .dt.date 的dtype差异）
-        date_col = df['投保确认时间'].dt.normalize()
-        if period == 'day':
-            mask = date_col == anchor_date.normalize()
-        else:
-            mask = (date_col >= start_date.normalize()) & (date_col <= anchor_date.normalize())
-
-        period_data = df[mask].copy()
+        period_data, start_date, end_date = selected
+        period_label = spec.label
+        date_range = format_date_range(start_date, end_date)
 
         # 检查字段存在性（优先使用"是否续保"，回退到"车险新业务分类"）
         renewal_field = None
@@ -1815,7 +2356,7 @@ class DataProcessor:
             renewal_field = '车险新业务分类'
         else:
             return {
-                'period': period,
+                'period': spec.key,
                 'period_label': period_label,
                 'date_range': date_range,
                 'distribution': [],
@@ -1826,7 +2367,7 @@ class DataProcessor:
 
         if period_data.empty:
             return {
-                'period': period,
+                'period': spec.key,
                 'period_label': period_label,
                 'date_range': date_range,
                 'distribution': [],
@@ -1835,7 +2376,7 @@ class DataProcessor:
             }
 
         # 按新转续分组统计
-        renewal_stats = period_data.groupby(renewal_field).agg({
+        renewal_stats = period_data.groupby(renewal_field, observed=True).agg({
             '签单数量': 'sum',
             '签单/批改保费': 'sum'
         }).reset_index()
@@ -1861,7 +2402,7 @@ class DataProcessor:
         distribution.sort(key=lambda x: x['premium'], reverse=True)
 
         return {
-            'period': period,
+            'period': spec.key,
             'period_label': period_label,
             'date_range': date_range,
             'distribution': distribution,
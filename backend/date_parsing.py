@@ -0,0 +1,157 @@
+"""
+日期列解析 - 按候选格式整列向量化解析，替代逐行 try/except 的多格式解析
+
+设计说明：
+- 先对整列取不重复值（日期列基数远小于行数），只解析不重复值，再按编码映射回各行；
+- 文本值依次用每个候选格式整体解析一遍，每一轮只处理仍未解析成功的位置；
+- 候选格式都不匹配的少量剩余值，最后交给 pandas 的通用解析（format='mixed'），
+  与逐行 pd.to_datetime(x) 的结果一致；仍无法解析的为 NaT；
+- 带时区的取值按各自的本地时刻处理（去掉时区，不换算到 UTC）；同一批剩余值混用多个时区偏移时逐个解析；
+- 已是 datetime64 的列原样返回；Excel 读入的 datetime/date 对象直接转换，不参与格式匹配；
+- datetime64[ns] 只能表示 1677~2262 年，超出范围的占位日期（如 9999-12-31）在 parse_dates 中为 NaT；
+  需要保留这类日期的报表路径使用 parse_days，按 OUT_OF_RANGE_FORMATS 逐值识别为日期对象。
+
+入库清洗（data_processor._clean_data）使用 parse_dates，归档的 xlsx 日报工具使用 parse_days。
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# 候选格式（按常见程度排列；每个格式整体匹配，不做部分匹配）
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y/%m/%d',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y%m%d',
+    '%m/%d/%Y',
+)
+
+# 超出 datetime64[ns] 范围的取值按这些格式逐值识别（与原逐行解析的兜底格式一致）
+OUT_OF_RANGE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y%m%d', '%m/%d/%Y')
+
+_NAT = np.datetime64('NaT', 'ns')
+
+
+def _naive(ts):
+    """带时区的时间转为本地时刻（去掉时区），与逐行解析后取 .date() 的口径一致。"""
+    if ts is pd.NaT or ts.tzinfo is None:
+        return ts
+    return ts.tz_localize(None)
+
+
+def _parse_each(values):
+    """逐个解析（与 pd.to_datetime(x) 逐值转换一致，带时区的取本地时刻）。"""
+    out = np.full(len(values), _NAT)
+    for i, value in enumerate(values):
+        try:
+            ts = pd.to_datetime(value, errors='coerce')
+        except (TypeError, ValueError, OverflowError):
+            continue
+        if isinstance(ts, pd.Timestamp):
+            out[i] = _naive(ts).to_datetime64()
+    return out
+
+
+def _parse_fallback(values):
+    """候选格式均未命中的剩余值：先整体通用解析；混用多个时区偏移或解析失败时逐个解析。"""
+    try:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), format='mixed', errors='coerce')
+    except (TypeError, ValueError, OverflowError):
+        return _parse_each(values)
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+        return parsed.dt.tz_localize(None).to_numpy(dtype='datetime64[ns]')
+    if not pd.api.types.is_datetime64_dtype(parsed.dtype):
+        # 多个时区偏移时结果为对象数组，整体转换会换算到 UTC 而改变日期
+        return _parse_each(values)
+    return parsed.to_numpy(dtype='datetime64[ns]')
+
+
+def _parse_text(text, formats, fallback):
+    """解析去重后的文本值（已去除首尾空白），返回 datetime64[ns] 数组。"""
+    out = np.full(len(text), _NAT)
+    pending = text != ''
+    series = pd.Series(text, dtype=object)
+    for fmt in formats:
+        if not pending.any():
+            return out
+        positions = np.flatnonzero(pending)
+        parsed = pd.to_datetime(series.iloc[positions], format=fmt, errors='coerce').to_numpy()
+        hit = ~np.isnat(parsed)
+        out[positions[hit]] = parsed[hit]
+        pending[positions[hit]] = False
+    if fallback and pending.any():
+        positions = np.flatnonzero(pending)
+        out[positions] = _parse_fallback(text[positions])
+    return out
+
+
+def parse_dates(values, formats=DATE_FORMATS, fallback=True):
+    """
+    将日期列解析为 datetime64[ns]
+
+    Args:
+        values: Series（或可构造 Series 的序列），取值可为文本、datetime/date 对象或缺失值
+        formats: 候选格式，按顺序尝试，先命中者优先
+        fallback: 候选格式都不匹配时是否使用 pandas 通用解析兜底
+
+    Returns:
+        datetime64[ns] 的 Series（索引与列名沿用输入），无法解析的为 NaT
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+
+    codes, uniques = pd.factorize(series)
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = np.full(len(uniques), _NAT)
+    is_text = np.fromiter((isinstance(v, str) for v in uniques), dtype=bool, count=len(uniques))
+    if is_text.any():
+        text = np.array([v.strip() for v in uniques[is_text]], dtype=object)
+        parsed[is_text] = _parse_text(text, formats, fallback)
+    if not is_text.all():
+        # 非文本取值（datetime/date/Timestamp/数值）逐个转换
+        parsed[~is_text] = _parse_each(uniques[~is_text])
+
+    result = np.full(len(series), _NAT)
+    valid = codes >= 0
+    result[valid] = parsed[codes[valid]]
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def _strptime_day(value):
+    """按 OUT_OF_RANGE_FORMATS 逐个尝试解析为日期对象，均失败时返回 None。"""
+    text = str(value)
+    for fmt in OUT_OF_RANGE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_days(values, formats=DATE_FORMATS):
+    """
+    将日期列解析为日期对象（datetime.date）
+
+    说明：先按 parse_dates 整列解析；结果为 NaT 的非空取值（主要是超出 datetime64[ns] 范围的占位日期，
+    如 9999-12-31、0001-01-01）再按 OUT_OF_RANGE_FORMATS 逐个识别（只处理不重复值）。
+
+    Returns:
+        object 类型的 Series（索引与列名沿用输入），取值为 datetime.date，无法解析的为 NaT
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    days = parse_dates(series, formats).dt.date
+    missing = (days.isna() & series.notna()).to_numpy()
+    if missing.any():
+        codes, uniques = pd.factorize(series[missing])
+        recovered = np.array([_strptime_day(v) for v in uniques] + [None], dtype=object)
+        filled = recovered[codes]
+        hit = np.array([d is not None for d in filled], dtype=bool)
+        if hit.any():
+            days = days.astype(object)
+            days.iloc[np.flatnonzero(missing)[hit]] = filled[hit]
+    return days
@@ -0,0 +1,243 @@
+"""
+数据更新推送 - 通过 Server-Sent Events (SSE) 通知前端快照版本变化
+
+设计说明：
+- 前端不再轮询接口，而是订阅 /api/stream；数据刷新生成新快照后推送 snapshot 事件，
+  事件 id 即快照版本号，客户端仅在版本变化时才重新拉取数据。
+- 事件中附带默认筛选条件（无筛选、最新日期）下两种数据口径的 KPI，
+  每个快照版本只计算一次并保存在版本目录中，多个工作进程与连接复用同一份结果。
+- 默认KPI在刷新（publish）与启动预热完成后计算；订阅连接只读取已保存的结果，
+  发现新版本而结果尚未生成时，由后台线程经 runner（api_server 中为查询执行器的 heavy 通道，
+  受并发上限与截止时间约束）计算一次，完成后唤醒订阅者；计算失败时推送不含 KPI 的事件，
+  前端据此按当前筛选条件重新拉取。
+- 同一进程内的刷新通过条件变量立即唤醒订阅者；其他工作进程完成的刷新通过
+  定期检查 CURRENT 指针发现，因此多进程部署下同样可以收到推送。
+- 每个连接有最长存活时间，到期后由浏览器按 retry 间隔自动重连（携带 Last-Event-ID），
+  避免长连接永久占用工作线程；每个进程的并发订阅数有上限。
+- 订阅连接在 gunicorn gthread 模式下占用请求线程：已知每进程线程数（API_THREADS，由 serve.py 设置）时，
+  订阅上限不超过 线程数 - 1，至少保留一个线程处理普通接口；超出上限的订阅返回 503（带 Retry-After）。
+"""
+
+import json
+import os
+import threading
+import time
+
+from metrics import record_cache
+
+
+# 预计算的默认KPI在快照版本目录中的文件名
+DEFAULT_KPI_ARTIFACT = 'default_kpi.json'
+
+# 默认KPI涵盖的数据口径
+DATA_SCOPES = ('exclude_correction', 'include_correction')
+
+# 默认参数（可通过环境变量覆盖）
+DEFAULT_POLL_SECONDS = 2.0
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+DEFAULT_STREAM_SECONDS = 300.0
+DEFAULT_MAX_CLIENTS = 50
+DEFAULT_RETRY_MS = 5000
+
+
+def max_clients_from_env():
+    """
+    每进程订阅数上限：SSE_MAX_CLIENTS（默认 DEFAULT_MAX_CLIENTS），
+    且已知请求线程数 API_THREADS 时不超过 线程数 - 1（线程数为 1 时不接受订阅）
+    """
+    configured = os.environ.get('SSE_MAX_CLIENTS')
+    max_clients = int(configured) if configured else DEFAULT_MAX_CLIENTS
+    threads = int(os.environ.get('API_THREADS') or 0)
+    if threads > 0:
+        max_clients = min(max_clients, threads - 1)
+    return max(0, max_clients)
+
+
+def format_event(data, event=None, event_id=None):
+    """按 SSE 协议格式化一条事件"""
+    lines = []
+    if event:
+        lines.append(f'event: {event}')
+    if event_id:
+        lines.append(f'id: {event_id}')
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    lines.extend(f'data: {line}' for line in payload.splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+class SnapshotEventStream:
+    """
+    快照版本变化的 SSE 广播器
+
+    Args:
+        processor: DataProcessor 实例（提供 snapshot_store 与 KPI 计算）
+        poll_interval: 检查 CURRENT 指针的间隔（秒），用于发现其他进程的刷新
+        heartbeat_interval: 心跳注释行间隔（秒），防止代理因空闲断开连接
+        stream_seconds: 单个连接最长存活时间（秒）
+        max_clients: 本进程允许的最大并发订阅数
+        runner: 执行默认KPI计算的函数 runner(fn, *args)，默认在当前线程直接调用
+    """
+
+    def __init__(self, processor, poll_interval=DEFAULT_POLL_SECONDS,
+                 heartbeat_interval=DEFAULT_HEARTBEAT_SECONDS,
+                 stream_seconds=DEFAULT_STREAM_SECONDS, max_clients=DEFAULT_MAX_CLIENTS,
+                 runner=None):
+        self.processor = processor
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stream_seconds = stream_seconds
+        self.max_clients = max_clients
+        self.runner = runner or (lambda fn, *args: fn(*args))
+        self._cond = threading.Condition()
+        self._clients = 0
+        self._payload_lock = threading.Lock()
+        # 后台计算状态：{版本号: 'pending' | 'failed'}，只保留最近请求的版本
+        self._background = {}
+
+    @classmethod
+    def from_env(cls, processor, runner=None):
+        """从环境变量读取配置构建广播器"""
+        return cls(
+            processor,
+            poll_interval=float(os.environ.get('SSE_POLL_SECONDS') or DEFAULT_POLL_SECONDS),
+            heartbeat_interval=float(os.environ.get('SSE_HEARTBEAT_SECONDS') or DEFAULT_HEARTBEAT_SECONDS),
+            stream_seconds=float(os.environ.get('SSE_STREAM_SECONDS') or DEFAULT_STREAM_SECONDS),
+            max_clients=max_clients_from_env(),
+            runner=runner,
+        )
+
+    def current_version(self):
+        """当前快照版本号；无快照时返回 None"""
+        return self.processor.snapshot_store.current_version()
+
+    def stored_payload(self, version):
+        """读取版本目录中已保存的默认KPI推送内容；尚未生成时返回 None（不触发计算）"""
+        payload = self.processor.snapshot_store.read_artifact(version, DEFAULT_KPI_ARTIFACT)
+        record_cache('default_kpi', payload is not None)
+        return payload
+
+    def default_payload(self, version):
+        """
+        获取指定快照版本的默认KPI推送内容（无筛选、最新日期、两种数据口径）
+
+        说明：优先读取版本目录中的预计算结果；缺失时计算一次并写回，
+        同一进程内加锁避免重复计算。计算较重，只在刷新、预热与后台线程中调用，不在订阅连接中调用。
+        """
+        store = self.processor.snapshot_store
+        payload = self.stored_payload(version)
+        if payload is not None:
+            return payload
+
+        with self._payload_lock:
+            payload = store.read_artifact(version, DEFAULT_KPI_ARTIFACT)
+            if payload is not None:
+                return payload
+            payload = {
+                'version': version,
+                'latest_date': self.processor.get_latest_date(),
+                'kpi': {
+                    scope: self.processor.get_kpi_windows(filters={}, data_scope=scope)
+                    for scope in DATA_SCOPES
+                },
+            }
+            # 经 JSON 往返统一数值类型，保证写入文件与推送内容一致
+            payload = json.loads(json.dumps(payload, ensure_ascii=False, default=str))
+            try:
+                store.write_artifact(version, DEFAULT_KPI_ARTIFACT, payload)
+            except OSError:
+                # 版本目录已被清理（更新的版本已生成），直接推送本次计算结果
+                pass
+            return payload
+
+    def publish(self, version=None):
+        """
+        通知本进程内的订阅者快照已更新，并预先计算默认KPI
+
+        Returns:
+            dict | None: 推送内容；无快照时返回 None
+        """
+        version = version or self.current_version()
+        if version is None:
+            return None
+        payload = self.runner(self.default_payload, version)
+        with self._cond:
+            self._cond.notify_all()
+        return payload
+
+    def _request_payload(self, version):
+        """
+        请求后台计算指定版本的默认KPI（每个进程每个版本至多一次）
+
+        Returns:
+            bool: True 表示计算进行中（完成后唤醒订阅者）；False 表示本进程计算失败
+        """
+        with self._cond:
+            state = self._background.get(version)
+            if state is not None:
+                return state == 'pending'
+            self._background = {version: 'pending'}
+
+        def compute():
+            state = None
+            try:
+                self.runner(self.default_payload, version)
+            except Exception as e:
+                print(f"⚠️  预计算推送内容失败: {e}")
+                state = 'failed'
+            with self._cond:
+                if state is None:
+                    self._background.pop(version, None)
+                elif version in self._background:
+                    self._background[version] = state
+                self._cond.notify_all()
+
+        threading.Thread(target=compute, name='sse-default-kpi', daemon=True).start()
+        return True
+
+    def try_acquire(self):
+        """占用一个订阅名额；已达上限时返回 False"""
+        with self._cond:
+            if self._clients >= self.max_clients:
+                return False
+            self._clients += 1
+            return True
+
+    def release(self):
+        """释放订阅名额"""
+        with self._cond:
+            self._clients = max(0, self._clients - 1)
+
+    def events(self, last_event_id=None):
+        """
+        生成 SSE 事件文本（调用前需 try_acquire 成功，响应关闭时由调用方 release）
+
+        Args:
+            last_event_id: 客户端已知的快照版本（重连时浏览器自动携带 Last-Event-ID）
+        """
+        yield f'retry: {DEFAULT_RETRY_MS}\n\n'
+
+        sent_version = last_event_id or None
+        deadline = time.monotonic() + self.stream_seconds
+        next_heartbeat = time.monotonic() + self.heartbeat_interval
+
+        while True:
+            version = self.current_version()
+            if version is not None and version != sent_version:
+                payload = self.stored_payload(version)
+                if payload is None and not self._request_payload(version):
+                    # 默认KPI计算失败：只推送版本号，前端按当前筛选条件重新拉取
+                    payload = {'version': version, 'latest_date': None, 'kpi': None}
+                if payload is not None:
+                    yield format_event(payload, event='snapshot', event_id=version)
+                    sent_version = version
+
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now >= next_heartbeat:
+                yield ': ping\n\n'
+                next_heartbeat = now + self.heartbeat_interval
+
+            wait = min(self.poll_interval, deadline - now, max(0.0, next_heartbeat - now))
+            with self._cond:
+                self._cond.wait(timeout=max(wait, 0.01))
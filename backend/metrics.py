@@ -0,0 +1,331 @@
+"""
+运行指标模块 - 以 Prometheus 文本格式导出请求、处理阶段、缓存与进程指标
+
+设计说明：
+- 不依赖 prometheus_client，内置计数器 / 仪表 / 直方图三种指标，线程安全；
+- 处理阶段计时采用“独占时间”口径：嵌套阶段（如筛选内部的业务员校验）的耗时
+  从外层阶段中扣除，各阶段之和即为查询总耗时，便于判断时间花在哪里；
+- 指标按进程统计：gunicorn 多进程部署时，每次抓取返回的是处理该请求的工作进程的数据；
+  渲染时为每个样本附加 pid 标签，不同工作进程的计数器是不同的时间序列，
+  抓取在进程间切换时不会被误判为计数器重置（汇总时按 pid 求和，如 sum without (pid)）。
+"""
+
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# 指标名前缀
+METRIC_PREFIX = 'dailyreport'
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    """转义标签值中的反斜杠、双引号与换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    """格式化标签集合：{a="x",b="y"}；extra 为追加的 (名称, 值) 序列"""
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """格式化样本值（整数不带小数点，无穷大使用 +Inf）"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值元组保存样本"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}')
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self, const_labels=()):
+        """生成该指标的文本格式（含 HELP/TYPE 行）；const_labels 为附加到每个样本的 (名称, 值) 序列"""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._samples(tuple(const_labels)))
+        return lines
+
+    def _samples(self, const_labels=()):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, k, const_labels)} {_format_value(v)}'
+                for k, v in items]
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    瞬时值；可通过 set_function 在抓取时动态计算：
+    无标签时函数返回数值，有标签时返回 {标签值元组: 数值}；返回 None 时不输出
+    """
+
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn):
+        self._function = fn
+
+    def _samples(self, const_labels=()):
+        if self._function is None:
+            return super()._samples(const_labels)
+        value = self._function()
+        if value is None:
+            return []
+        if not self.labelnames:
+            return [f'{self.name}{_format_labels((), (), const_labels)} {_format_value(value)}']
+        return [f'{self.name}{_format_labels(self.labelnames, k, const_labels)} {_format_value(v)}'
+                for k, v in sorted(value.items())]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图（输出 _bucket / _sum / _count）"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def _samples(self, const_labels=()):
+        with self._lock:
+            items = sorted((k, {'counts': list(v['counts']), 'sum': v['sum'], 'count': v['count']})
+                           for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key,
+                                        extra=const_labels + (('le', _format_value(bound)),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key, const_labels)
+            lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+            lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表：统一创建指标并渲染为 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(f'{METRIC_PREFIX}_{name}', documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(f'{METRIC_PREFIX}_{name}', documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(f'{METRIC_PREFIX}_{name}', documentation, labelnames, buckets))
+
+    def render(self):
+        """渲染全部指标（text/plain; version=0.0.4），每个样本附加当前进程的 pid 标签"""
+        # pid 在 fork 后变化，渲染时读取
+        const_labels = (('pid', os.getpid()),)
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(const_labels))
+        return '\n'.join(lines) + '\n'
+
+
+def process_rss_bytes():
+    """
+    当前进程常驻内存（字节）
+
+    说明：Linux 读取 /proc/self/statm；其他类 Unix 系统回退为峰值常驻内存；
+    均不可用（如 Windows）时返回 None。
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 以字节为单位，Linux 以 KB 为单位
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+# ========== 全局注册表与指标定义 ==========
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'API请求数（按路由、方法、状态码）', ('route', 'method', 'status'))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'API请求耗时（秒）', ('route', 'method'))
+STAGE_DURATION = REGISTRY.histogram(
+    'stage_duration_seconds', '数据处理各阶段独占耗时（秒）', ('stage',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', '缓存访问次数（按缓存名与命中结果）', ('cache', 'result'))
+SNAPSHOT_LOAD_SECONDS = REGISTRY.gauge(
+    'snapshot_load_seconds', '最近一次打开列式快照的耗时（秒）')
+SNAPSHOT_BUILD_SECONDS = REGISTRY.gauge(
+    'snapshot_build_seconds', '最近一次构建列式快照的耗时（秒）')
+DATASET_ROWS = REGISTRY.gauge(
+    'dataset_rows', '当前数据集行数')
+PROCESS_RSS = REGISTRY.gauge(
+    'process_resident_memory_bytes', '进程常驻内存（字节）')
+PROCESS_RSS.set_function(process_rss_bytes)
+PROCESS_INFO = REGISTRY.gauge(
+    'process_info', '进程信息（pid 标签标识应答本次抓取的工作进程）')
+PROCESS_INFO.set(1)
+
+
+# ========== 阶段计时 ==========
+
+class _StageFrame:
+    """阶段计时帧：记录子阶段累计耗时，用于计算独占时间"""
+
+    __slots__ = ('parent', 'child_seconds')
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.child_seconds = 0.0
+
+
+_current_frame = contextvars.ContextVar('metrics_stage_frame', default=None)
+
+# 当前请求的阶段耗时汇总 {stage: seconds}；未开启收集时为 None
+_request_stages = contextvars.ContextVar('metrics_request_stages', default=None)
+
+
+def begin_request_stages():
+    """
+    开始收集当前请求的阶段耗时（供 Server-Timing 响应头使用）
+
+    说明：查询在执行器线程中运行时需复制上下文（contextvars.copy_context），
+    复制后的上下文共享同一个汇总字典，执行器线程中的阶段耗时也会计入本请求。
+
+    Returns:
+        dict: 阶段耗时汇总字典
+    """
+    stages = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def record_stage(stage, seconds):
+    """记录一次阶段耗时：写入直方图，并计入当前请求的汇总（若已开启）"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    记录一个处理阶段的独占耗时（嵌套阶段耗时不计入外层阶段）
+
+    用法：
+        with stage_timer('serialize'):
+            ...
+    """
+    parent = _current_frame.get()
+    frame = _StageFrame(parent)
+    token = _current_frame.set(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_frame.reset(token)
+        if parent is not None:
+            parent.child_seconds += elapsed
+        record_stage(stage, max(0.0, elapsed - frame.child_seconds))
+
+
+def timed_stage(stage):
+    """阶段计时装饰器，等价于用 stage_timer 包裹整个函数"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_server_timing(stages, total=None):
+    """
+    将阶段耗时格式化为 Server-Timing 响应头，如：load;dur=12.3, filter;dur=4.1, total;dur=20.5
+
+    Args:
+        stages: {stage: seconds}
+        total: 请求总耗时（秒），可选
+    """
+    parts = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in stages.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def record_cache(cache, hit):
+    """记录一次缓存访问"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
@@ -0,0 +1,336 @@
+"""
+统计周期模型 - 将请求中的周期参数统一解析为按天的闭区间 [start, end]
+
+支持的写法：
+- 'day'                              当日（锚定日）
+- 'last7d' / 'last30d' / 'lastNd'    近N天（含锚定日，N 为 1~3660）
+- 'mtd' / 'qtd' / 'ytd'              本月至今 / 本季至今 / 本年至今（截至锚定日）
+- {'start': 'YYYY-MM-DD', 'end': 'YYYY-MM-DD'}
+                                     自定义区间（end 缺省时为锚定日；跨度不超过 3660 天）
+- {'days': N}                        近N天（等价于 'lastNd'）
+
+周期偏移（同比/环比的对比周期，parse_offset）：
+- 'previous'                         紧邻的上一周期（长度相同）
+- '-Nd' / '-Nw'                      前移 N 天 / N 周
+- '-Nm' / '-Nq' / '-Ny'              前移 N 月 / 季 / 年（日历同期；按星期对齐时取最接近的整周数）
+- 'wow' / 'mom' / 'qoq' / 'yoy'      等价于 '-1w' / '-1m' / '-1q' / '-1y'
+
+锚定日由调用方确定（请求指定的日期，或筛选后数据中的最新日期），
+解析阶段只做格式校验，路由层据此返回 400；end 缺省的自定义区间在按锚定日计算时才能校验跨度，
+超出时同样抛出 PeriodError。
+pandas 在用到时才导入：api_server 在路由层校验参数，导入本模块不应加载数据处理依赖。
+"""
+
+import re
+
+
+MAX_ROLLING_DAYS = 3660
+
+# 参数错误时返回给客户端的可用写法
+PERIOD_EXAMPLES = ['day', 'last7d', 'last30d', 'lastNd', 'mtd', 'qtd', 'ytd',
+                   '{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}']
+OFFSET_EXAMPLES = ['previous', '-Nd', '-Nw', '-Nm', '-Nq', '-Ny', 'wow', 'mom', 'qoq', 'yoy']
+
+_ROLLING_PATTERN = re.compile(r'^last(\d+)d$')
+
+_OFFSET_PATTERN = re.compile(r'^-?(\d+)([dwmqy])$')
+
+_OFFSET_ALIASES = {'wow': '-1w', 'mom': '-1m', 'qoq': '-1q', 'yoy': '-1y', 'prev': 'previous'}
+
+_OFFSET_UNIT_LABELS = {'d': '天', 'w': '周', 'm': '个月', 'q': '个季度', 'y': '年'}
+
+_OFFSET_SAME_PERIOD_LABELS = {'w': '上周同期', 'm': '上月同期', 'q': '上季同期', 'y': '去年同期'}
+
+# 月/季/年偏移折算的月数
+_OFFSET_MONTHS = {'m': 1, 'q': 3, 'y': 12}
+
+# 各单位的偏移数量上限：偏移跨度与近N天上限一致（约 10 年），保证平移后的日期在 pandas 可表示范围内
+_OFFSET_MAX_COUNT = {'d': MAX_ROLLING_DAYS, 'w': MAX_ROLLING_DAYS // 7, 'm': 120, 'q': 40, 'y': 10}
+
+_TO_DATE_LABELS = {
+    'mtd': '本月至今',
+    'qtd': '本季至今',
+    'ytd': '本年至今',
+}
+
+
+class PeriodError(ValueError):
+    """周期参数不合法"""
+
+
+class PeriodSpec:
+    """
+    周期定义（与锚定日无关的部分）
+
+    Attributes:
+        kind: 'day' | 'rolling' | 'mtd' | 'qtd' | 'ytd' | 'custom'
+        days: rolling 的天数
+        start, end: custom 的起止日期（end 可为 None）
+    """
+
+    __slots__ = ('kind', 'days', 'start', 'end')
+
+    def __init__(self, kind, days=None, start=None, end=None):
+        self.kind = kind
+        self.days = days
+        self.start = start
+        self.end = end
+
+    @property
+    def key(self):
+        """周期标识（响应中的 period 字段），如 day / last7d / mtd / custom"""
+        if self.kind == 'rolling':
+            return f'last{self.days}d'
+        return self.kind
+
+    @property
+    def label(self):
+        """周期中文名称"""
+        if self.kind == 'day':
+            return '当日'
+        if self.kind == 'rolling':
+            return f'近{self.days}天'
+        if self.kind == 'custom':
+            return '自定义'
+        return _TO_DATE_LABELS[self.kind]
+
+    def resolve(self, anchor):
+        """
+        按锚定日计算起止日期
+
+        Args:
+            anchor: 锚定日（可被 pd.Timestamp 解析；custom 且指定 end 时不使用）
+
+        Returns:
+            tuple(pd.Timestamp, pd.Timestamp): 规范化到天的 (start, end)
+
+        Raises:
+            PeriodError: end 缺省的自定义区间跨度超过 MAX_ROLLING_DAYS
+        """
+        import pandas as pd
+
+        if self.kind == 'custom':
+            if self.end is not None:
+                return self.start, self.end
+            end = pd.Timestamp(anchor).normalize()
+            _check_span(self.start, end)
+            return self.start, end
+        end = pd.Timestamp(anchor).normalize()
+        if self.kind == 'day':
+            return end, end
+        if self.kind == 'rolling':
+            return end - pd.Timedelta(days=self.days - 1), end
+        if self.kind == 'mtd':
+            return end.replace(day=1), end
+        if self.kind == 'qtd':
+            return end.replace(month=(end.month - 1) // 3 * 3 + 1, day=1), end
+        return end.replace(month=1, day=1), end
+
+    def __str__(self):
+        if self.kind == 'custom':
+            start = self.start.strftime('%Y-%m-%d')
+            end = self.end.strftime('%Y-%m-%d') if self.end is not None else ''
+            return f'{start}~{end}'
+        return self.key
+
+    def __repr__(self):
+        return f'PeriodSpec({self})'
+
+
+class PeriodOffset:
+    """
+    周期偏移（对比周期相对基准周期的位置）
+
+    Attributes:
+        unit: 'previous' | 'd' | 'w' | 'm' | 'q' | 'y'
+        count: 偏移数量（previous 时为 1）
+    """
+
+    __slots__ = ('unit', 'count')
+
+    def __init__(self, unit, count=1):
+        self.unit = unit
+        self.count = count
+
+    @property
+    def code(self):
+        """偏移标识，如 previous / -7d / -1y"""
+        if self.unit == 'previous':
+            return 'previous'
+        return f'-{self.count}{self.unit}'
+
+    @property
+    def label(self):
+        """偏移中文名称，如 上一周期 / 去年同期 / 7天前"""
+        if self.unit == 'previous':
+            return '上一周期'
+        if self.count == 1 and self.unit in _OFFSET_SAME_PERIOD_LABELS:
+            return _OFFSET_SAME_PERIOD_LABELS[self.unit]
+        return f'{self.count}{_OFFSET_UNIT_LABELS[self.unit]}前'
+
+    def shift(self, start, end, align_weekday=True):
+        """
+        计算基准区间 [start, end] 对应的对比区间
+
+        说明：
+        - 天/周偏移与 previous 整体平移，区间长度不变；previous 按星期对齐时平移天数向上取整到整周；
+        - 月/季/年偏移默认按星期对齐：平移天数取日历偏移最接近的整周数（如去年同期为 364 天），
+          对比区间与基准区间长度相同、逐日星期一致；
+        - 不对齐时按日历偏移起始日，对比区间与基准区间长度相同；仅当基准区间为整月
+          （起于月初、止于月末）时对比区间同样止于月末（如整月对比整月，长度随月份天数变化）。
+
+        Returns:
+            tuple(pd.Timestamp, pd.Timestamp)
+
+        Raises:
+            PeriodError: 平移后的日期超出可表示范围
+        """
+        import pandas as pd
+
+        try:
+            shifted = self._shift(pd, start, end, align_weekday)
+        except (OverflowError, ValueError, pd.errors.OutOfBoundsDatetime) as e:
+            if isinstance(e, PeriodError):
+                raise
+            raise PeriodError(f'对比周期 {self.code} 超出可计算的日期范围')
+        # 日历偏移可能得到非纳秒精度的 Timestamp（早于 1677 年），与数据列的 datetime64[ns] 范围保持一致
+        if shifted[0] < pd.Timestamp.min or shifted[1] > pd.Timestamp.max:
+            raise PeriodError(f'对比周期 {self.code} 超出可计算的日期范围')
+        return shifted
+
+    def _shift(self, pd, start, end, align_weekday):
+        if self.unit == 'previous':
+            days = (end - start).days + 1
+            if align_weekday:
+                days = -(-days // 7) * 7
+            delta = pd.Timedelta(days=days)
+            return start - delta, end - delta
+        if self.unit in ('d', 'w'):
+            delta = pd.Timedelta(days=self.count * (7 if self.unit == 'w' else 1))
+            return start - delta, end - delta
+
+        offset = pd.DateOffset(months=self.count * _OFFSET_MONTHS[self.unit])
+        if align_weekday:
+            weeks = max(1, round((end - (end - offset)).days / 7))
+            delta = pd.Timedelta(days=weeks * 7)
+            return start - delta, end - delta
+        shifted_start = start - offset
+        if start.day == 1 and end == end + pd.offsets.MonthEnd(0):
+            return shifted_start, (end - offset) + pd.offsets.MonthEnd(0)
+        return shifted_start, shifted_start + (end - start)
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return f'PeriodOffset({self})'
+
+
+def parse_offset(value):
+    """
+    解析周期偏移
+
+    Args:
+        value: 'previous' / '-7d' / '-1y' / 'yoy' 等字符串，或 PeriodOffset
+
+    Returns:
+        PeriodOffset
+
+    Raises:
+        PeriodError: 参数不合法
+    """
+    if isinstance(value, PeriodOffset):
+        return value
+    if not isinstance(value, str):
+        raise PeriodError('对比周期必须为字符串')
+    text = value.strip().lower()
+    text = _OFFSET_ALIASES.get(text, text)
+    if text == 'previous':
+        return PeriodOffset('previous')
+    match = _OFFSET_PATTERN.match(text)
+    if not match:
+        raise PeriodError(f'不支持的对比周期: {value}')
+    count, unit = int(match.group(1)), match.group(2)
+    limit = _OFFSET_MAX_COUNT[unit]
+    if not 1 <= count <= limit:
+        raise PeriodError(f'偏移数量需在 1~{limit} 之间: {value}')
+    return PeriodOffset(unit, count)
+
+
+def _parse_day(value, name):
+    import pandas as pd
+
+    try:
+        day = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        raise PeriodError(f'{name} 不是有效日期: {value}')
+    if pd.isna(day):
+        raise PeriodError(f'{name} 不是有效日期: {value}')
+    return day.normalize()
+
+
+def _check_span(start, end):
+    """自定义区间跨度校验：不超过 MAX_ROLLING_DAYS 天（与近N天上限一致）"""
+    days = (end - start).days + 1
+    if days > MAX_ROLLING_DAYS:
+        raise PeriodError(f'自定义区间跨度需在 {MAX_ROLLING_DAYS} 天以内: {days} 天')
+
+
+def _rolling(days):
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        raise PeriodError(f'天数必须为整数: {days}')
+    if not 1 <= days <= MAX_ROLLING_DAYS:
+        raise PeriodError(f'天数需在 1~{MAX_ROLLING_DAYS} 之间: {days}')
+    return PeriodSpec('rolling', days=days)
+
+
+def parse_period(value):
+    """
+    解析周期参数
+
+    Args:
+        value: 字符串写法、字典写法或 PeriodSpec
+
+    Returns:
+        PeriodSpec
+
+    Raises:
+        PeriodError: 参数不合法
+    """
+    if isinstance(value, PeriodSpec):
+        return value
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text == 'day':
+            return PeriodSpec('day')
+        if text in _TO_DATE_LABELS:
+            return PeriodSpec(text)
+        match = _ROLLING_PATTERN.match(text)
+        if match:
+            return _rolling(match.group(1))
+        if '~' in text:
+            start, _, end = text.partition('~')
+            return parse_period({'start': start.strip(), 'end': end.strip() or None})
+        raise PeriodError(f'不支持的周期: {value}')
+    if isinstance(value, dict):
+        if value.get('start'):
+            start = _parse_day(value['start'], 'start')
+            end = _parse_day(value['end'], 'end') if value.get('end') else None
+            if end is not None:
+                if end < start:
+                    raise PeriodError('end 不能早于 start')
+                _check_span(start, end)
+            return PeriodSpec('custom', start=start, end=end)
+        if 'days' in value:
+            return _rolling(value['days'])
+        raise PeriodError('自定义周期需提供 start（可选 end）或 days')
+    raise PeriodError('period 必须为字符串或对象')
+
+
+def format_date_range(start, end):
+    """区间展示文本：单日为 'YYYY-MM-DD'，多日为 'YYYY-MM-DD ~ YYYY-MM-DD'"""
+    if start == end:
+        return start.strftime('%Y-%m-%d')
+    return f"{start.strftime('%Y-%m-%d')} ~ {end.strftime('%Y-%m-%d')}"
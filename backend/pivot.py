@@ -0,0 +1,481 @@
+"""
+透视分析 - 任意行维度 × 列维度的分组汇总（POST /api/pivot）
+
+设计说明：
+- 维度为数据中的低基数文本列（机构、团队、业务员、险别、是否类标志等），另提供按投保确认时间派生的
+  时间维度：投保日期 / 投保周（周一起始） / 投保月份；
+- 度量：签单保费、签单数量、手续费含税求和，以及保单件数（保费≥50 的记录数）；
+- 下钻（drill-down）：where 按任意维度取值过滤，前端点击单元格时将其行/列取值并入 where，
+  再追加下一级行维度即可；
+- 计算基于按日聚合索引（见 daily_aggregates.py）：聚合表以 (日, 所需维度) 预先汇总，
+  透视只需对聚合表再分组一次；快照不可用时回退为逐行数据，结果一致；
+- 结果规模受限：列维度取值组合超过上限时返回参数错误；JSON 响应的行数有上限（截断并标记 truncated），
+  大结果通过 ndjson / csv 流式输出，逐块序列化，不在内存中拼接完整响应体。
+pandas 在用到时才导入：api_server 在路由层解析与校验请求，导入本模块不应加载数据处理依赖。
+
+环境变量：
+    PIVOT_MAX_ROWS      JSON 响应返回的最大行数，默认 5000（流式输出不受限）
+    PIVOT_MAX_COLUMNS   列维度取值组合数上限，默认 200
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+
+# 可用作行/列/下钻维度的数据列
+DIMENSIONS = ('三级机构', '四级机构', '团队', '业务员', '险种大类', '险种名称', '单套-险别', '险别组合',
+              '是否续保', '客户类别3', '车险新业务分类', '终端来源', '是否过户车', '是否新能源', '是否异地车',
+              '吨位分段', '签单/批改标识', '批单类型')
+
+# 派生时间维度：名称 -> (粒度, 取值格式)
+TIME_DIMENSIONS = {
+    '投保日期': ('D', '%Y-%m-%d'),
+    '投保周': ('W', '%Y-%m-%d'),
+    '投保月份': ('M', '%Y-%m'),
+}
+
+# 度量 -> 数据列（保单件数为派生度量，见 daily_aggregates.POLICY_COUNT_COLUMN）
+MEASURES = {
+    'premium': '签单/批改保费',
+    'count': '签单数量',
+    'commission': '手续费含税',
+    'policy_count': '保单件数',
+}
+
+MEASURE_LABELS = {
+    'premium': '签单保费',
+    'count': '签单数量',
+    'commission': '手续费含税',
+    'policy_count': '保单件数',
+}
+
+# 行维度与列维度合计数量上限
+MAX_DIMENSIONS = 6
+
+# 单个下钻维度的取值数量上限
+MAX_WHERE_VALUES = 500
+
+DEFAULT_LIMIT = 1000
+DEFAULT_MAX_ROWS = 5000
+DEFAULT_MAX_COLUMNS = 200
+
+OUTPUT_FORMATS = ('json', 'ndjson', 'csv')
+
+# 流式输出每块的行数
+STREAM_CHUNK_ROWS = 1000
+
+
+class PivotError(ValueError):
+    """透视请求不合法"""
+
+
+def max_rows():
+    """JSON 响应的最大行数（环境变量 PIVOT_MAX_ROWS）"""
+    return _env_int('PIVOT_MAX_ROWS', DEFAULT_MAX_ROWS)
+
+
+def max_columns():
+    """列维度取值组合数上限（环境变量 PIVOT_MAX_COLUMNS）"""
+    return _env_int('PIVOT_MAX_COLUMNS', DEFAULT_MAX_COLUMNS)
+
+
+def _env_int(name, default):
+    try:
+        value = int(os.environ.get(name, default))
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+class PivotSpec:
+    """
+    透视定义
+
+    Attributes:
+        rows: 行维度列表
+        columns: 列维度列表
+        measures: 度量列表（MEASURES 的键）
+        where: 下钻条件 {维度: [取值, ...]}，取值 None 表示缺失值
+        sort: 行排序依据：度量名（按行合计）或 'key'（按行维度取值）
+        order: 'desc' | 'asc'
+    """
+
+    __slots__ = ('rows', 'columns', 'measures', 'where', 'sort', 'order')
+
+    def __init__(self, rows=(), columns=(), measures=('premium',), where=None, sort=None, order='desc'):
+        self.rows = list(rows)
+        self.columns = list(columns)
+        self.measures = list(measures)
+        self.where = dict(where or {})
+        self.sort = sort or self.measures[0]
+        self.order = order
+
+    def source_dimensions(self):
+        """需要从数据（聚合表）中读取的维度列：行/列/下钻维度中的非时间维度"""
+        dims = [*self.rows, *self.columns, *self.where]
+        return [d for d in dict.fromkeys(dims) if d not in TIME_DIMENSIONS]
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'columns': self.columns,
+            'measures': self.measures,
+            'where': self.where,
+            'sort': self.sort,
+            'order': self.order,
+        }
+
+    def __str__(self):
+        return json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+
+    def __repr__(self):
+        return f'PivotSpec({self})'
+
+
+def _dimension_list(value, name):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise PivotError(f'{name} 必须为维度名称列表')
+    for dim in value:
+        if dim not in DIMENSIONS and dim not in TIME_DIMENSIONS:
+            raise PivotError(f'不支持的维度: {dim}')
+    return value
+
+
+def _where_values(dim, value):
+    values = value if isinstance(value, list) else [value]
+    if not 1 <= len(values) <= MAX_WHERE_VALUES:
+        raise PivotError(f'下钻维度 {dim} 的取值数量需在 1~{MAX_WHERE_VALUES} 之间')
+    result = []
+    for item in values:
+        if item is not None and not isinstance(item, (str, int, float)):
+            raise PivotError(f'下钻维度 {dim} 的取值必须为字符串、数字或 null')
+        if dim in TIME_DIMENSIONS:
+            fmt = TIME_DIMENSIONS[dim][1]
+            try:
+                datetime.strptime(str(item), fmt)
+            except ValueError:
+                raise PivotError(f'下钻维度 {dim} 的取值格式应为 {fmt}: {item}')
+        result.append(None if item is None else str(item))
+    return result
+
+
+def parse_pivot(value):
+    """
+    解析透视定义
+
+    Args:
+        value: 请求体字典（rows / columns / measures / where / sort / order）或 PivotSpec
+
+    Returns:
+        PivotSpec
+
+    Raises:
+        PivotError: 参数不合法
+    """
+    if isinstance(value, PivotSpec):
+        return value
+    if not isinstance(value, dict):
+        raise PivotError('透视定义必须为对象')
+
+    rows = _dimension_list(value.get('rows'), 'rows')
+    columns = _dimension_list(value.get('columns'), 'columns')
+    dims = rows + columns
+    if len(set(dims)) != len(dims):
+        raise PivotError('行维度与列维度不能重复')
+    if len(dims) > MAX_DIMENSIONS:
+        raise PivotError(f'行维度与列维度合计不能超过 {MAX_DIMENSIONS} 个')
+
+    measures = value.get('measures') or ['premium']
+    if isinstance(measures, str):
+        measures = [measures]
+    if not isinstance(measures, list) or any(m not in MEASURES for m in measures):
+        raise PivotError(f'measures 仅支持 {"/".join(MEASURES)}')
+    measures = list(dict.fromkeys(measures))
+
+    where = value.get('where') or {}
+    if not isinstance(where, dict):
+        raise PivotError('where 必须为对象 {维度: 取值或取值列表}')
+    _dimension_list(list(where), 'where')
+    where = {dim: _where_values(dim, values) for dim, values in where.items()}
+
+    sort = value.get('sort') or measures[0]
+    if sort != 'key' and sort not in measures:
+        raise PivotError('sort 须为已选择的度量或 key')
+    order = value.get('order') or ('asc' if sort == 'key' else 'desc')
+    if order not in ('desc', 'asc'):
+        raise PivotError('order 仅支持 desc/asc')
+
+    return PivotSpec(rows, columns, measures, where, sort, order)
+
+
+def parse_output(value):
+    """
+    解析输出方式
+
+    Args:
+        value: 请求体字典（format / limit）
+
+    Returns:
+        tuple(str, int | None): (输出格式, 行数上限)；json 格式的行数上限不超过 PIVOT_MAX_ROWS，
+        流式格式未指定 limit 时输出全部行
+
+    Raises:
+        PivotError: 参数不合法
+    """
+    fmt = value.get('format', 'json')
+    if fmt not in OUTPUT_FORMATS:
+        raise PivotError(f'format 仅支持 {"/".join(OUTPUT_FORMATS)}')
+    limit = value.get('limit')
+    if limit is not None:
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+            raise PivotError('limit 必须为正整数')
+    if fmt == 'json':
+        limit = min(limit or DEFAULT_LIMIT, max_rows())
+    return fmt, limit
+
+
+def _with_time_dimensions(df, dims):
+    """按投保确认时间追加派生时间维度列（日 / 周一起始的周 / 月初）"""
+    import pandas as pd
+
+    wanted = [d for d in dict.fromkeys(dims) if d in TIME_DIMENSIONS]
+    if not wanted:
+        return df
+    day = df['投保确认时间'].dt.normalize()
+    derived = {}
+    for dim in wanted:
+        unit = TIME_DIMENSIONS[dim][0]
+        if unit == 'D':
+            derived[dim] = day
+        elif unit == 'W':
+            derived[dim] = day - pd.to_timedelta(day.dt.dayofweek, unit='D')
+        else:
+            derived[dim] = day.dt.to_period('M').dt.to_timestamp()
+    return df.assign(**derived)
+
+
+def _apply_where(df, where):
+    """按下钻条件过滤（时间维度的周取值归一到所在周的周一）"""
+    import pandas as pd
+
+    for dim, values in where.items():
+        column = df[dim]
+        if dim in TIME_DIMENSIONS:
+            targets = [pd.Timestamp(v) for v in values]
+            if TIME_DIMENSIONS[dim][0] == 'W':
+                targets = [t - pd.Timedelta(days=t.dayofweek) for t in targets]
+            mask = column.isin(targets)
+        else:
+            mask = column.isin([v for v in values if v is not None])
+            if None in values:
+                mask = mask | column.isna()
+        df = df[mask]
+    return df
+
+
+def _factorize(grouped, dims):
+    """
+    为分组结果的维度组合编号（按维度取值排序，缺失值排在最后）
+
+    Returns:
+        tuple(ndarray, list[tuple]): (每行的组合编号, 各编号对应的取值组合)
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not dims:
+        return np.zeros(len(grouped), dtype=np.intp), [()]
+    codes = grouped.groupby(dims, observed=True, dropna=False, sort=True).ngroup().to_numpy()
+    count = int(codes.max()) + 1 if len(codes) else 0
+    # 各编号首次出现的位置（倒序赋值，保留最小下标）
+    first = np.zeros(count, dtype=np.intp)
+    first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    columns = []
+    for dim in dims:
+        values = grouped[dim].to_numpy()[first]
+        if dim in TIME_DIMENSIONS:
+            stamps = pd.DatetimeIndex(values)
+            text = stamps.strftime(TIME_DIMENSIONS[dim][1])
+            columns.append([None if pd.isna(s) else t for s, t in zip(stamps, text)])
+        else:
+            columns.append([None if pd.isna(v) else (v.item() if hasattr(v, 'item') else v) for v in values])
+    return codes, list(zip(*columns))
+
+
+def build_pivot(df, spec, meta=None):
+    """
+    计算透视表
+
+    Args:
+        df: 已完成口径过滤、筛选与区间截取的数据（聚合表或逐行数据），需包含 spec.source_dimensions() 各列
+        spec: PivotSpec
+        meta: 附加到结果中的说明字段（如统计周期）
+
+    Returns:
+        PivotTable
+
+    Raises:
+        PivotError: 数据中缺少所需维度，或列维度取值组合超过上限
+    """
+    import numpy as np
+    import pandas as pd
+
+    from daily_aggregates import with_policy_count
+
+    missing = [d for d in spec.source_dimensions() if d not in df.columns]
+    if missing:
+        raise PivotError(f'数据中不存在维度: {"、".join(missing)}')
+
+    frame = _with_time_dimensions(df, [*spec.rows, *spec.columns, *spec.where])
+    frame = _apply_where(frame, spec.where)
+    if 'policy_count' in spec.measures:
+        frame = with_policy_count(frame)
+    measure_columns = [MEASURES[m] for m in spec.measures]
+    dims = spec.rows + spec.columns
+    if dims:
+        grouped = frame.groupby(dims, observed=True, dropna=False, sort=False)[measure_columns].sum().reset_index()
+    else:
+        grouped = pd.DataFrame([frame[measure_columns].sum()])
+
+    col_codes, column_keys = _factorize(grouped, spec.columns)
+    limit = max_columns()
+    if len(column_keys) > limit:
+        raise PivotError(f'列维度取值组合过多（{len(column_keys)} > {limit}），请减少列维度或增加下钻条件')
+    row_codes, row_keys = _factorize(grouped, spec.rows)
+
+    values = {}
+    for measure, column in zip(spec.measures, measure_columns):
+        table = np.zeros((len(row_keys), len(column_keys)))
+        table[row_codes, col_codes] = grouped[column].to_numpy(dtype=float)
+        values[measure] = table
+    return PivotTable(spec, row_keys, column_keys, values, meta)
+
+
+class PivotTable:
+    """
+    透视结果：values[度量] 为 (行组合数, 列组合数) 的矩阵，行已按 spec.sort / spec.order 排序
+
+    Attributes:
+        spec: PivotSpec
+        row_keys: 行维度取值组合（已排序）
+        column_keys: 列维度取值组合（无列维度时为 [()]）
+        values: {度量: ndarray}
+        meta: 说明字段（如 period / period_label / date_range）
+    """
+
+    def __init__(self, spec, row_keys, column_keys, values, meta=None):
+        import numpy as np
+
+        self.spec = spec
+        self.column_keys = column_keys
+        self.meta = dict(meta or {})
+        order = np.arange(len(row_keys))
+        if spec.sort != 'key' and len(row_keys):
+            totals = values[spec.sort].sum(axis=1)
+            order = np.argsort(totals if spec.order == 'asc' else -totals, kind='stable')
+        elif spec.order == 'desc':
+            order = order[::-1]
+        self.row_keys = [row_keys[i] for i in order]
+        self.values = {m: table[order] for m, table in values.items()}
+
+    def __len__(self):
+        return len(self.row_keys)
+
+    def _format(self, measure, values):
+        if measure == 'policy_count':
+            return [int(round(v)) for v in values]
+        return [float(v) for v in values]
+
+    def _header(self):
+        """不含行数据的结果字段：维度、度量、列组合、合计与说明字段"""
+        totals = {m: self._format(m, [table.sum()])[0] for m, table in self.values.items()}
+        column_totals = {m: self._format(m, table.sum(axis=0)) for m, table in self.values.items()}
+        return {
+            **self.spec.to_dict(),
+            **self.meta,
+            'column_keys': [list(key) for key in self.column_keys],
+            'column_totals': column_totals,
+            'totals': totals,
+            'total_rows': len(self.row_keys),
+        }
+
+    def iter_rows(self, limit=None, chunk_rows=STREAM_CHUNK_ROWS):
+        """
+        逐行生成 {'key', 'values', 'total'}：按块切片矩阵后批量转换为 Python 数值
+
+        Args:
+            limit: 最多生成的行数（默认全部）
+            chunk_rows: 每块的行数
+        """
+        count = len(self.row_keys) if limit is None else min(limit, len(self.row_keys))
+        for lo in range(0, count, chunk_rows):
+            hi = min(lo + chunk_rows, count)
+            cells = {m: table[lo:hi] for m, table in self.values.items()}
+            rows = {m: [self._format(m, row) for row in block] for m, block in cells.items()}
+            totals = {m: self._format(m, block.sum(axis=1)) for m, block in cells.items()}
+            for i in range(hi - lo):
+                yield {
+                    'key': list(self.row_keys[lo + i]),
+                    'values': {m: rows[m][i] for m in rows},
+                    'total': {m: totals[m][i] for m in totals},
+                }
+
+    def to_dict(self, limit=None):
+        """JSON 响应：最多返回 limit 行，超出时 truncated 为 True"""
+        result = self._header()
+        data = list(self.iter_rows(limit))
+        result['data'] = data
+        result['returned_rows'] = len(data)
+        result['truncated'] = len(data) < len(self.row_keys)
+        return result
+
+    def iter_ndjson(self, limit=None):
+        """流式 NDJSON：首行为 {'meta': 结果字段}，其后每行一个行组合"""
+        yield json.dumps({'meta': self._header()}, ensure_ascii=False) + '\n'
+        lines = []
+        for row in self.iter_rows(limit):
+            lines.append(json.dumps(row, ensure_ascii=False))
+            if len(lines) >= STREAM_CHUNK_ROWS:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    def iter_csv(self, limit=None):
+        """
+        流式 CSV（UTF-8 BOM，Excel 可直接打开）：表头为行维度 + 各度量的列组合与合计，
+        如 '签单保费|续保'、'签单保费|合计'
+        """
+        has_columns = bool(self.spec.columns)
+        header = list(self.spec.rows)
+        for measure in self.spec.measures:
+            label = MEASURE_LABELS[measure]
+            if has_columns:
+                header.extend(f'{label}|{"/".join("" if v is None else str(v) for v in key)}'
+                              for key in self.column_keys)
+            header.append(f'{label}|合计' if has_columns else label)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow(header)
+        for index, row in enumerate(self.iter_rows(limit), start=1):
+            line = ['' if v is None else v for v in row['key']]
+            for measure in self.spec.measures:
+                if has_columns:
+                    line.extend(row['values'][measure])
+                line.append(row['total'][measure])
+            writer.writerow(line)
+            if index % STREAM_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
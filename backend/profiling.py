@@ -0,0 +1,179 @@
+"""
+按请求性能剖析 - 对单个请求采集 cProfile 数据并保存，供下载分析
+
+设计说明：
+- 默认关闭；通过环境变量 PROFILING_ENABLED=1 开启后，请求携带 X-Profile: 1 请求头
+  （或 ?profile=1 查询参数）时对该请求的查询执行过程采集 cProfile；
+- 可设置 PROFILING_TOKEN，要求请求同时携带匹配的 X-Profile-Token，避免任意用户触发剖析；
+- 剖析在查询执行器线程中进行（请求上下文通过 contextvars 传递），结果以 pstats 格式保存到
+  PROFILING_DIR，仅保留最近 PROFILING_KEEP 份；
+- 同一进程内同一时刻只剖析一个请求（Python 3.12+ 的 cProfile 不允许多个剖析器同时启用），
+  其余请求照常执行，不受影响。
+"""
+
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+
+# 剖析文件编号格式：时间戳_路由_随机串（仅允许安全字符，防止路径穿越）
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}_[0-9]{6}_[A-Za-z0-9_-]+$')
+
+DEFAULT_KEEP = 50
+
+# 文本报告可用的排序字段（pstats 支持的字段名）与行数上限
+REPORT_SORT_KEYS = tuple(sorted(pstats.Stats.sort_arg_dict_default))
+MAX_REPORT_LIMIT = 1000
+
+_active_session = contextvars.ContextVar('profiling_session', default=None)
+
+
+class _ProfileSession:
+    """单个请求的剖析会话"""
+
+    __slots__ = ('profile', 'used')
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.used = False
+
+
+class RequestProfiler:
+    """
+    请求级性能剖析器
+
+    Args:
+        enabled: 是否允许剖析
+        output_dir: 剖析文件保存目录
+        token: 可选访问令牌；设置后请求需携带匹配的 X-Profile-Token
+        keep: 保留的剖析文件数量
+    """
+
+    def __init__(self, enabled=False, output_dir='data/profiles', token=None, keep=DEFAULT_KEEP):
+        self.enabled = enabled
+        self.output_dir = Path(output_dir)
+        self.token = token
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, project_root):
+        """从环境变量读取配置；相对目录以项目根目录为基准"""
+        output_dir = Path(os.environ.get('PROFILING_DIR') or 'data/profiles')
+        if not output_dir.is_absolute():
+            output_dir = Path(project_root) / output_dir
+        return cls(
+            enabled=os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes'),
+            output_dir=output_dir,
+            token=os.environ.get('PROFILING_TOKEN') or None,
+            keep=int(os.environ.get('PROFILING_KEEP') or DEFAULT_KEEP),
+        )
+
+    def requested(self, headers, args):
+        """判断当前请求是否要求剖析（需已开启且令牌匹配）"""
+        if not self.enabled:
+            return False
+        flag = headers.get('X-Profile') or args.get('profile')
+        if str(flag or '').lower() not in ('1', 'true', 'yes'):
+            return False
+        return self.token is None or headers.get('X-Profile-Token') == self.token
+
+    def start(self):
+        """
+        为当前请求开启剖析会话
+
+        Returns:
+            bool: 是否成功开启（已有请求在剖析时返回 False）
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        _active_session.set(_ProfileSession())
+        return True
+
+    def call(self, fn, *args, **kwargs):
+        """执行查询函数；当前请求处于剖析会话中时在 cProfile 下运行"""
+        session = _active_session.get()
+        if session is None or session.used:
+            return fn(*args, **kwargs)
+        session.used = True
+        try:
+            session.profile.enable()
+        except ValueError:
+            # 其他剖析工具已启用（如调试器），放弃本次剖析
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.profile.disable()
+
+    def finish(self, route, save=True):
+        """
+        结束当前请求的剖析会话并保存结果
+
+        Args:
+            route: 路由（用于文件命名）
+            save: 是否保存（查询超时时剖析仍在执行器线程中运行，应放弃保存）
+
+        Returns:
+            str | None: 剖析编号；未采集到数据时返回 None
+        """
+        session = _active_session.get()
+        if session is None:
+            return None
+        _active_session.set(None)
+        try:
+            if not (save and session.used):
+                return None
+            slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+            profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{slug}_{uuid.uuid4().hex[:6]}"
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            session.profile.dump_stats(str(self.output_dir / f'{profile_id}.prof'))
+            self._prune()
+            return profile_id
+        finally:
+            self._lock.release()
+
+    def _prune(self):
+        """仅保留最近 keep 份剖析文件"""
+        files = sorted(self.output_dir.glob('*.prof'), key=lambda p: p.name, reverse=True)
+        for stale in files[self.keep:]:
+            try:
+                stale.unlink()
+            except OSError:
+                pass
+
+    def list_profiles(self):
+        """列出已保存的剖析文件（最新在前）"""
+        if not self.output_dir.exists():
+            return []
+        result = []
+        for path in sorted(self.output_dir.glob('*.prof'), key=lambda p: p.name, reverse=True):
+            st = path.stat()
+            result.append({
+                'id': path.stem,
+                'size': st.st_size,
+                'created_at': datetime.fromtimestamp(st.st_mtime).isoformat(timespec='seconds'),
+            })
+        return result
+
+    def profile_path(self, profile_id):
+        """剖析编号对应的文件路径；编号非法或文件不存在时返回 None"""
+        if not PROFILE_ID_PATTERN.match(profile_id or ''):
+            return None
+        path = self.output_dir / f'{profile_id}.prof'
+        return path if path.exists() else None
+
+    @staticmethod
+    def text_report(path, sort='cumulative', limit=50):
+        """生成 pstats 文本报告（按 sort 排序，取前 limit 行）"""
+        buffer = io.StringIO()
+        stats = pstats.Stats(str(path), stream=buffer)
+        stats.sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
@@ -0,0 +1,185 @@
+"""
+查询执行器 - 将 DataProcessor 查询放入有界线程池执行，并施加请求级超时
+
+设计说明：
+- 按“通道”（lane）划分线程池：重查询（全表筛选/聚合）与轻查询（日索引命中）各自独立，
+  重查询排队时不会占满轻查询的线程，保证轻量面板始终可响应。
+- 每个请求有截止时间（deadline）：排队与执行时间合计超过截止时间即返回超时，
+  由路由层转换为 503；尚未开始执行的任务会被取消，避免无效计算。
+- 已开始执行的任务无法中断，超时后仍占用通道线程直至完成。为避免积压，每个通道限制
+  在途任务数（执行中 + 排队，上限为并发数 + 排队上限），并跟踪超时后仍在执行的任务：
+  在途任务已满，或通道线程全部被超时任务占用时，新请求立即被拒绝（QueryRejected，同样返回 503），
+  不再排队等到超时。
+- pandas/numpy 的大部分重计算会释放 GIL，多线程可以有效利用多核。
+- 线程池在首次使用时按进程惰性创建，兼容 gunicorn preload 后 fork 的工作进程。
+- 任务在提交线程的上下文副本中运行（contextvars），请求级的阶段计时与性能剖析可跨线程生效；
+  排队等待时间记为 queue 阶段。
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from metrics import record_stage
+
+
+# 默认通道与并发上限（可通过环境变量 QUERY_<LANE>_CONCURRENCY 覆盖）
+DEFAULT_LANES = {
+    'heavy': 2,
+    'light': 8,
+}
+
+# 默认每个通道的排队上限（不含执行中的任务），可通过环境变量 QUERY_<LANE>_QUEUE 覆盖；0 表示不排队
+DEFAULT_QUEUE_LIMITS = {
+    'heavy': 8,
+    'light': 32,
+}
+
+# 默认请求截止时间（秒），可通过环境变量 QUERY_TIMEOUT_SECONDS 覆盖
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+
+class QueryTimeout(Exception):
+    """查询在截止时间内未完成"""
+
+    def __init__(self, lane, timeout):
+        super().__init__(f'查询超时（{timeout:g}秒）')
+        self.lane = lane
+        self.timeout = timeout
+
+
+class QueryRejected(QueryTimeout):
+    """通道已满（在途任务达到上限，或线程被超时任务占满），请求未执行即被拒绝"""
+
+    def __init__(self, lane, timeout):
+        Exception.__init__(self, f'查询通道已满（{lane}）')
+        self.lane = lane
+        self.timeout = timeout
+
+
+class QueryExecutor:
+    """
+    分通道的有界查询执行器
+
+    Args:
+        lanes: {通道名: 最大并发数}
+        default_timeout: 默认截止时间（秒）；<=0 表示不限时
+        queue_limits: {通道名: 排队上限}，未列出的通道使用 DEFAULT_QUEUE_LIMITS（缺省为 0）
+    """
+
+    def __init__(self, lanes=None, default_timeout=DEFAULT_TIMEOUT_SECONDS, queue_limits=None):
+        self.lanes = dict(lanes or DEFAULT_LANES)
+        self.default_timeout = default_timeout
+        self.queue_limits = {
+            lane: max(0, int((queue_limits or {}).get(lane, DEFAULT_QUEUE_LIMITS.get(lane, 0))))
+            for lane in self.lanes
+        }
+        self._pools = {}
+        self._inflight = {}
+        self._orphaned = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取配置构建执行器"""
+        lanes = {
+            lane: int(os.environ.get(f'QUERY_{lane.upper()}_CONCURRENCY') or limit)
+            for lane, limit in DEFAULT_LANES.items()
+        }
+        queue_limits = {
+            lane: int(os.environ.get(f'QUERY_{lane.upper()}_QUEUE') or limit)
+            for lane, limit in DEFAULT_QUEUE_LIMITS.items()
+        }
+        timeout = float(os.environ.get('QUERY_TIMEOUT_SECONDS') or DEFAULT_TIMEOUT_SECONDS)
+        return cls(lanes=lanes, default_timeout=timeout, queue_limits=queue_limits)
+
+    def _pool(self, lane):
+        """获取通道对应的线程池（fork 后的子进程会重新创建）"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pools = {}
+                self._inflight = {}
+                self._orphaned = {}
+                self._pid = os.getpid()
+            pool = self._pools.get(lane)
+            if pool is None:
+                if lane not in self.lanes:
+                    raise ValueError(f'未知的查询通道: {lane}')
+                pool = ThreadPoolExecutor(
+                    max_workers=max(1, self.lanes[lane]),
+                    thread_name_prefix=f'query-{lane}',
+                )
+                self._pools[lane] = pool
+            return pool
+
+    def _admit(self, lane, limit):
+        """登记一个在途任务；通道已满时抛出 QueryRejected"""
+        workers = max(1, self.lanes[lane])
+        with self._lock:
+            inflight = self._inflight.get(lane, 0)
+            if (self._orphaned.get(lane, 0) >= workers
+                    or inflight >= workers + self.queue_limits[lane]):
+                raise QueryRejected(lane, limit)
+            self._inflight[lane] = inflight + 1
+
+    def _release(self, lane, state):
+        """任务结束（完成、失败或被取消）时注销在途任务"""
+        with self._lock:
+            state['done'] = True
+            self._inflight[lane] -= 1
+            if state['orphaned']:
+                self._orphaned[lane] -= 1
+
+    def _orphan(self, lane, state):
+        """超时后仍在执行的任务记为孤儿任务，直至完成"""
+        with self._lock:
+            if not state['done']:
+                state['orphaned'] = True
+                self._orphaned[lane] = self._orphaned.get(lane, 0) + 1
+
+    def run(self, lane, fn, *args, timeout=None, **kwargs):
+        """
+        在指定通道执行查询并等待结果
+
+        Args:
+            lane: 通道名（'heavy' / 'light'）
+            fn: 查询函数
+            timeout: 本次请求的截止时间（秒），默认使用执行器配置；不得超过配置值
+
+        Returns:
+            fn 的返回值
+
+        Raises:
+            QueryTimeout: 排队加执行时间超过截止时间
+            QueryRejected: 通道已满，请求未执行（QueryTimeout 的子类）
+        """
+        limit = self.default_timeout
+        if timeout is not None and timeout > 0:
+            limit = min(timeout, limit) if limit and limit > 0 else timeout
+
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def task():
+            record_stage('queue', time.perf_counter() - submitted)
+            return fn(*args, **kwargs)
+
+        pool = self._pool(lane)
+        self._admit(lane, limit)
+        state = {'done': False, 'orphaned': False}
+        try:
+            future = pool.submit(context.run, task)
+        except BaseException:
+            self._release(lane, state)
+            raise
+        future.add_done_callback(lambda _: self._release(lane, state))
+        try:
+            return future.result(timeout=limit if limit and limit > 0 else None)
+        except FutureTimeoutError:
+            # 仍在排队的任务直接取消；已开始执行的任务无法中断，记为孤儿任务直至完成，结果丢弃
+            if not future.cancel():
+                self._orphan(lane, state)
+            raise QueryTimeout(lane, limit)
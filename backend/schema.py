@@ -0,0 +1,145 @@
+"""
+合并数据列类型声明 - 统一入库与读取时的列类型，压缩内存占用
+
+设计说明：
+- 低基数文本列（机构、团队、业务员、险别、是否类标志等）转换为 category：
+  每个取值只保存一次，每行仅占 1~2 字节编码，替代逐行的 Python 字符串对象；
+- 高基数标识列（保单号）在安装了 pyarrow 时使用 Arrow 字符串（连续内存），否则保持 object；
+- 金额与件数列默认 float64（保证汇总结果与历史口径一致），可通过环境变量
+  DATA_MEASURE_DTYPE=float32 降为单精度以进一步减半内存；
+- 未声明的列保持 pandas 默认推断（例如 '险种代码' 会被解析为整数，相关判定口径依赖这一行为，不在此变更）。
+
+环境变量：
+    DATA_MEASURE_DTYPE   金额/件数列类型：float64（默认）| float32
+    DATA_ARROW_STRINGS   标识列是否使用 Arrow 字符串：auto（默认，pyarrow 可用时启用）| 0
+"""
+
+import os
+
+import pandas as pd
+
+
+DATE_COLUMN = '投保确认时间'
+
+# 列类型声明：category=低基数文本，id=高基数标识，measure=金额/件数，datetime=日期时间
+COLUMN_SCHEMA = {
+    '投保确认时间': 'datetime',
+    '刷新时间': 'category',
+    '保险起期': 'category',
+    '三级机构': 'category',
+    '四级机构': 'category',
+    '团队': 'category',
+    '业务员': 'category',
+    '保单号': 'id',
+    '险种大类': 'category',
+    '险种名称': 'category',
+    '单套-险别': 'category',
+    '险别组合': 'category',
+    '是否续保': 'category',
+    '客户类别3': 'category',
+    '车险新业务分类': 'category',
+    '终端来源': 'category',
+    '是否过户车': 'category',
+    '是否新能源': 'category',
+    '是否异地车': 'category',
+    '吨位分段': 'category',
+    '签单/批改标识': 'category',
+    '批单类型': 'category',
+    '签单/批改保费': 'measure',
+    '签单数量': 'measure',
+    '手续费': 'measure',
+    '手续费含税': 'measure',
+    '增值税': 'measure',
+}
+
+ALLOWED_MEASURE_DTYPES = ('float64', 'float32')
+
+
+def measure_dtype():
+    """金额/件数列的目标类型（环境变量 DATA_MEASURE_DTYPE，默认 float64）"""
+    value = (os.environ.get('DATA_MEASURE_DTYPE') or 'float64').lower()
+    return value if value in ALLOWED_MEASURE_DTYPES else 'float64'
+
+
+def id_dtype():
+    """标识列的目标类型：pyarrow 可用且未禁用时为 Arrow 字符串，否则为 object"""
+    if os.environ.get('DATA_ARROW_STRINGS', 'auto').lower() in ('0', 'false', 'no'):
+        return object
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return object
+    return 'string[pyarrow]'
+
+
+def read_csv_dtypes(columns=None):
+    """
+    生成 read_csv 的 dtype 参数：文本列在解析时直接构建为 category / Arrow 字符串，
+    避免先生成大量 Python 字符串对象再转换
+
+    Args:
+        columns: 只为这些列生成（默认全部声明列）
+    """
+    ids = id_dtype()
+    dtypes = {}
+    for name, kind in COLUMN_SCHEMA.items():
+        if columns is not None and name not in columns:
+            continue
+        if kind == 'category':
+            dtypes[name] = 'category'
+        elif kind == 'id' and ids is not object:
+            dtypes[name] = ids
+    return dtypes
+
+
+def apply_schema(df):
+    """
+    按声明转换 DataFrame 列类型（入库清洗后与读取合并CSV后均调用）
+
+    说明：
+    - 文本列转换为 category / Arrow 字符串（已是目标类型时跳过）；
+    - 金额/件数列仅在已是浮点类型时转换精度（整数列与含非数值内容的列保持原样，输出CSV格式不变）；
+    - 日期列由调用方负责解析（保持各处 errors='coerce' 口径一致）。
+
+    Returns:
+        DataFrame: 原对象（就地替换列）
+    """
+    ids = id_dtype()
+    measures = measure_dtype()
+    for name, kind in COLUMN_SCHEMA.items():
+        if name not in df.columns:
+            continue
+        series = df[name]
+        if kind == 'category':
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[name] = series.astype('category')
+        elif kind == 'id':
+            if ids is not object and str(series.dtype) != ids:
+                df[name] = series.astype(ids)
+        elif kind == 'measure':
+            if pd.api.types.is_float_dtype(series.dtype) and str(series.dtype) != measures:
+                df[name] = series.astype(measures)
+    return df
+
+
+def align_categories(frames):
+    """
+    统一多个 DataFrame 中同名 category 列的类别集合，使 pd.concat 后仍保持 category
+    （类别不一致时 concat 会退化为 object，内存成倍增加）
+
+    Returns:
+        list[DataFrame]: 对齐后的 DataFrame（就地替换列）
+    """
+    frames = list(frames)
+    for name, kind in COLUMN_SCHEMA.items():
+        if kind != 'category':
+            continue
+        present = [df for df in frames if name in df.columns]
+        if len(present) < 2 or not all(isinstance(df[name].dtype, pd.CategoricalDtype) for df in present):
+            continue
+        categories = pd.Index([])
+        for df in present:
+            categories = categories.union(df[name].cat.categories, sort=False)
+        for df in present:
+            df[name] = df[name].cat.set_categories(categories)
+    return frames
@@ -0,0 +1,149 @@
+"""
+生产服务启动器 - 多进程 + 多线程部署 api_server，并共享只读列式快照
+
+设计说明：
+- 启动前在主进程中确保列式快照与合并CSV一致（必要时重建），随后派生的所有工作进程
+  以 mmap 方式打开同一份快照文件，共享操作系统页缓存，内存占用不随进程数线性增长。
+- 使用 gunicorn（gthread 工作模式）承载 Flask 应用，工作进程数与线程数均可配置。
+- gunicorn 不可用（例如 Windows）时回退到 Flask 内置多线程服务器，仅用于单进程部署。
+
+用法：
+    python backend/serve.py --workers 4 --threads 8 --port 5001
+
+环境变量（命令行参数优先）：
+    API_HOST            监听地址，默认 0.0.0.0
+    API_PORT / PORT     监听端口，默认 5001
+    API_WORKERS         工作进程数，默认 CPU 核数（最多 8）
+    API_THREADS         每个工作进程的线程数，默认 4（同时限制每进程 SSE 订阅数不超过 线程数 - 1）
+    API_WORKER_TIMEOUT  工作进程无响应超时（秒），默认 120
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# 确保能找到模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _default_workers():
+    """默认工作进程数：CPU 核数，上限 8（查询以内存带宽为主，过多进程收益有限）"""
+    return min(os.cpu_count() or 1, 8)
+
+
+def parse_args(argv=None):
+    """解析命令行参数，未指定时从环境变量读取默认值"""
+    parser = argparse.ArgumentParser(description='车险签单数据分析平台 - 生产服务启动器')
+    parser.add_argument('--host', default=os.environ.get('API_HOST', '0.0.0.0'), help='监听地址')
+    parser.add_argument('--port', type=int,
+                        default=int(os.environ.get('API_PORT') or os.environ.get('PORT') or '5001'),
+                        help='监听端口')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('API_WORKERS') or _default_workers()),
+                        help='工作进程数')
+    parser.add_argument('--threads', type=int,
+                        default=int(os.environ.get('API_THREADS') or '4'),
+                        help='每个工作进程的线程数')
+    parser.add_argument('--timeout', type=int,
+                        default=int(os.environ.get('API_WORKER_TIMEOUT') or '120'),
+                        help='工作进程无响应超时（秒）')
+    parser.add_argument('--skip-snapshot', action='store_true',
+                        help='跳过启动前的快照校验/构建')
+    return parser.parse_args(argv)
+
+
+def prepare_snapshot():
+    """
+    在派生工作进程前确保列式快照可用
+
+    Returns:
+        str | None: 当前快照版本号；合并CSV不存在时返回 None
+    """
+    from data_processor import DataProcessor
+    from warmup import WarmupCache
+
+    processor = DataProcessor()
+    version = processor.ensure_snapshot()
+    if version:
+        print(f"📦 列式快照就绪: {version}")
+        # 预计算默认面板响应并保存到快照版本目录，工作进程启动预热时直接读取
+        warmup = WarmupCache.from_env(processor)
+        if warmup.enabled:
+            warmup.warm()
+            print(f"🔥 默认面板预热完成: {warmup.status()['entries']} 项，耗时 {warmup.seconds:.1f}s")
+    else:
+        print("⚠️  未找到合并CSV，跳过快照构建（刷新数据后自动生成）")
+    return version
+
+
+def run_gunicorn(args):
+    """使用 gunicorn 启动多进程服务；gunicorn 不可用时返回 False"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        return False
+
+    class StandaloneApplication(BaseApplication):
+        """以代码方式配置 gunicorn，避免额外的配置文件"""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from api_server import app
+            return app
+
+    def post_fork(server, worker):
+        """工作进程派生后立即启动预热（后台线程不会随 fork 继承，须在工作进程中启动）"""
+        from api_server import start_warmup
+        start_warmup()
+
+    # gthread 模式下 SSE 订阅占用请求线程：应用加载前写入线程数，订阅上限据此取 线程数 - 1
+    os.environ['API_THREADS'] = str(args.threads)
+
+    options = {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+        # 应用在主进程中加载一次，工作进程通过 fork 共享已导入模块的内存页
+        'preload_app': True,
+        'accesslog': '-',
+        'post_fork': post_fork,
+    }
+    StandaloneApplication(options).run()
+    return True
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 70)
+    print("🚀 车险签单数据分析平台 - 生产服务")
+    print("=" * 70)
+    print(f"📡 监听地址: http://{args.host}:{args.port}")
+    print(f"⚙️  工作进程: {args.workers}  线程/进程: {args.threads}")
+
+    if not args.skip_snapshot:
+        prepare_snapshot()
+
+    if run_gunicorn(args):
+        return 0
+
+    # 回退：gunicorn 不可用时使用 Flask 内置多线程服务器（单进程）
+    print("⚠️  未安装 gunicorn（或当前平台不支持），回退为单进程多线程模式")
+    from api_server import app, start_warmup
+    start_warmup()
+    app.run(host=args.host, port=args.port, threaded=True, debug=False)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,318 @@
+"""
+列式快照模块 - 将合并CSV转换为只读、可内存映射(mmap)的列式快照
+
+设计说明：
+- 每一列单独保存为 .npy 文件，查询时以 mmap_mode='r' 打开，多个工作进程共享同一份
+  操作系统页缓存，避免每个进程各自解析 CSV 造成 N 倍内存占用。
+- 文本列采用字典编码（整数编码 + 类别表），数值列与日期列直接保存原始数组。
+- 额外构建“按日行号索引”（day index），按日期区间定位行号时无需扫描整列。
+- 每次构建生成新的版本目录，最后通过原子替换 CURRENT 指针文件切换版本，
+  正在读取旧版本的进程不受影响。
+"""
+
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# 快照格式版本：结构不兼容变更时递增，旧版本快照将被视为不可用
+SNAPSHOT_FORMAT_VERSION = 1
+
+# 保留的历史版本数量（含当前版本），供仍在读取旧版本的进程平滑过渡
+KEEP_VERSIONS = 2
+
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+
+def source_signature(path):
+    """
+    计算源文件签名（大小 + 修改时间），用于判断快照是否与合并CSV一致
+
+    Returns:
+        dict | None: {'size': int, 'mtime_ns': int}；文件不存在时返回 None
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _codes_dtype(n_categories):
+    """
+    与 pandas 内部一致的编码整型选择，保证 Categorical.from_codes 不会复制 mmap 数组
+    """
+    if n_categories < np.iinfo(np.int8).max:
+        return np.int8
+    if n_categories < np.iinfo(np.int16).max:
+        return np.int16
+    if n_categories < np.iinfo(np.int32).max:
+        return np.int32
+    return np.int64
+
+
+class Snapshot:
+    """
+    已打开的只读快照
+
+    说明：
+    - 列数组以 mmap 方式按需加载并缓存，同一进程内多次查询复用同一映射；
+    - to_frame() 每次返回新的 DataFrame 外壳，但底层数组与 mmap 共享，不发生复制。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"快照格式版本不兼容: {self.manifest.get('format_version')}")
+
+        self.version = self.manifest['version']
+        self.row_count = int(self.manifest['row_count'])
+        self.columns = [c['name'] for c in self.manifest['columns']]
+        self._column_meta = {c['name']: c for c in self.manifest['columns']}
+        self._arrays = {}
+
+        index_meta = self.manifest.get('day_index')
+        if index_meta:
+            self._day_values = np.load(self.path / index_meta['days'], mmap_mode='r')
+            self._day_offsets = np.load(self.path / index_meta['offsets'], mmap_mode='r')
+            self._day_rows = np.load(self.path / index_meta['rows'], mmap_mode='r')
+        else:
+            self._day_values = None
+            self._day_offsets = None
+            self._day_rows = None
+
+    def matches_source(self, csv_path):
+        """判断快照是否与当前合并CSV一致（文件大小与修改时间均相同）"""
+        return self.manifest.get('source') == source_signature(csv_path)
+
+    def _column_array(self, name):
+        """
+        获取列数组（mmap）；文本列返回 Categorical，日期列返回 datetime64[ns] 视图
+        """
+        arr = self._arrays.get(name)
+        if arr is not None:
+            return arr
+
+        meta = self._column_meta[name]
+        raw = np.load(self.path / meta['file'], mmap_mode='r')
+        if meta['kind'] == 'category':
+            dtype = pd.CategoricalDtype(categories=meta['categories'])
+            arr = pd.Categorical.from_codes(raw, dtype=dtype, validate=False)
+        elif meta['kind'] == 'datetime':
+            arr = raw.view('datetime64[ns]')
+        else:
+            arr = raw
+        self._arrays[name] = arr
+        return arr
+
+    def to_frame(self, columns=None, rows=None):
+        """
+        构建 DataFrame
+
+        Args:
+            columns: 需要的列（默认全部列，按快照列顺序）
+            rows: 行号数组（默认全部行）；指定时只取这些行并保留原始行号作为索引
+
+        Returns:
+            DataFrame: 全量读取时与 mmap 零拷贝共享内存
+        """
+        names = self.columns if columns is None else [c for c in self.columns if c in set(columns)]
+        data = {}
+        for name in names:
+            arr = self._column_array(name)
+            if rows is not None:
+                arr = arr.take(rows)
+            data[name] = arr
+        index = pd.RangeIndex(self.row_count) if rows is None else pd.Index(rows)
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def rows_between(self, start, end):
+        """
+        按日行号索引获取 [start, end] 日期闭区间内的行号（保持原始行顺序）
+
+        Args:
+            start, end: 可被 pd.Timestamp 解析的日期；仅比较到“天”
+
+        Returns:
+            np.ndarray | None: 行号数组；快照无日索引时返回 None
+        """
+        if self._day_values is None:
+            return None
+        start_day = np.datetime64(pd.Timestamp(start).normalize(), 'D').astype(np.int64)
+        end_day = np.datetime64(pd.Timestamp(end).normalize(), 'D').astype(np.int64)
+        lo = int(np.searchsorted(self._day_values, start_day, side='left'))
+        hi = int(np.searchsorted(self._day_values, end_day, side='right'))
+        if hi <= lo:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self._day_rows[self._day_offsets[lo]:self._day_offsets[hi]])
+
+    def latest_day(self):
+        """返回数据中的最新日期（pd.Timestamp，已规范化到天）；无数据时返回 None"""
+        if self._day_values is None or len(self._day_values) == 0:
+            return None
+        return pd.Timestamp(np.datetime64(int(self._day_values[-1]), 'D'))
+
+
+class SnapshotStore:
+    """
+    快照存储目录管理：构建新版本、读取当前版本、清理旧版本
+
+    目录结构：
+        <root>/CURRENT                当前版本号（单行文本）
+        <root>/<version>/manifest.json
+        <root>/<version>/col_000.npy ...
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = Path(root_dir)
+
+    def current_version(self):
+        """读取 CURRENT 指针；不存在或为空时返回 None"""
+        try:
+            version = (self.root_dir / CURRENT_FILE).read_text(encoding='utf-8').strip()
+        except OSError:
+            return None
+        if not version or not (self.root_dir / version / MANIFEST_FILE).exists():
+            return None
+        return version
+
+    def open(self, version=None):
+        """打开指定版本（默认当前版本）的快照；无可用快照时返回 None"""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        return Snapshot(self.root_dir / version)
+
+    def write_artifact(self, version, name, data):
+        """
+        在版本目录下保存派生结果（JSON），如预计算的默认KPI
+
+        说明：先写临时文件再原子替换，并发读取方不会读到半写入的内容；
+        版本目录被清理时派生结果随之删除，无需单独失效。
+        """
+        target = self.root_dir / version / name
+        tmp = target.with_name(f'.{name}.{uuid.uuid4().hex[:8]}')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, target)
+
+    def read_artifact(self, version, name):
+        """读取版本目录下的派生结果；不存在或损坏时返回 None"""
+        try:
+            with open(self.root_dir / version / name, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def build(self, df, source_path, date_column='投保确认时间'):
+        """
+        由 DataFrame 构建新版本快照并切换 CURRENT 指针
+
+        Args:
+            df: 合并后的完整数据（date_column 需已转换为 datetime）
+            source_path: 合并CSV路径（记录其签名用于新鲜度校验）
+            date_column: 构建日索引所依据的日期列
+
+        Returns:
+            str: 新版本号
+        """
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        version = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        tmp_dir = self.root_dir / f'.tmp_{version}'
+        tmp_dir.mkdir()
+
+        try:
+            columns_meta = []
+            for i, name in enumerate(df.columns):
+                file_name = f'col_{i:03d}.npy'
+                meta = {'name': str(name), 'file': file_name}
+                series = df[name]
+                if pd.api.types.is_datetime64_any_dtype(series.dtype):
+                    values = series.astype('datetime64[ns]').to_numpy().view(np.int64)
+                    meta['kind'] = 'datetime'
+                elif pd.api.types.is_bool_dtype(series.dtype) or (
+                        pd.api.types.is_numeric_dtype(series.dtype)
+                        and not isinstance(series.dtype, pd.CategoricalDtype)):
+                    values = series.to_numpy()
+                    meta['kind'] = 'numeric'
+                else:
+                    codes, uniques = pd.factorize(series, sort=True)
+                    values = codes.astype(_codes_dtype(len(uniques)))
+                    meta['kind'] = 'category'
+                    meta['categories'] = [str(v) for v in uniques]
+                meta['dtype'] = str(values.dtype)
+                np.save(tmp_dir / file_name, np.ascontiguousarray(values))
+                columns_meta.append(meta)
+
+            day_index = None
+            if date_column in df.columns:
+                day_index = self._build_day_index(df[date_column], tmp_dir)
+
+            manifest = {
+                'format_version': SNAPSHOT_FORMAT_VERSION,
+                'version': version,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'row_count': int(len(df)),
+                'source': source_signature(source_path),
+                'date_column': date_column,
+                'columns': columns_meta,
+                'day_index': day_index,
+            }
+            with open(tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+
+            os.replace(tmp_dir, self.root_dir / version)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        # 原子切换 CURRENT 指针：先写临时文件再替换
+        pointer_tmp = self.root_dir / f'.{CURRENT_FILE}.{version}'
+        pointer_tmp.write_text(version, encoding='utf-8')
+        os.replace(pointer_tmp, self.root_dir / CURRENT_FILE)
+
+        self._prune(keep=version)
+        return version
+
+    @staticmethod
+    def _build_day_index(date_series, out_dir):
+        """
+        构建按日行号索引：
+        - days: 出现过的日期（自纪元起的天数，升序）
+        - offsets: 每个日期在 rows 中的起始位置（长度 = len(days) + 1）
+        - rows: 按日期稳定排序后的行号
+        """
+        ts = pd.to_datetime(date_series, errors='coerce').to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(ts)
+        row_ids = np.flatnonzero(valid)
+        day_values = ts[valid].astype('datetime64[D]').astype(np.int64)
+
+        order = np.argsort(day_values, kind='stable')
+        sorted_days = day_values[order]
+        days, starts = np.unique(sorted_days, return_index=True)
+        offsets = np.append(starts, len(sorted_days)).astype(np.int64)
+
+        np.save(out_dir / 'index_days.npy', days.astype(np.int64))
+        np.save(out_dir / 'index_offsets.npy', offsets)
+        np.save(out_dir / 'index_rows.npy', row_ids[order].astype(np.int64))
+        return {'days': 'index_days.npy', 'offsets': 'index_offsets.npy', 'rows': 'index_rows.npy'}
+
+    def _prune(self, keep):
+        """清理过旧的版本目录，仅保留最近 KEEP_VERSIONS 个（含当前版本）"""
+        versions = sorted(
+            p.name for p in self.root_dir.iterdir()
+            if p.is_dir() and not p.name.startswith('.') and (p / MANIFEST_FILE).exists()
+        )
+        stale = [v for v in versions if v != keep][:-(KEEP_VERSIONS - 1) or None]
+        for name in stale:
+            # Windows 下被映射中的文件无法删除，忽略错误留待下次清理
+            shutil.rmtree(self.root_dir / name, ignore_errors=True)
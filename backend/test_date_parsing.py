@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+测试日期列解析与原逐行解析的一致性
+
+函数级中文注释：
+- 目的：parse_days / parse_dates 替代了逐行 try/except 的 parse_dt（归档日报工具）与逐值 pd.to_datetime，
+  固定一组混合格式的取值（超出 datetime64[ns] 范围的占位日期、混用 UTC 偏移、无法解析的值等），
+  逐批与原实现比对，防止整列解析的结果偏离逐行口径；
+- 同一取值在不同批次组合中（是否与其他格式/时区偏移同批）结果应保持一致。
+"""
+
+import random
+import sys
+import warnings
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 确保能找到后端模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+from date_parsing import parse_dates, parse_days
+
+
+def parse_dt(x):
+    """原归档日报工具的逐行解析（基准实现，保持原样）"""
+    if pd.isna(x):
+        return None
+    try:
+        return pd.to_datetime(x).date()
+    except Exception:
+        for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%m/%d/%Y"):
+            try:
+                return datetime.strptime(str(x), fmt).date()
+            except Exception:
+                continue
+        return None
+
+
+def to_datetime_each(x):
+    """逐值 pd.to_datetime（带时区的取本地时刻），无法解析或超出范围时为 NaT"""
+    try:
+        value = pd.to_datetime(x, errors='coerce')
+    except (TypeError, ValueError, OverflowError):
+        return pd.NaT
+    if not isinstance(value, pd.Timestamp):
+        return pd.NaT
+    return value.tz_localize(None) if value.tzinfo is not None else value
+
+
+# 混合格式样例：常见格式、时刻、带时区（含混用偏移）、占位日期、Excel 读入的对象、缺失值与无法解析的值
+VALUES = [
+    '2025-03-01', '2025-3-1', '2025/03/02', '2025/3/2 08:00:00', '20250303', '03/04/2025', '13/04/2025',
+    '2025-03-02 10:11:12', ' 2025-03-05 ', '2025-03-05T10:00:00', '12/31/2024 10:00',
+    '2025-03-05T23:00:00+08:00', '2025-03-05T20:00:00-08:00', '2025-03-05T01:00:00Z',
+    'Mar 5 2025', '2025年3月1日', '2025.03.01', '2025-02-30', '2025-13-01',
+    '9999-12-31', '0001-01-01', '99991231', '12/31/9999', '9999/12/31',
+    date(9999, 12, 31), datetime(1, 1, 1),
+    pd.Timestamp('2025-01-01 12:00'), date(2024, 12, 31), datetime(2024, 5, 6, 7, 8, 9), 20250303.0,
+    'bad', '', '   ', '1', 'nan', None, np.nan,
+]
+
+# 超出 datetime64[ns] 范围的取值（parse_dates 中为 NaT，由 parse_days 识别为日期）
+OUT_OF_RANGE = {'9999-12-31', '0001-01-01', '99991231', '12/31/9999', '9999/12/31'}
+
+
+def _normalize(values):
+    return [None if pd.isna(v) else v for v in values]
+
+
+def _batches():
+    """全量一批、逐个一批，以及固定种子的随机组合（含重复值）"""
+    yield list(VALUES)
+    for value in VALUES:
+        yield [value]
+    rng = random.Random(20251101)
+    for _ in range(200):
+        yield [rng.choice(VALUES) for _ in range(rng.randint(1, 30))]
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    # 基准实现逐值推断格式时会产生 UserWarning，不影响比对
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield
+
+
+def test_parse_days_matches_per_row():
+    """parse_days 与原逐行 parse_dt 逐批一致"""
+    for batch in _batches():
+        expected = [parse_dt(v) for v in batch]
+        actual = parse_days(pd.Series(batch, dtype=object))
+        assert _normalize(actual) == _normalize(expected), batch
+
+
+def test_parse_dates_matches_per_value():
+    """parse_dates 与逐值 pd.to_datetime 一致（范围内取值；带时区的取本地时刻）"""
+    for batch in _batches():
+        batch = [v for v in batch if not (isinstance(v, str) and v.strip() in OUT_OF_RANGE)]
+        if not batch:
+            continue
+        expected = [to_datetime_each(v.strip() if isinstance(v, str) else v) for v in batch]
+        actual = parse_dates(pd.Series(batch, dtype=object))
+        assert actual.dtype == 'datetime64[ns]'
+        assert _normalize(actual) == _normalize(expected), batch
+
+
+def test_mixed_utc_offsets_keep_local_dates():
+    """同批混用多个 UTC 偏移时按各自本地时刻取日期，不换算到 UTC"""
+    values = ['2025-03-05T23:00:00+08:00', '2025-03-05T20:00:00-08:00', '2025-03-06T00:30:00Z']
+    assert parse_days(pd.Series(values)).tolist() == [date(2025, 3, 5), date(2025, 3, 5), date(2025, 3, 6)]
+    assert parse_dates(pd.Series(values)).tolist() == [
+        pd.Timestamp('2025-03-05 23:00'), pd.Timestamp('2025-03-05 20:00'), pd.Timestamp('2025-03-06 00:30')]
+
+
+def test_out_of_range_sentinels():
+    """占位日期：parse_dates 为 NaT，parse_days 保留为日期对象"""
+    values = pd.Series(['9999-12-31', '0001-01-01', '2025-03-01'], index=[10, 11, 12], name='出单日期')
+    dates = parse_dates(values)
+    assert dates.isna().tolist() == [True, True, False]
+    days = parse_days(values)
+    assert days.tolist() == [date(9999, 12, 31), date(1, 1, 1), date(2025, 3, 1)]
+    assert days.index.tolist() == [10, 11, 12]
+    assert days.name == '出单日期'
+
+
+def test_datetime_column_passthrough():
+    """已是 datetime64 的列原样返回"""
+    values = pd.Series(pd.to_datetime(['2025-03-01', None]))
+    assert parse_dates(values) is values
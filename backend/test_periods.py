@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+测试统计周期模型与按日聚合索引
+
+函数级中文注释：
+- 目的：固定 periods.py 中各周期写法的起止日期、周期偏移的对比区间，以及越界参数的拒绝行为；
+- 按日聚合索引：验证聚合表上的区间求和与逐行数据一致（含维度缺失值与保单件数派生度量）；
+- 不依赖业务数据文件，可在任意环境运行。
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 确保能找到后端模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+from daily_aggregates import POLICY_COUNT_COLUMN, DailyAggregates, with_policy_count
+from data_processor import DataProcessor
+from periods import MAX_ROLLING_DAYS, PeriodError, format_date_range, parse_offset, parse_period
+from snapshot import SnapshotStore
+
+
+def ts(value):
+    return pd.Timestamp(value)
+
+
+def resolve(value, anchor):
+    return parse_period(value).resolve(anchor)
+
+
+def shift(offset, start, end, align_weekday=True):
+    return parse_offset(offset).shift(ts(start), ts(end), align_weekday)
+
+
+# ========== 周期解析与起止日期 ==========
+
+@pytest.mark.parametrize('value, anchor, expected', [
+    ('day', '2025-11-05 13:20', ('2025-11-05', '2025-11-05')),
+    ('last7d', '2025-11-05', ('2025-10-30', '2025-11-05')),
+    ('LAST30D', '2025-03-01', ('2025-01-31', '2025-03-01')),
+    ({'days': 1}, '2025-11-05', ('2025-11-05', '2025-11-05')),
+    ('mtd', '2025-11-05', ('2025-11-01', '2025-11-05')),
+    ('mtd', '2025-11-01', ('2025-11-01', '2025-11-01')),
+    ('qtd', '2025-11-05', ('2025-10-01', '2025-11-05')),
+    ('qtd', '2025-03-31', ('2025-01-01', '2025-03-31')),
+    ('ytd', '2024-02-29', ('2024-01-01', '2024-02-29')),
+])
+def test_resolve_relative_periods(value, anchor, expected):
+    """近N天与月/季/年至今按锚定日（规范化到天）计算闭区间"""
+    assert resolve(value, anchor) == (ts(expected[0]), ts(expected[1]))
+
+
+def test_rolling_bounds():
+    """近N天的天数需在 1~MAX_ROLLING_DAYS 之间"""
+    spec = parse_period(f'last{MAX_ROLLING_DAYS}d')
+    start, end = spec.resolve('2025-11-05')
+    assert (end - start).days + 1 == MAX_ROLLING_DAYS
+    for value in ('last0d', f'last{MAX_ROLLING_DAYS + 1}d', {'days': 0}, {'days': 'x'}):
+        with pytest.raises(PeriodError):
+            parse_period(value)
+
+
+def test_custom_ranges():
+    """自定义区间：字典与 a~b 字符串写法等价，end 缺省时取锚定日"""
+    spec = parse_period(' 2025-10-01 ~ 2025-10-31 ')
+    assert spec.key == 'custom'
+    assert str(spec) == '2025-10-01~2025-10-31'
+    assert spec.resolve('2030-01-01') == (ts('2025-10-01'), ts('2025-10-31'))
+    assert str(parse_period({'start': '2025-10-01', 'end': '2025-10-31'})) == str(spec)
+
+    open_ended = parse_period('2025-10-01~')
+    assert str(open_ended) == '2025-10-01~'
+    assert open_ended.resolve('2025-11-05 08:00') == (ts('2025-10-01'), ts('2025-11-05'))
+    assert parse_period(str(open_ended)).resolve('2025-11-05') == (ts('2025-10-01'), ts('2025-11-05'))
+
+
+@pytest.mark.parametrize('value', [
+    'week', 'last7', '', 7, None,
+    {'end': '2025-10-31'},
+    {'start': 'not-a-date'},
+    {'start': '2025-11-02', 'end': '2025-11-01'},
+    '2025-11-02~2025-11-01',
+])
+def test_invalid_periods(value):
+    """不支持的写法、无效日期与 end 早于 start 均抛出 PeriodError"""
+    with pytest.raises(PeriodError):
+        parse_period(value)
+
+
+def test_custom_span_limit():
+    """自定义区间跨度与近N天上限一致；end 缺省时在按锚定日计算时校验"""
+    start = ts('2025-11-05') - pd.Timedelta(days=MAX_ROLLING_DAYS - 1)
+    longest = {'start': start.strftime('%Y-%m-%d'), 'end': '2025-11-05'}
+    assert resolve(longest, None) == (start, ts('2025-11-05'))
+
+    with pytest.raises(PeriodError):
+        parse_period({'start': '1700-01-01', 'end': '2025-11-01'})
+    with pytest.raises(PeriodError):
+        parse_period({'start': (start - pd.Timedelta(days=1)).strftime('%Y-%m-%d'), 'end': '2025-11-05'})
+
+    open_ended = parse_period({'start': '2000-01-01'})
+    assert open_ended.resolve('2009-12-31') == (ts('2000-01-01'), ts('2009-12-31'))
+    with pytest.raises(PeriodError):
+        open_ended.resolve('2025-11-05')
+
+
+def test_format_date_range():
+    assert format_date_range(ts('2025-11-05'), ts('2025-11-05')) == '2025-11-05'
+    assert format_date_range(ts('2025-11-01'), ts('2025-11-05')) == '2025-11-01 ~ 2025-11-05'
+
+
+# ========== 周期偏移 ==========
+
+@pytest.mark.parametrize('value, code, label', [
+    ('previous', 'previous', '上一周期'),
+    ('prev', 'previous', '上一周期'),
+    ('wow', '-1w', '上周同期'),
+    ('MoM', '-1m', '上月同期'),
+    ('qoq', '-1q', '上季同期'),
+    ('yoy', '-1y', '去年同期'),
+    ('7d', '-7d', '7天前'),
+    ('-2y', '-2y', '2年前'),
+])
+def test_parse_offset(value, code, label):
+    offset = parse_offset(value)
+    assert offset.code == code
+    assert offset.label == label
+
+
+@pytest.mark.parametrize('value', [
+    '-0d', '-3661d', '-523w', '-121m', '-41q', '-11y', '-1x', 'last', '', None, 1,
+])
+def test_invalid_offsets(value):
+    """偏移数量按单位限制（约 10 年），不支持的写法抛出 PeriodError"""
+    with pytest.raises(PeriodError):
+        parse_offset(value)
+
+
+def test_offset_upper_bounds_accepted():
+    for value in ('-3660d', '-522w', '-120m', '-40q', '-10y'):
+        assert parse_offset(value).code == value
+
+
+def test_shift_previous():
+    """previous：按星期对齐时平移天数向上取整到整周，不对齐时紧邻上一周期"""
+    assert shift('previous', '2025-11-01', '2025-11-07') == (ts('2025-10-25'), ts('2025-10-31'))
+    assert shift('previous', '2025-11-01', '2025-11-10') == (ts('2025-10-18'), ts('2025-10-27'))
+    assert shift('previous', '2025-11-01', '2025-11-10', False) == (ts('2025-10-22'), ts('2025-10-31'))
+
+
+def test_shift_days_and_weeks():
+    """天/周偏移整体平移，区间长度不变"""
+    assert shift('-7d', '2025-11-01', '2025-11-05') == (ts('2025-10-25'), ts('2025-10-29'))
+    assert shift('-2w', '2025-11-01', '2025-11-05', False) == (ts('2025-10-18'), ts('2025-10-22'))
+
+
+@pytest.mark.parametrize('offset, start, end, expected', [
+    # 去年同期取最接近的整周数：364 天（52 周）
+    ('yoy', '2025-11-01', '2025-11-07', ('2024-11-02', '2024-11-08')),
+    # 跨闰日：2024-03-07 往前一年为 366 天，仍取 52 周
+    ('yoy', '2024-03-01', '2024-03-07', ('2023-03-03', '2023-03-09')),
+    # 上月同期：31 天取 4 周，30 天同样取 4 周
+    ('mom', '2025-10-31', '2025-10-31', ('2025-10-03', '2025-10-03')),
+    ('mom', '2025-11-30', '2025-11-30', ('2025-11-02', '2025-11-02')),
+    # 上季同期：92 天取 13 周
+    ('qoq', '2025-10-01', '2025-10-31', ('2025-07-02', '2025-08-01')),
+])
+def test_shift_calendar_aligned(offset, start, end, expected):
+    """月/季/年偏移按星期对齐：逐日星期一致，区间长度不变"""
+    result = shift(offset, start, end)
+    assert result == (ts(expected[0]), ts(expected[1]))
+    assert result[0].dayofweek == ts(start).dayofweek
+    assert (result[1] - result[0]) == (ts(end) - ts(start))
+
+
+@pytest.mark.parametrize('offset, start, end, expected', [
+    # 整月对比整月：对比区间止于月末，长度随月份天数变化
+    ('mom', '2024-03-01', '2024-03-31', ('2024-02-01', '2024-02-29')),
+    ('mom', '2025-03-01', '2025-03-31', ('2025-02-01', '2025-02-28')),
+    ('mom', '2025-02-01', '2025-02-28', ('2025-01-01', '2025-01-31')),
+    ('yoy', '2024-02-01', '2024-02-29', ('2023-02-01', '2023-02-28')),
+    ('qoq', '2025-03-01', '2025-03-31', ('2024-12-01', '2024-12-31')),
+    # 非整月：起始日按日历偏移（月末日截断），保持基准区间长度
+    ('mom', '2025-03-31', '2025-03-31', ('2025-02-28', '2025-02-28')),
+    ('mom', '2025-03-15', '2025-04-14', ('2025-02-15', '2025-03-17')),
+    ('mom', '2025-03-02', '2025-03-31', ('2025-02-02', '2025-03-03')),
+    ('yoy', '2024-02-29', '2024-03-06', ('2023-02-28', '2023-03-06')),
+])
+def test_shift_calendar_unaligned(offset, start, end, expected):
+    """不对齐时按日历偏移：仅整月窗口止于月末，其余保持基准区间长度"""
+    assert shift(offset, start, end, False) == (ts(expected[0]), ts(expected[1]))
+
+
+def test_shift_out_of_range():
+    """平移后超出 pandas 可表示的日期范围时抛出 PeriodError（路由层返回 400）"""
+    for offset in ('-10y', '-120m', '-40q', '-3660d', '-522w'):
+        for align_weekday in (True, False):
+            with pytest.raises(PeriodError):
+                shift(offset, '1680-01-01', '1680-03-31', align_weekday)
+    for offset in ('previous', 'yoy', 'mom'):
+        for align_weekday in (True, False):
+            with pytest.raises(PeriodError):
+                shift(offset, '1677-10-01', '1677-12-31', align_weekday)
+    assert shift('yoy', '1680-01-01', '1680-03-31', False) == (ts('1679-01-01'), ts('1679-03-31'))
+
+
+# ========== 对比引擎 ==========
+
+def _daily_frame(rows):
+    return pd.DataFrame(rows, columns=['投保确认时间', '签单/批改保费']).assign(
+        投保确认时间=lambda df: pd.to_datetime(df['投保确认时间']))
+
+
+def test_compare_windows_slices():
+    """各周期取自同一逐日数组：无数据的日期为 0，件数按保费≥50 计"""
+    df = _daily_frame([
+        ('2025-11-01 09:00', 100.0), ('2025-11-01 18:00', 20.0),
+        ('2025-11-03 10:00', 60.0), ('2025-10-25 12:00', 70.0),
+    ])
+    windows = DataProcessor._compare_windows(
+        df, 'premium', ts('2025-11-01'), ts('2025-11-03'), [parse_offset('-7d')])
+    assert [w['data'] for w in windows] == [[120.0, 0.0, 60.0], [70.0, 0.0, 0.0]]
+    assert windows[1]['dates'] == ['2025-10-25', '2025-10-26', '2025-10-27']
+
+    counts = DataProcessor._compare_windows(df, 'count', ts('2025-11-01'), ts('2025-11-03'), [])
+    assert counts[0]['data'] == [1.0, 0.0, 1.0]
+
+
+def test_compare_windows_span_limit():
+    """基准区间超过 MAX_ROLLING_DAYS 或平移越界时抛出 PeriodError，而不是溢出错误"""
+    df = _daily_frame([('2025-11-01', 100.0)])
+    for value in ('-10y', 'yoy', '-1q', 'previous'):
+        with pytest.raises(PeriodError):
+            DataProcessor._compare_windows(df, 'premium', ts('1700-01-01'), ts('2025-11-01'),
+                                           [parse_offset(value)], align_weekday=False)
+
+    start = ts('2025-11-01') - pd.Timedelta(days=MAX_ROLLING_DAYS - 1)
+    windows = DataProcessor._compare_windows(df, 'premium', start, ts('2025-11-01'), [parse_offset('-10y')])
+    assert len(windows[1]['data']) == MAX_ROLLING_DAYS
+    assert windows[0]['data'][-1] == 100.0
+
+
+# ========== 按日聚合索引 ==========
+
+def test_daily_aggregates_match_rows(tmp_path):
+    """聚合表上的区间求和与逐行计算一致，维度缺失值作为独立分组保留"""
+    rng = np.random.default_rng(7)
+    n = 400
+    rows = pd.DataFrame({
+        '投保确认时间': pd.Timestamp('2025-10-01') + pd.to_timedelta(rng.integers(0, 60 * 24, n), unit='h'),
+        '三级机构': rng.choice(['达州', '天府', None], n),
+        '批单类型': rng.choice(['', '批改'], n),
+        '签单/批改标识': rng.choice(['签单', '批改'], n),
+        '签单/批改保费': rng.integers(-100, 5000, n).astype(float),
+        '签单数量': rng.integers(0, 3, n),
+    })
+    source = tmp_path / 'merged.csv'
+    rows.to_csv(source, index=False)
+    store = SnapshotStore(tmp_path / 'snapshots')
+    store.build(rows, source)
+
+    aggregates = DailyAggregates(store.open())
+    cube = aggregates.frame(['投保确认时间', '三级机构', '签单/批改保费', '签单数量'])
+    assert aggregates.frame(['投保确认时间', '三级机构', '签单/批改保费', '签单数量']) is cube
+    assert aggregates.frame(['投保确认时间', '三级机构']) is None
+    assert len(cube) < len(rows)
+
+    for period in ('last7d', 'mtd', '2025-10-05~2025-10-20'):
+        start, end = resolve(period, '2025-11-15')
+        row_dates = rows['投保确认时间'].dt.normalize()
+        in_rows = with_policy_count(rows[(row_dates >= start) & (row_dates <= end)])
+        in_cube = cube[(cube['投保确认时间'] >= start) & (cube['投保确认时间'] <= end)]
+        for column in ('签单/批改保费', '签单数量', POLICY_COUNT_COLUMN):
+            expected = in_rows.groupby(in_rows['三级机构'].fillna('<NA>'))[column].sum()
+            actual = in_cube.groupby(in_cube['三级机构'].astype(object).fillna('<NA>'))[column].sum()
+            pd.testing.assert_series_equal(actual.sort_index(), expected.sort_index(),
+                                           check_dtype=False, check_names=False)
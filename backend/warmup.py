@@ -0,0 +1,218 @@
+"""
+启动预热 - 服务启动（及数据刷新）后预先加载快照并计算看板默认面板的响应
+
+设计说明：
+- 部署或重启后，首批用户的每个面板都要经历快照映射 + 筛选 + 校验的冷启动；
+  预热在后台线程中完成，期间 /api/health 正常响应并报告预热进度，就绪后返回 ready=true；
+- 预热内容为看板首屏的默认请求（无筛选、最新日期、两种数据口径）：KPI、周对比、
+  三类占比图与业务员业绩分布（各时间段）、筛选项、保单映射、最新日期、日报、周趋势；
+- 结果按快照版本保存在版本目录（default_responses.json），多个工作进程共享同一份，
+  生产启动器在派生工作进程前完成计算，工作进程启动后只需读取；
+- 路由层经 run_query 执行查询前先查预热结果：调用参数与预热项完全一致且快照版本未变时直接返回；
+  快照版本变化（本进程或其他进程刷新了数据）后自动在后台重新预热。
+
+环境变量：
+    WARMUP_ENABLED   是否启用启动预热，默认 1（0 关闭）
+"""
+
+import json
+import os
+import threading
+import time
+
+from metrics import record_cache
+
+
+# 预计算结果在快照版本目录中的文件名
+WARMUP_ARTIFACT = 'default_responses.json'
+
+DATA_SCOPES = ('exclude_correction', 'include_correction')
+PERIODS = ('day', 'last7d', 'last30d')
+
+
+def default_queries():
+    """
+    看板默认面板的查询列表：(DataProcessor 方法名, 位置参数, 关键字参数)
+
+    说明：参数须与 api_server 路由在默认请求下传给 run_query 的参数完全一致，才能命中预热结果。
+    """
+    queries = [
+        ('get_latest_date', (), {}),
+        ('get_daily_report', (None,), {}),
+        ('get_week_trend', (), {'end_date': None, 'weeks': 1}),
+        ('get_week_trend', (), {'end_date': None, 'weeks': 3}),
+        ('get_filter_options', (), {}),
+        ('get_policy_mapping', (), {}),
+    ]
+    for scope in DATA_SCOPES:
+        queries.append(('get_kpi_windows', (), {'date': None, 'filters': {}, 'data_scope': scope}))
+        for metric in ('premium', 'count'):
+            queries.append(('get_week_comparison', (), {
+                'metric': metric, 'filters': {}, 'anchor_date': None, 'data_scope': scope}))
+        for period in PERIODS:
+            for method in ('get_staff_performance_distribution', 'get_insurance_type_distribution',
+                           'get_premium_range_distribution', 'get_renewal_type_distribution'):
+                queries.append((method, (), {
+                    'period': period, 'date': None, 'filters': {}, 'data_scope': scope}))
+    return queries
+
+
+def query_key(name, args, kwargs):
+    """查询参数的规范化键（关键字参数按名称排序）"""
+    return json.dumps([name, list(args), kwargs], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class WarmupCache:
+    """
+    默认面板响应的预热缓存（按快照版本失效）
+
+    状态 state：
+        disabled  未启用预热
+        pending   尚未开始
+        warming   预热中
+        ready     预热完成
+        failed    预热失败（查询照常执行，只是没有预热结果）
+
+    首次预热结束（完成或失败）后即视为就绪；此后数据刷新触发的重新预热不影响就绪状态，
+    避免负载均衡在每次刷新时摘除实例。
+
+    Args:
+        processor: DataProcessor 实例
+        enabled: 是否启用
+    """
+
+    def __init__(self, processor, enabled=True):
+        self.processor = processor
+        self.enabled = enabled
+        self.state = 'pending' if enabled else 'disabled'
+        self.version = None
+        self.error = None
+        self.seconds = None
+        self._first_done = threading.Event()
+        self._keys = {query_key(*q) for q in default_queries()}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, processor):
+        """从环境变量读取配置"""
+        enabled = os.environ.get('WARMUP_ENABLED', '1').lower() not in ('0', 'false', 'no')
+        return cls(processor, enabled=enabled)
+
+    @property
+    def ready(self):
+        """是否可以接收流量：未启用预热，或首次预热已结束"""
+        return not self.enabled or self._first_done.is_set()
+
+    def status(self):
+        """预热状态（供 /api/health 展示，不加锁、不阻塞）"""
+        return {
+            'state': self.state,
+            'ready': self.ready,
+            'version': self.version,
+            'entries': len(self._entries),
+            'seconds': round(self.seconds, 3) if self.seconds is not None else None,
+            'error': self.error,
+        }
+
+    def compute(self, version):
+        """
+        计算（或读取已保存的）指定快照版本的默认面板响应
+
+        Returns:
+            dict: {查询键: 响应数据}
+        """
+        store = self.processor.snapshot_store
+        saved = store.read_artifact(version, WARMUP_ARTIFACT)
+        if saved is not None and saved.get('version') == version:
+            return saved['entries']
+
+        entries = {}
+        for name, args, kwargs in default_queries():
+            result = getattr(self.processor, name)(*args, **kwargs)
+            # 经 JSON 往返统一数值类型，保证各工作进程（读取文件）与本进程返回的内容一致
+            entries[query_key(name, args, kwargs)] = json.loads(json.dumps(result, ensure_ascii=False, default=str))
+        try:
+            store.write_artifact(version, WARMUP_ARTIFACT, {'version': version, 'entries': entries})
+        except OSError:
+            # 版本目录已被清理（更新的版本已生成），仅在本进程内使用
+            pass
+        return entries
+
+    def warm(self):
+        """
+        同步预热：确保快照可用，映射快照并计算默认面板响应
+
+        Returns:
+            str | None: 预热的快照版本；无数据或未启用时返回 None
+        """
+        if not self.enabled:
+            return None
+        self.state = 'warming'
+        start = time.perf_counter()
+        try:
+            self.processor.ensure_snapshot()
+            version = self.processor.current_snapshot_version()
+            entries = self.compute(version) if version else {}
+            with self._lock:
+                self._entries = entries
+                self.version = version
+            self.error = None
+            self.state = 'ready'
+            return version
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            print(f"⚠️  启动预热失败: {e}")
+            return None
+        finally:
+            self.seconds = time.perf_counter() - start
+            self._first_done.set()
+
+    def start(self, after=None):
+        """
+        在后台线程中预热（已有预热线程在运行时不重复启动）
+
+        Args:
+            after: 预热完成后调用的函数，参数为预热的快照版本（如预计算 SSE 推送内容）
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self.state = 'warming'
+
+            def run():
+                version = self.warm()
+                if after is not None and version:
+                    try:
+                        after(version)
+                    except Exception as e:
+                        print(f"⚠️  预热后续任务失败: {e}")
+
+            self._thread = threading.Thread(target=run, name='warmup', daemon=True)
+            self._thread.start()
+        return True
+
+    def get(self, fn, args, kwargs):
+        """
+        查找预热结果
+
+        Returns:
+            tuple(bool, object): (是否命中, 响应数据)；快照版本已变化时未命中，并在后台重新预热
+        """
+        if not self._entries and self.state != 'ready':
+            return False, None
+        key = query_key(getattr(fn, '__name__', ''), args, kwargs)
+        if key not in self._keys:
+            return False, None
+        with self._lock:
+            version, entries = self.version, self._entries
+        current = self.processor.current_snapshot_version()
+        hit = current is not None and current == version and key in entries
+        record_cache('warmup', hit)
+        if not hit and current is not None and current != version:
+            self.start()
+        return hit, entries.get(key) if hit else None
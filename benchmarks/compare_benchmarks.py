@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+性能回归检查 - 将基准测试结果与基线对比，出现回归时以非零退出码结束
+
+用法：
+    # 部署前：运行基准并与基线对比
+    python benchmarks/run_benchmarks.py --save
+    python benchmarks/compare_benchmarks.py
+
+    # 自定义阈值：延迟变慢超过 20% 或内存增加超过 15% 视为回归
+    python benchmarks/compare_benchmarks.py --threshold 0.2 --memory-threshold 0.15
+
+    # 指定对比对象（baseline / latest / 结果文件名 / 路径）
+    python benchmarks/compare_benchmarks.py --baseline baseline --current 20251120_101500_abc1234.json
+
+退出码：
+    0  无回归
+    1  存在回归（或本次运行中有用例失败）
+    2  缺少基线或结果文件
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from results import (DEFAULT_LATENCY_THRESHOLD, DEFAULT_MEMORY_THRESHOLD, DEFAULT_MIN_DELTA_BYTES,  # noqa: E402
+                     DEFAULT_MIN_DELTA_MS, ResultStore, compare_reports, fingerprint_differences,
+                     load_report)
+
+STATUS_LABELS = {
+    'regression': '❌ 回归',
+    'improved': '✅ 改善',
+    'ok': '   持平',
+    'new': '🆕 新增',
+    'missing': '⚠️  缺失',
+    'error': '❌ 失败',
+}
+
+
+def _fmt_ms(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+def _fmt_mb(value):
+    return '-' if value is None else f'{value / 1024 / 1024:.1f}'
+
+
+def _fmt_change(value):
+    if value is None:
+        return '-'
+    if value == float('inf'):
+        return '+inf'
+    return f'{value * 100:+.1f}%'
+
+
+def print_comparison(rows):
+    """输出对比表（回归项排在最前）"""
+    order = {'regression': 0, 'error': 1, 'missing': 2, 'new': 3, 'improved': 4, 'ok': 5}
+    header = (f"{'状态':<8} {'用例':<45} {'模式':<9} {'行数':>10} {'基线ms':>9} {'当前ms':>9} {'变化':>8} "
+              f"{'基线MB':>8} {'当前MB':>8} {'变化':>8}")
+    print(header)
+    print('-' * len(header))
+    for row in sorted(rows, key=lambda r: (order.get(r['status'], 9), r['case'], str(r['mode']), r['rows'] or 0)):
+        print(f"{STATUS_LABELS.get(row['status'], row['status']):<8} {row['case']:<45} {str(row['mode']):<9} "
+              f"{row['rows'] or 0:>10,} {_fmt_ms(row.get('base_median_ms')):>9} {_fmt_ms(row.get('median_ms')):>9} "
+              f"{_fmt_change(row.get('latency_change')):>8} {_fmt_mb(row.get('base_peak_mem_bytes')):>8} "
+              f"{_fmt_mb(row.get('peak_mem_bytes')):>8} {_fmt_change(row.get('memory_change')):>8}")
+        if row['status'] == 'error':
+            print(f"         {row.get('error')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='对比基准测试结果与基线，检测性能回归')
+    parser.add_argument('--baseline', default='baseline', help='基线（默认 baseline）')
+    parser.add_argument('--current', default='latest', help='当前结果（默认 latest：最近一次存档）')
+    parser.add_argument('--store-dir', default=str(ResultStore().root), help='结果目录（默认 benchmarks/results）')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_LATENCY_THRESHOLD,
+                        help=f'中位数延迟回归阈值（比例，默认 {DEFAULT_LATENCY_THRESHOLD}）')
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help=f'峰值内存回归阈值（比例，默认 {DEFAULT_MEMORY_THRESHOLD}）')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help=f'延迟绝对差值下限，低于该值不判定回归（默认 {DEFAULT_MIN_DELTA_MS}ms）')
+    parser.add_argument('--min-delta-mb', type=float, default=DEFAULT_MIN_DELTA_BYTES / 1024 / 1024,
+                        help='内存绝对差值下限（默认 1MB）')
+    parser.add_argument('--allow-missing', action='store_true', help='基线中的用例本次未运行时不视为失败')
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.store_dir)
+    baseline_path = store.resolve(args.baseline)
+    current_path = store.resolve(args.current)
+    if baseline_path is None:
+        print(f"❌ 未找到基线: {args.baseline}（可运行 run_benchmarks.py --save --set-baseline 创建）")
+        return 2
+    if current_path is None:
+        print(f"❌ 未找到结果: {args.current}（可运行 run_benchmarks.py --save 生成）")
+        return 2
+    if baseline_path.resolve() == current_path.resolve():
+        print("⚠️  基线与当前结果为同一文件")
+
+    baseline = load_report(baseline_path)
+    current = load_report(current_path)
+    print(f"基线: {baseline_path}  ({baseline.get('started_at')}, "
+          f"提交 {baseline.get('fingerprint', {}).get('git_commit')})")
+    print(f"当前: {current_path}  ({current.get('started_at')}, "
+          f"提交 {current.get('fingerprint', {}).get('git_commit')})")
+
+    diffs = fingerprint_differences(baseline.get('fingerprint'), current.get('fingerprint'))
+    if diffs:
+        print("⚠️  机器指纹不一致，对比结果可能受环境影响：")
+        for key, (base_value, current_value) in diffs.items():
+            print(f"    {key}: {base_value} -> {current_value}")
+    print()
+
+    rows = compare_reports(
+        baseline, current,
+        latency_threshold=args.threshold,
+        memory_threshold=args.memory_threshold,
+        min_delta_ms=args.min_delta_ms,
+        min_delta_bytes=args.min_delta_mb * 1024 * 1024,
+    )
+    print_comparison(rows)
+
+    failing = {'regression', 'error'} | (set() if args.allow_missing else {'missing'})
+    failed = [r for r in rows if r['status'] in failing]
+    print()
+    if failed:
+        print(f"❌ 发现 {len(failed)} 项性能回归或失败（阈值：延迟 {args.threshold:.0%}，内存 {args.memory_threshold:.0%}）")
+        return 1
+    print("✅ 未发现性能回归")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
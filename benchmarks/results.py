@@ -0,0 +1,239 @@
+"""
+基准测试结果存储与对比 - 每次运行保存一个 JSON 文件，并与基线对比判断性能回归
+
+设计说明：
+- 每次运行的结果附带机器指纹（CPU、内存、Python 及依赖版本、git 提交），
+  对比时若指纹不同会给出提示，避免把机器差异误判为回归；
+- 基线是结果目录中的 baseline.json（某次运行结果的副本），可随时用新的运行结果替换；
+- 对比按（用例, 模式, 行数）配对：中位数延迟或峰值内存超过基线一定比例即判定为回归，
+  同时设置绝对差值下限，避免亚毫秒级用例的抖动造成误报。
+"""
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_STORE_DIR = BENCH_DIR / 'results'
+BASELINE_FILE = 'baseline.json'
+
+# 默认回归阈值
+DEFAULT_LATENCY_THRESHOLD = 0.10      # 中位数延迟变慢超过 10%
+DEFAULT_MEMORY_THRESHOLD = 0.10       # 峰值内存增加超过 10%
+DEFAULT_MIN_DELTA_MS = 2.0            # 延迟绝对差值下限（毫秒）
+DEFAULT_MIN_DELTA_BYTES = 1024 * 1024  # 内存绝对差值下限（1MB）
+
+# 参与指纹比较的字段（git 提交与主机名不影响可比性）
+COMPARABLE_FINGERPRINT_KEYS = ('machine', 'processor', 'cpu_model', 'cpu_count', 'memory_bytes',
+                               'system', 'python', 'numpy', 'pandas')
+
+
+def _cpu_model():
+    """读取 CPU 型号（Linux 读取 /proc/cpuinfo，其他平台使用 platform.processor）"""
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.lower().startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def _memory_bytes():
+    """物理内存总量（字节）；无法获取时返回 None"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _git_commit():
+    """当前 git 提交（短哈希）；非 git 仓库时返回 None"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def machine_fingerprint():
+    """采集机器指纹：硬件、系统、Python 与关键依赖版本、git 提交"""
+    import numpy as np
+    import pandas as pd
+
+    return {
+        'hostname': platform.node(),
+        'system': f'{platform.system()} {platform.release()}',
+        'machine': platform.machine(),
+        'processor': platform.processor() or None,
+        'cpu_model': _cpu_model(),
+        'cpu_count': os.cpu_count(),
+        'memory_bytes': _memory_bytes(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'git_commit': _git_commit(),
+    }
+
+
+def fingerprint_differences(a, b):
+    """返回两个指纹之间影响可比性的差异字段 {字段: (基线值, 当前值)}"""
+    a, b = a or {}, b or {}
+    return {k: (a.get(k), b.get(k)) for k in COMPARABLE_FINGERPRINT_KEYS if a.get(k) != b.get(k)}
+
+
+class ResultStore:
+    """
+    基准结果目录
+
+    目录结构：
+        <root>/<YYYYmmdd_HHMMSS>_<git提交>.json   每次运行的结果
+        <root>/baseline.json                      基线
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+
+    def save(self, report):
+        """
+        保存一次运行结果（自动补充机器指纹）
+
+        Returns:
+            Path: 结果文件路径
+        """
+        report.setdefault('fingerprint', machine_fingerprint())
+        self.root.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        commit = report['fingerprint'].get('git_commit') or 'nogit'
+        path = self.root / f'{stamp}_{commit}.json'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+    def runs(self):
+        """按时间顺序列出全部运行结果文件（不含基线）"""
+        if not self.root.exists():
+            return []
+        return sorted(p for p in self.root.glob('*.json') if p.name != BASELINE_FILE)
+
+    def latest(self):
+        """最近一次运行结果的路径；没有结果时返回 None"""
+        runs = self.runs()
+        return runs[-1] if runs else None
+
+    @property
+    def baseline_path(self):
+        return self.root / BASELINE_FILE
+
+    def set_baseline(self, path):
+        """将指定运行结果设为基线"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, self.baseline_path)
+        return self.baseline_path
+
+    def resolve(self, ref):
+        """
+        解析结果引用：'baseline' | 'latest' | 结果文件名 | 文件路径
+
+        Returns:
+            Path | None
+        """
+        if ref == 'baseline':
+            return self.baseline_path if self.baseline_path.exists() else None
+        if ref == 'latest':
+            return self.latest()
+        path = Path(ref)
+        if path.exists():
+            return path
+        candidate = self.root / ref
+        return candidate if candidate.exists() else None
+
+
+def load_report(path):
+    """读取结果文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _key(entry):
+    return entry['case'], entry.get('mode'), entry.get('rows')
+
+
+def _check(base, current, threshold, min_delta):
+    """判断单个指标是否回归/改善；任一值缺失时返回 None"""
+    if base is None or current is None:
+        return None, None
+    delta = current - base
+    ratio = delta / base if base > 0 else (float('inf') if delta > 0 else 0.0)
+    if delta > min_delta and ratio > threshold:
+        return 'regression', ratio
+    if -delta > min_delta and -ratio > threshold:
+        return 'improved', ratio
+    return 'ok', ratio
+
+
+def compare_reports(baseline, current, latency_threshold=DEFAULT_LATENCY_THRESHOLD,
+                    memory_threshold=DEFAULT_MEMORY_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS,
+                    min_delta_bytes=DEFAULT_MIN_DELTA_BYTES):
+    """
+    对比两次运行结果
+
+    Returns:
+        list[dict]: 每个用例一条，status 取值：
+            regression（延迟或内存回归）/ improved / ok / new（基线中没有）/
+            missing（本次未运行）/ error（本次运行失败）
+    """
+    base_map = {_key(e): e for e in baseline.get('results', []) if 'error' not in e}
+    rows = []
+    seen = set()
+    for entry in current.get('results', []):
+        key = _key(entry)
+        seen.add(key)
+        row = {'case': key[0], 'mode': key[1], 'rows': key[2]}
+        if 'error' in entry:
+            row.update(status='error', error=entry['error'])
+            rows.append(row)
+            continue
+        base = base_map.get(key)
+        if base is None:
+            row.update(status='new', median_ms=entry.get('median_ms'), peak_mem_bytes=entry.get('peak_mem_bytes'))
+            rows.append(row)
+            continue
+
+        latency_status, latency_ratio = _check(base.get('median_ms'), entry.get('median_ms'),
+                                               latency_threshold, min_delta_ms)
+        memory_status, memory_ratio = _check(base.get('peak_mem_bytes'), entry.get('peak_mem_bytes'),
+                                             memory_threshold, min_delta_bytes)
+        statuses = {latency_status, memory_status}
+        if 'regression' in statuses:
+            status = 'regression'
+        elif 'improved' in statuses:
+            status = 'improved'
+        else:
+            status = 'ok'
+        row.update(
+            status=status,
+            latency_status=latency_status,
+            memory_status=memory_status,
+            base_median_ms=base.get('median_ms'),
+            median_ms=entry.get('median_ms'),
+            latency_change=latency_ratio,
+            base_peak_mem_bytes=base.get('peak_mem_bytes'),
+            peak_mem_bytes=entry.get('peak_mem_bytes'),
+            memory_change=memory_ratio,
+        )
+        rows.append(row)
+
+    for key in base_map:
+        if key not in seen:
+            rows.append({'case': key[0], 'mode': key[1], 'rows': key[2], 'status': 'missing'})
+    return rows
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+性能基准测试 - 在合成数据集上测量 DataProcessor 公共方法与 API 路由的性能
+
+设计说明：
+- 数据集由 synthetic_data.py 按行数与种子生成并缓存在 benchmarks/.data/，重复运行无需重新生成；
+- 每个用例先预热一次，再重复执行 N 次记录耗时，输出中位数与 P90/P95/P99 延迟、吞吐量（次/秒、行/秒）；
+- 峰值内存在额外一次执行中用 tracemalloc 测量（Python 对象与 numpy/pandas 数组分配），
+  不影响延迟统计；快照的 mmap 页属于共享页缓存，不计入；
+- 支持两种数据读取模式：snapshot（列式快照，生产默认）与 csv（每次解析合并CSV），便于对比。
+
+用法：
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --repeat 5
+    python benchmarks/run_benchmarks.py --sizes 1m --mode both --only methods --json result.json
+    python benchmarks/run_benchmarks.py --save                # 保存到 benchmarks/results/，供回归对比
+    python benchmarks/run_benchmarks.py --save --set-baseline # 保存并设为基线
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / 'backend'))
+sys.path.insert(0, str(BENCH_DIR))
+
+from results import ResultStore, machine_fingerprint  # noqa: E402
+from synthetic_data import parse_rows, write_csv, write_excel_exports  # noqa: E402
+
+DEFAULT_DATA_DIR = BENCH_DIR / '.data'
+DEFAULT_SIZES = '10k,100k'
+DEFAULT_REPEAT = 5
+# 入库用例使用的单日Excel行数（与每日导出规模相当，不随数据集规模变化）
+INGEST_EXCEL_ROWS = 5_000
+
+
+def prepare_dataset(rows, seed, data_dir):
+    """
+    准备指定规模的数据集（已存在则复用）
+
+    Returns:
+        dict: {'csv': 合并CSV路径, 'excel': 单日Excel路径}
+    """
+    data_dir = Path(data_dir)
+    csv_path = data_dir / f'merged_{rows}_s{seed}.csv'
+    if not csv_path.exists():
+        print(f"📦 生成数据集: {rows:,} 行 -> {csv_path}")
+        write_csv(csv_path, rows, seed=seed)
+    excel_dir = data_dir / f'excel_{INGEST_EXCEL_ROWS}_s{seed}'
+    excel_files = sorted(excel_dir.glob('*.xlsx')) if excel_dir.exists() else []
+    if not excel_files:
+        excel_files = write_excel_exports(excel_dir, INGEST_EXCEL_ROWS, seed=seed, days=1)
+    return {'csv': csv_path, 'excel': excel_files[0]}
+
+
+def make_processor(dataset, mode, data_dir):
+    """
+    构建指向基准数据集的 DataProcessor
+
+    Args:
+        mode: 'snapshot'（构建并使用列式快照）或 'csv'（无快照，每次解析CSV）
+    """
+    from data_processor import DataProcessor
+
+    snapshot_dir = Path(data_dir) / 'snapshots' / Path(dataset['csv']).stem
+    if mode == 'csv':
+        snapshot_dir = Path(data_dir) / 'snapshots' / '_none'
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    processor = DataProcessor(snapshot_dir=str(snapshot_dir), merged_csv=str(dataset['csv']))
+    if mode == 'snapshot':
+        with redirect_stdout(StringIO()):
+            processor.ensure_snapshot()
+    return processor
+
+
+def method_cases(processor, dataset):
+    """DataProcessor 公共方法用例：[(用例名, 可调用对象, 处理行数)]；处理行数为 None 表示数据集行数"""
+    with redirect_stdout(StringIO()):
+        options = processor.get_filter_options() or {}
+    orgs = options.get('三级机构') or []
+    org_filter = {'三级机构': orgs[0]} if orgs else {}
+    with redirect_stdout(StringIO()):
+        new_df = processor.process_new_excel(dataset['excel'])
+
+    return [
+        ('get_latest_date', processor.get_latest_date),
+        ('get_daily_report', processor.get_daily_report),
+        ('get_week_trend', processor.get_week_trend),
+        ('get_filter_options', processor.get_filter_options),
+        ('get_policy_mapping', processor.get_policy_mapping),
+        ('get_week_comparison', lambda: processor.get_week_comparison(metric='premium')),
+        ('get_kpi_windows', processor.get_kpi_windows),
+        ('get_kpi_windows[filtered]', lambda: processor.get_kpi_windows(filters=dict(org_filter))),
+        ('get_staff_performance_distribution',
+         lambda: processor.get_staff_performance_distribution(period='last7d')),
+        ('get_insurance_type_distribution', lambda: processor.get_insurance_type_distribution(period='last7d')),
+        ('get_premium_range_distribution', lambda: processor.get_premium_range_distribution(period='last7d')),
+        ('get_renewal_type_distribution', lambda: processor.get_renewal_type_distribution(period='last7d')),
+        ('process_new_excel', lambda: processor.process_new_excel(dataset['excel']), INGEST_EXCEL_ROWS),
+        ('merge_with_existing', lambda: processor.merge_with_existing(new_df), None),
+    ]
+
+
+def route_cases():
+    """API 路由用例：[(用例名, HTTP方法, 路径, JSON请求体)]"""
+    return [
+        ('GET /api/latest-date', 'GET', '/api/latest-date', None),
+        ('GET /api/daily-report', 'GET', '/api/daily-report', None),
+        ('GET /api/week-trend', 'GET', '/api/week-trend', None),
+        ('GET /api/filter-options', 'GET', '/api/filter-options', None),
+        ('GET /api/policy-mapping', 'GET', '/api/policy-mapping', None),
+        ('POST /api/kpi-windows', 'POST', '/api/kpi-windows', {}),
+        ('POST /api/week-comparison', 'POST', '/api/week-comparison', {'metric': 'premium'}),
+        ('POST /api/staff-performance-distribution', 'POST', '/api/staff-performance-distribution',
+         {'period': 'last7d'}),
+        ('POST /api/insurance-type-distribution', 'POST', '/api/insurance-type-distribution',
+         {'period': 'last7d'}),
+        ('POST /api/premium-range-distribution', 'POST', '/api/premium-range-distribution',
+         {'period': 'last7d'}),
+        ('POST /api/renewal-type-distribution', 'POST', '/api/renewal-type-distribution',
+         {'period': 'last7d'}),
+    ]
+
+
+def _route_callable(client, method, path, body):
+    """将路由请求包装为可调用对象；非 200 响应视为失败"""
+    def call():
+        response = client.open(path, method=method, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f'{method} {path} 返回 {response.status_code}')
+        return response.get_data()
+    return call
+
+
+def measure(fn, repeat, warmup=1, track_memory=True):
+    """
+    测量可调用对象的耗时与峰值内存
+
+    Returns:
+        dict: latencies（秒列表）、peak_mem_bytes
+    """
+    with redirect_stdout(StringIO()):
+        for _ in range(warmup):
+            fn()
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+
+        peak = None
+        if track_memory:
+            tracemalloc.start()
+            try:
+                fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return {'latencies': latencies, 'peak_mem_bytes': peak}
+
+
+def summarize(name, kind, rows, mode, measured):
+    """将原始测量结果汇总为报告条目"""
+    lat = np.array(measured['latencies'])
+    total = float(lat.sum())
+    return {
+        'case': name,
+        'kind': kind,
+        'rows': rows,
+        'mode': mode,
+        'repeat': len(lat),
+        'median_ms': float(np.median(lat) * 1000),
+        'mean_ms': float(lat.mean() * 1000),
+        'p90_ms': float(np.percentile(lat, 90) * 1000),
+        'p95_ms': float(np.percentile(lat, 95) * 1000),
+        'p99_ms': float(np.percentile(lat, 99) * 1000),
+        'min_ms': float(lat.min() * 1000),
+        'max_ms': float(lat.max() * 1000),
+        'calls_per_sec': len(lat) / total if total > 0 else None,
+        'rows_per_sec': rows * len(lat) / total if total > 0 else None,
+        'peak_mem_bytes': measured['peak_mem_bytes'],
+    }
+
+
+def run_suite(sizes, repeat=DEFAULT_REPEAT, modes=('snapshot',), only=None, seed=0,
+              data_dir=DEFAULT_DATA_DIR, track_memory=True, case_filter=None):
+    """
+    运行基准测试
+
+    Args:
+        sizes: 行数列表
+        modes: 数据读取模式 ('snapshot' / 'csv')
+        only: None（全部）| 'methods' | 'routes'
+        case_filter: 可选子串，仅运行名称包含该子串的用例
+
+    Returns:
+        dict: {'started_at', 'fingerprint', 'config', 'results': [...]}
+    """
+    # 基准测试关注真实耗时，关闭查询截止时间避免大数据集下被 503 截断；
+    # 关闭启动预热，路由用例测量实际查询而非预热结果
+    os.environ['QUERY_TIMEOUT_SECONDS'] = '0'
+    os.environ['WARMUP_ENABLED'] = '0'
+    results = []
+    started_at = datetime.now().isoformat(timespec='seconds')
+
+    for rows in sizes:
+        dataset = prepare_dataset(rows, seed, data_dir)
+        for mode in modes:
+            processor = make_processor(dataset, mode, data_dir)
+            cases = []
+            if only in (None, 'methods'):
+                cases += [(case[0], 'method', case[1], case[2] if len(case) > 2 else None)
+                          for case in method_cases(processor, dataset)]
+            if only in (None, 'routes'):
+                import api_server
+                api_server.processor = processor
+                api_server.event_stream.processor = processor
+                client = api_server.app.test_client()
+                cases += [(name, 'route', _route_callable(client, method, path, body), None)
+                          for name, method, path, body in route_cases()]
+            if case_filter:
+                cases = [c for c in cases if case_filter in c[0]]
+
+            for name, kind, fn, case_rows in cases:
+                try:
+                    measured = measure(fn, repeat, track_memory=track_memory)
+                except Exception as e:
+                    print(f"  ❌ {name} [{mode}, {rows:,} 行] 失败: {e}")
+                    results.append({'case': name, 'kind': kind, 'rows': rows, 'mode': mode, 'error': str(e)})
+                    continue
+                entry = summarize(name, kind, case_rows or rows, mode, measured)
+                results.append(entry)
+                print(f"  {name:<45} [{mode:<8} {rows:>10,} 行] "
+                      f"中位数 {entry['median_ms']:>9.1f}ms  P95 {entry['p95_ms']:>9.1f}ms")
+
+    return {
+        'started_at': started_at,
+        'fingerprint': machine_fingerprint(),
+        'config': {'sizes': list(sizes), 'repeat': repeat, 'modes': list(modes), 'only': only, 'seed': seed},
+        'results': results,
+    }
+
+
+def _format_bytes(value):
+    if value is None:
+        return '-'
+    return f'{value / 1024 / 1024:.1f}MB'
+
+
+def print_report(report):
+    """以表格形式输出基准结果"""
+    header = (f"{'用例':<45} {'模式':<9} {'行数':>10} {'中位数ms':>10} {'P90ms':>9} {'P99ms':>9} "
+              f"{'次/秒':>8} {'行/秒':>12} {'峰值内存':>10}")
+    print('\n' + '=' * len(header))
+    print(header)
+    print('-' * len(header))
+    for r in report['results']:
+        if 'error' in r:
+            print(f"{r['case']:<45} {r['mode']:<9} {r['rows']:>10,} 失败: {r['error']}")
+            continue
+        print(f"{r['case']:<45} {r['mode']:<9} {r['rows']:>10,} {r['median_ms']:>10.1f} {r['p90_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['calls_per_sec']:>8.2f} {r['rows_per_sec']:>12,.0f} "
+              f"{_format_bytes(r['peak_mem_bytes']):>10}")
+    print('=' * len(header))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='DataProcessor / API 性能基准测试')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'数据集行数，逗号分隔（默认 {DEFAULT_SIZES}）')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'每个用例重复次数（默认 {DEFAULT_REPEAT}）')
+    parser.add_argument('--mode', choices=['snapshot', 'csv', 'both'], default='snapshot', help='数据读取模式')
+    parser.add_argument('--only', choices=['methods', 'routes'], help='仅运行方法或路由用例')
+    parser.add_argument('--case', help='仅运行名称包含该子串的用例')
+    parser.add_argument('--seed', type=int, default=0, help='数据集随机种子（默认 0）')
+    parser.add_argument('--data-dir', default=str(DEFAULT_DATA_DIR), help='数据集缓存目录')
+    parser.add_argument('--no-memory', action='store_true', help='跳过峰值内存测量')
+    parser.add_argument('--json', help='将结果写入 JSON 文件')
+    parser.add_argument('--save', action='store_true', help='保存到结果目录（供 compare_benchmarks.py 对比）')
+    parser.add_argument('--set-baseline', action='store_true', help='保存并将本次结果设为基线')
+    parser.add_argument('--store-dir', default=str(ResultStore().root), help='结果目录（默认 benchmarks/results）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [parse_rows(s) for s in args.sizes.split(',') if s.strip()]
+    modes = ('snapshot', 'csv') if args.mode == 'both' else (args.mode,)
+
+    report = run_suite(sizes, repeat=args.repeat, modes=modes, only=args.only, seed=args.seed,
+                       data_dir=args.data_dir, track_memory=not args.no_memory, case_filter=args.case)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已保存: {args.json}")
+
+    if args.save or args.set_baseline:
+        store = ResultStore(args.store_dir)
+        path = store.save(report)
+        print(f"📄 结果已存档: {path}")
+        if args.set_baseline:
+            print(f"📌 已设为基线: {store.set_baseline(path)}")
+
+    failed = [r for r in report['results'] if 'error' in r]
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+启动耗时基准 - 测量后端模块导入与处理器构建耗时，并按预算判定是否超标
+
+设计说明：
+- 每个用例在全新的 Python 子进程中执行（模块缓存为空），重复 N 次取中位数；
+- 分别记录进程内耗时（导入/构建本身）与子进程总耗时（含解释器启动，即命令行工具与工作进程的实际等待时间）；
+- 进程内耗时超过预算（毫秒）时以非零退出码结束，可用于 CI 防止重量级依赖被重新引入启动路径；
+- --detail 输出 api_server 导入链中累计耗时最高的模块（python -X importtime），便于定位。
+
+用法：
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --repeat 10 --budget api_server=250
+    python benchmarks/startup_benchmark.py --detail 15 --json startup.json
+
+退出码：
+    0  全部用例在预算内
+    1  存在超出预算的用例（或用例执行失败）
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+BACKEND_DIR = PROJECT_ROOT / 'backend'
+
+DEFAULT_REPEAT = 5
+
+# 用例：名称 -> 子进程中执行的代码（_t0 之后的部分计入进程内耗时）
+CASES = {
+    'python': 'pass',
+    'api_server': 'import api_server',
+    'data_processor': 'import data_processor',
+    'DataProcessor()': 'from data_processor import DataProcessor; DataProcessor()',
+    'serve --help': None,  # 以命令行方式运行 serve.py --help，仅记录总耗时
+}
+
+# 进程内耗时预算（毫秒）；data_processor 需要导入 pandas，预算相应放宽
+DEFAULT_BUDGETS_MS = {
+    'api_server': 400,
+    'data_processor': 1500,
+    'DataProcessor()': 1500,
+}
+
+_RUNNER = (
+    "import sys, time, json\n"
+    "sys.path.insert(0, {backend!r})\n"
+    "_t0 = time.perf_counter()\n"
+    "{code}\n"
+    "_elapsed = time.perf_counter() - _t0\n"
+    "print(json.dumps({{'inner_ms': _elapsed * 1000, 'pandas_loaded': 'pandas' in sys.modules}}))\n"
+)
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_case(name, code, repeat):
+    """在全新子进程中重复执行用例，返回统计结果"""
+    inner, total = [], []
+    pandas_loaded = None
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    for _ in range(repeat):
+        if code is None:
+            cmd = [sys.executable, str(BACKEND_DIR / 'serve.py'), '--help']
+        else:
+            cmd = [sys.executable, '-c', _RUNNER.format(backend=str(BACKEND_DIR), code=code)]
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=PROJECT_ROOT, capture_output=True, text=True, env=env)
+        total.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            return {'case': name, 'error': (proc.stderr.strip().splitlines() or ['unknown error'])[-1]}
+        if code is not None:
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            inner.append(result['inner_ms'])
+            pandas_loaded = result['pandas_loaded']
+    entry = {
+        'case': name,
+        'mode': 'startup',
+        'rows': None,
+        'repeat': repeat,
+        'total_median_ms': _percentile(total, 0.5),
+        'total_p90_ms': _percentile(total, 0.9),
+    }
+    if inner:
+        entry.update(median_ms=_percentile(inner, 0.5), p90_ms=_percentile(inner, 0.9), pandas_loaded=pandas_loaded)
+    return entry
+
+
+def import_detail(module='api_server', top=15):
+    """用 -X importtime 统计导入链中累计耗时最高的模块"""
+    code = f"import sys; sys.path.insert(0, {str(BACKEND_DIR)!r}); import {module}"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=PROJECT_ROOT,
+                          capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def parse_budgets(values):
+    """解析 --budget 名称=毫秒 参数"""
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for value in values or []:
+        name, _, ms = value.partition('=')
+        if name not in CASES or not ms:
+            raise SystemExit(f"无效的预算参数: {value}（格式：用例名=毫秒，用例：{', '.join(CASES)}）")
+        budgets[name] = float(ms)
+    return budgets
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='后端启动耗时基准（模块导入与处理器构建）')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help=f'每个用例重复次数（默认 {DEFAULT_REPEAT}）')
+    parser.add_argument('--case', action='append', choices=list(CASES), help='只运行指定用例（可重复）')
+    parser.add_argument('--budget', action='append', metavar='NAME=MS',
+                        help='覆盖进程内耗时预算，如 api_server=250（可重复）')
+    parser.add_argument('--no-budget', action='store_true', help='只输出结果，不按预算判定')
+    parser.add_argument('--detail', type=int, default=0, metavar='N',
+                        help='输出 api_server 导入链中累计耗时最高的 N 个模块')
+    parser.add_argument('--json', help='结果输出到 JSON 文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    budgets = {} if args.no_budget else parse_budgets(args.budget)
+    names = args.case or list(CASES)
+
+    results = [run_case(name, CASES[name], max(1, args.repeat)) for name in names]
+
+    header = f"{'用例':<18} {'进程内ms':>10} {'P90':>8} {'总耗时ms':>10} {'预算ms':>8} {'pandas':>7}  状态"
+    print(header)
+    print('-' * len(header))
+    over = []
+    for entry in results:
+        if 'error' in entry:
+            over.append(entry)
+            print(f"{entry['case']:<18} ❌ {entry['error']}")
+            continue
+        budget = budgets.get(entry['case'])
+        inner = entry.get('median_ms')
+        exceeded = budget is not None and inner is not None and inner > budget
+        entry['budget_ms'] = budget
+        entry['over_budget'] = exceeded
+        if exceeded:
+            over.append(entry)
+        inner_text = f"{inner:.1f}" if inner is not None else '-'
+        p90_text = f"{entry['p90_ms']:.1f}" if inner is not None else '-'
+        pandas_text = {True: '是', False: '否', None: '-'}[entry.get('pandas_loaded')]
+        status = '❌ 超出预算' if exceeded else '✅'
+        print(f"{entry['case']:<18} {inner_text:>10} {p90_text:>8} {entry['total_median_ms']:>10.1f} "
+              f"{budget if budget is not None else '-':>8} {pandas_text:>7}  {status}")
+
+    if args.detail:
+        print(f"\napi_server 导入耗时最高的 {args.detail} 个模块（累计 / 自身，ms）：")
+        for cumulative_us, self_us, name in import_detail(top=args.detail):
+            print(f"  {cumulative_us / 1000:>8.1f} {self_us / 1000:>8.1f}  {name}")
+
+    if args.json:
+        report = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📄 结果已保存: {args.json}")
+
+    if over:
+        print(f"\n❌ {len(over)} 个用例超出预算或执行失败")
+        return 1
+    print("\n✅ 启动耗时在预算内" if budgets else "")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
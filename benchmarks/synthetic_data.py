@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+合成车险清单数据生成器 - 为性能基准测试生成与真实数据结构一致的合并CSV与日报Excel
+
+设计说明：
+- 字段与合并CSV一致（保单号、投保确认时间、业务员、签单/批改保费、险种代码、险别组合、批单类型等），
+  取值口径与 DataProcessor 的判定规则对应（如交强险代码 0301、电销终端来源 0110融合销售）；
+- 结果完全由随机种子决定：同一种子、同一行数生成的文件逐字节一致，不同机器之间可复现；
+- 按块生成并追加写入，千万行级别数据也不会一次性占用全部内存；
+- 业务员优先取自项目的业务员机构团队映射文件，并混入少量未登记业务员以覆盖校验逻辑。
+
+用法：
+    python benchmarks/synthetic_data.py --rows 1m --out benchmarks/.data/merged_1m.csv
+    python benchmarks/synthetic_data.py --rows 100k --out merged.csv --excel-dir data/ --excel-days 3
+
+行数支持 k/m 后缀（10k、100k、1m、10m）。
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_STAFF_MAPPING = PROJECT_ROOT / '业务员机构团队归属.json'
+
+# 合并CSV的列顺序
+SCHEMA_COLUMNS = [
+    '刷新时间', '投保确认时间', '保险起期', '三级机构', '四级机构', '团队', '业务员',
+    '保单号', '险种大类', '险种名称', '险种代码', '单套-险别', '险别组合', '是否续保',
+    '客户类别3', '车险新业务分类', '终端来源', '是否过户车', '是否新能源', '是否异地车',
+    '吨位分段', '签单/批改标识', '批单类型', '签单/批改保费', '签单数量', '手续费', '手续费含税', '增值税',
+]
+
+DEFAULT_START = '2025-08-01'
+DEFAULT_END = '2025-11-06'
+DEFAULT_CHUNK_ROWS = 500_000
+
+# 批改记录占比
+CORRECTION_RATE = 0.03
+# 未在映射文件中登记的业务员占比
+UNMAPPED_STAFF_RATE = 0.02
+
+# (险种代码, 险种名称, 权重)
+PRODUCTS = [
+    ('0301', '0301机动车交通事故责任强制保险', 0.50),
+    ('0312', '0312机动车辆商业保险2020版', 0.35),
+    ('0313', '0313特种车商业保险', 0.03),
+    ('0317', '0317新能源汽车商业保险', 0.12),
+]
+COVERAGE_COMBOS = [('单交', '单交', 0.30), ('主全', '同保主全', 0.45), ('交三', '同保交三', 0.25)]
+RENEWAL_TYPES = [('新保', 0.35), ('续保', 0.45), ('转保', 0.20)]
+CUSTOMER_TYPES = [('非营业个人客车', 0.70), ('营业货车', 0.12), ('摩托车', 0.08),
+                  ('非营业货车', 0.06), ('挂车', 0.02), ('特种车', 0.02)]
+BUSINESS_CLASSES = [('目标业务', 0.45), ('其他', 0.30), ('管控业务', 0.15), ('清亏业务', 0.10)]
+CHANNELS = [('0101柜面', 0.30), ('0106移动展业(App)', 0.45), ('0110融合销售', 0.20), ('0105网络销售', 0.05)]
+TONNAGES = [('', 0.80), ('1吨以下', 0.08), ('1-2吨', 0.06), ('2-10吨', 0.04), ('10吨以上', 0.02)]
+CORRECTION_TYPES = ['16退保', '02批改保费', '19减少险种']
+FALLBACK_ORGS = ['天府', '高新', '新都', '青羊', '武侯', '宜宾', '泸州', '德阳', '乐山', '资阳']
+
+
+def parse_rows(value):
+    """解析行数参数，支持 k/m 后缀（如 10k、1m）"""
+    text = str(value).strip().lower().replace('_', '')
+    multiplier = 1
+    if text.endswith('k'):
+        multiplier, text = 1_000, text[:-1]
+    elif text.endswith('m'):
+        multiplier, text = 1_000_000, text[:-1]
+    rows = int(float(text) * multiplier)
+    if rows <= 0:
+        raise ValueError(f'行数必须为正数: {value}')
+    return rows
+
+
+def load_staff(mapping_file=DEFAULT_STAFF_MAPPING):
+    """
+    读取业务员清单
+
+    Returns:
+        list[tuple]: [(业务员, 三级机构, 四级机构, 团队)]；映射文件缺失时生成固定的虚拟业务员
+    """
+    mapping = {}
+    if mapping_file and Path(mapping_file).exists():
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+    if mapping:
+        return [(name, info.get('三级机构') or '', info.get('四级机构') or '', info.get('团队简称') or '')
+                for name, info in sorted(mapping.items())]
+    return [(f'{200000000 + i}业务员{i:03d}', FALLBACK_ORGS[i % len(FALLBACK_ORGS)],
+             FALLBACK_ORGS[i % len(FALLBACK_ORGS)], f'{FALLBACK_ORGS[i % len(FALLBACK_ORGS)]}团队{i % 3 + 1}')
+            for i in range(240)]
+
+
+def _choice(rng, options, size):
+    """按权重抽样取值；options 为 [(取值..., 权重)]，返回被选中项的下标"""
+    weights = np.array([o[-1] for o in options], dtype=float)
+    return rng.choice(len(options), size=size, p=weights / weights.sum())
+
+
+def _pick(values, idx):
+    """按下标批量取值（返回 object 数组）"""
+    return np.array(values, dtype=object)[idx]
+
+
+def generate_frame(n_rows, seed=0, start=DEFAULT_START, end=DEFAULT_END, staff=None, row_offset=0):
+    """
+    生成一块合成数据
+
+    Args:
+        n_rows: 行数
+        seed: 随机种子
+        start, end: 投保确认时间范围（含两端日期）
+        staff: load_staff() 的结果，默认读取项目映射文件
+        row_offset: 本块首行的全局行号（保证保单号全局唯一，且分块生成结果与种子一一对应）
+
+    Returns:
+        DataFrame: 列顺序与 SCHEMA_COLUMNS 一致
+    """
+    staff = staff if staff is not None else load_staff()
+    rng = np.random.default_rng([seed, row_offset])
+    row_ids = np.arange(row_offset, row_offset + n_rows, dtype=np.int64)
+
+    days = pd.date_range(start, end, freq='D')
+    # 越接近数据截止日业务量越大，模拟业务增长
+    day_weights = np.linspace(1.0, 1.5, len(days))
+    day_idx = rng.choice(len(days), size=n_rows, p=day_weights / day_weights.sum())
+    seconds = rng.integers(8 * 3600, 22 * 3600, size=n_rows)
+    confirm_time = days.values[day_idx] + seconds.astype('timedelta64[s]')
+    confirm_day = days.values[day_idx]
+    start_day = confirm_day + rng.integers(1, 30, size=n_rows).astype('timedelta64[D]')
+
+    # 业务员：少量未登记业务员用于触发映射校验
+    staff_idx = rng.integers(0, len(staff), size=n_rows)
+    staff_names = _pick([s[0] for s in staff], staff_idx)
+    org3 = _pick([s[1] for s in staff], staff_idx)
+    org4 = _pick([s[2] for s in staff], staff_idx)
+    teams = _pick([s[3] for s in staff], staff_idx)
+    unmapped = rng.random(n_rows) < UNMAPPED_STAFF_RATE
+    if unmapped.any():
+        unmapped_ids = rng.integers(0, 50, size=int(unmapped.sum()))
+        staff_names[unmapped] = _pick([f'9990000{i:02d}未登记{i:02d}' for i in range(50)], unmapped_ids)
+        org3[unmapped] = _pick(FALLBACK_ORGS, unmapped_ids % len(FALLBACK_ORGS))
+        org4[unmapped] = org3[unmapped]
+        teams[unmapped] = ''
+
+    product_idx = _choice(rng, PRODUCTS, n_rows)
+    combo_idx = _choice(rng, COVERAGE_COMBOS, n_rows)
+    is_mandatory = product_idx == 0
+
+    # 批改记录：引用更早的保单号，保费可正可负
+    is_correction = rng.random(n_rows) < CORRECTION_RATE
+    policy_ids = row_ids.copy()
+    back = rng.integers(1, 1000, size=n_rows)
+    policy_ids[is_correction] = np.maximum(row_ids[is_correction] - back[is_correction], 0)
+    policy_no = np.char.add('PDAA6103', np.char.zfill(policy_ids.astype(str), 14))
+
+    premium = np.where(is_mandatory, rng.normal(900, 250, n_rows), rng.lognormal(7.6, 0.6, n_rows))
+    premium = np.where(is_correction, rng.normal(-150, 300, n_rows), premium)
+    premium = np.round(premium, 2)
+    commission_rate = rng.uniform(0.02, 0.12, n_rows)
+    commission = np.round(premium * commission_rate, 2)
+
+    correction_type = np.full(n_rows, '', dtype=object)
+    correction_type[is_correction] = _pick(CORRECTION_TYPES, rng.integers(0, len(CORRECTION_TYPES),
+                                                                          size=int(is_correction.sum())))
+
+    df = pd.DataFrame({
+        '刷新时间': pd.Timestamp(end).normalize(),
+        '投保确认时间': confirm_time,
+        '保险起期': start_day,
+        '三级机构': org3,
+        '四级机构': org4,
+        '团队': teams,
+        '业务员': staff_names,
+        '保单号': policy_no.astype(object),
+        '险种大类': '车险',
+        '险种名称': _pick([p[1] for p in PRODUCTS], product_idx),
+        '险种代码': _pick([p[0] for p in PRODUCTS], product_idx),
+        '单套-险别': _pick([c[1] for c in COVERAGE_COMBOS], combo_idx),
+        '险别组合': _pick([c[0] for c in COVERAGE_COMBOS], combo_idx),
+        '是否续保': _pick([r[0] for r in RENEWAL_TYPES], _choice(rng, RENEWAL_TYPES, n_rows)),
+        '客户类别3': _pick([c[0] for c in CUSTOMER_TYPES], _choice(rng, CUSTOMER_TYPES, n_rows)),
+        '车险新业务分类': _pick([b[0] for b in BUSINESS_CLASSES], _choice(rng, BUSINESS_CLASSES, n_rows)),
+        '终端来源': _pick([c[0] for c in CHANNELS], _choice(rng, CHANNELS, n_rows)),
+        '是否过户车': np.where(rng.random(n_rows) < 0.08, '是', '否'),
+        '是否新能源': np.where(rng.random(n_rows) < 0.18, '是', '否'),
+        '是否异地车': np.where(rng.random(n_rows) < 0.05, '是', '否'),
+        '吨位分段': _pick([t[0] for t in TONNAGES], _choice(rng, TONNAGES, n_rows)),
+        '签单/批改标识': np.where(is_correction, '批改', '签单'),
+        '批单类型': correction_type,
+        '签单/批改保费': premium,
+        '签单数量': np.where(is_correction, 0, 1),
+        '手续费': commission,
+        '手续费含税': np.round(commission * 1.06, 2),
+        '增值税': np.round(premium / 1.06 * 0.06, 2),
+    }, columns=SCHEMA_COLUMNS)
+    return df
+
+
+def write_csv(path, n_rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, start=DEFAULT_START, end=DEFAULT_END,
+              staff_mapping=DEFAULT_STAFF_MAPPING):
+    """
+    分块生成并写入合并CSV（utf-8-sig，与生产合并CSV编码一致）
+
+    Returns:
+        Path: 输出文件路径
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staff = load_staff(staff_mapping)
+    tmp_path = path.with_name(f'.{path.name}.tmp')
+    written = 0
+    with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        while written < n_rows:
+            size = min(chunk_rows, n_rows - written)
+            chunk = generate_frame(size, seed=seed, start=start, end=end, staff=staff, row_offset=written)
+            chunk.to_csv(f, index=False, header=(written == 0))
+            written += size
+    tmp_path.replace(path)
+    return path
+
+
+def write_excel_exports(out_dir, n_rows, seed=0, days=1, end=DEFAULT_END, staff_mapping=DEFAULT_STAFF_MAPPING):
+    """
+    生成每日导出的 Excel 文件（DataProcessor.scan_and_process_new_files 的输入）
+
+    Args:
+        out_dir: 输出目录（如项目 data/ 目录）
+        n_rows: 每个文件的行数（单个工作表上限约 104 万行）
+        days: 生成截至 end 的最近几天，每天一个文件
+
+    Returns:
+        list[Path]: 生成的文件路径
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    staff = load_staff(staff_mapping)
+    paths = []
+    for i, day in enumerate(pd.date_range(end=end, periods=days, freq='D')):
+        day_str = day.strftime('%Y-%m-%d')
+        df = generate_frame(n_rows, seed=seed, start=day_str, end=day_str, staff=staff,
+                            row_offset=(i + 1) * 10 ** 12)
+        path = out_dir / f'车险清单_{day.strftime("%Y%m%d")}_synthetic.xlsx'
+        df.to_excel(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成合成车险清单数据（合并CSV / 每日Excel）')
+    parser.add_argument('--rows', default='100k', help='合并CSV行数，支持 k/m 后缀（默认 100k）')
+    parser.add_argument('--out', help='合并CSV输出路径（不指定则不生成CSV）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认 0）')
+    parser.add_argument('--start', default=DEFAULT_START, help=f'起始日期（默认 {DEFAULT_START}）')
+    parser.add_argument('--end', default=DEFAULT_END, help=f'截止日期（默认 {DEFAULT_END}）')
+    parser.add_argument('--excel-dir', help='每日Excel输出目录（不指定则不生成Excel）')
+    parser.add_argument('--excel-days', type=int, default=1, help='生成最近几天的Excel（默认 1）')
+    parser.add_argument('--excel-rows', default='10k', help='每个Excel文件行数（默认 10k）')
+    parser.add_argument('--staff-mapping', default=str(DEFAULT_STAFF_MAPPING), help='业务员映射文件')
+    args = parser.parse_args(argv)
+
+    if not args.out and not args.excel_dir:
+        parser.error('请至少指定 --out 或 --excel-dir')
+
+    if args.out:
+        rows = parse_rows(args.rows)
+        path = write_csv(args.out, rows, seed=args.seed, start=args.start, end=args.end,
+                         staff_mapping=args.staff_mapping)
+        print(f"✅ 合并CSV已生成: {path} ({rows:,} 行)")
+
+    if args.excel_dir:
+        paths = write_excel_exports(args.excel_dir, parse_rows(args.excel_rows), seed=args.seed,
+                                    days=args.excel_days, end=args.end, staff_mapping=args.staff_mapping)
+        for path in paths:
+            print(f"✅ Excel已生成: {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
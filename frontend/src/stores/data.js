@@ -41,6 +41,13 @@ export const useDataStore = defineStore('data', () => {
   // 饼图加载状态
   const pieChartsLoading = ref(false)
 
+  // 当前数据快照版本（由 /api/stream 推送，版本变化即表示后端数据已刷新）
+  const dataVersion = ref(null)
+
+  // 数据更新订阅连接（EventSource）
+  let updateSource = null
+  let resubscribeTimer = null
+
   // ========== Getters ==========
 
   /**
@@ -266,6 +273,10 @@ export const useDataStore = defineStore('data', () => {
       if (response.data.success) {
         // 刷新成功后,重新获取所有数据
         await refreshAllData()
+        // 记录新版本号，避免随后收到的推送事件重复拉取
+        if (response.data.version) {
+          dataVersion.value = response.data.version
+        }
         return response.data
       } else {
         throw new Error(response.data.message || 'Failed to refresh data')
@@ -418,6 +429,92 @@ export const useDataStore = defineStore('data', () => {
     }
   }
 
+  /**
+   * 处理后端推送的快照更新事件
+   * 函数级中文注释：
+   * - 首次连接收到的事件仅记录版本号（页面挂载时已加载数据）；
+   * - 版本变化时：若当前为默认视图（无筛选、查看最新日期），直接使用推送的KPI，
+   *   只补拉图表数据；否则按当前筛选条件重新拉取全部数据。
+   * @param {object} payload - { version, latest_date, kpi: { exclude_correction, include_correction } }
+   */
+  async function applySnapshotUpdate(payload) {
+    const appStore = useAppStore()
+    const filterStore = useFilterStore()
+
+    const previousVersion = dataVersion.value
+    if (!payload?.version || payload.version === previousVersion) return
+    if (previousVersion === null) {
+      dataVersion.value = payload.version
+      return
+    }
+
+    const filters = filterStore.getActiveFilters()
+    const isDefaultView = Object.keys(filters).length === 0 &&
+      (!appStore.selectedDate || appStore.selectedDate === appStore.latestDate)
+    const pushedKpi = payload.kpi?.[filterStore.getDataScope()]
+
+    try {
+      if (isDefaultView && pushedKpi) {
+        // 默认视图跟随最新日期
+        appStore.setSelectedDate(payload.latest_date)
+        appStore.setLatestDate(payload.latest_date)
+        kpiData.value = pushedKpi
+        if (pushedKpi.validation) {
+          validationInfo.value = pushedKpi.validation
+        }
+        lastUpdated.value = new Date().toISOString()
+        await fetchChartData(appStore.currentMetric, filters, payload.latest_date)
+      } else {
+        await refreshAllData(appStore.selectedDate)
+      }
+    } catch (error) {
+      console.error('Failed to apply snapshot update:', error)
+    } finally {
+      // 版本号最后更新，供页面监听后刷新其余面板（如饼图）
+      dataVersion.value = payload.version
+    }
+  }
+
+  /**
+   * 订阅后端数据更新（Server-Sent Events），替代定时轮询
+   * 说明：连接断开后浏览器会自动重连并携带 Last-Event-ID，无需手动重试；
+   * 订阅数已满（服务端返回 503）时浏览器不会重连，30 秒后重新订阅。
+   */
+  function subscribeUpdates() {
+    if (updateSource || typeof EventSource === 'undefined') return
+    const source = new EventSource('/api/stream')
+    updateSource = source
+    source.addEventListener('snapshot', (event) => {
+      try {
+        applySnapshotUpdate(JSON.parse(event.data))
+      } catch (error) {
+        console.error('Failed to parse snapshot event:', error)
+      }
+    })
+    source.onerror = () => {
+      if (source.readyState !== EventSource.CLOSED || updateSource !== source) return
+      updateSource = null
+      resubscribeTimer = setTimeout(() => {
+        resubscribeTimer = null
+        subscribeUpdates()
+      }, 30000)
+    }
+  }
+
+  /**
+   * 取消数据更新订阅
+   */
+  function unsubscribeUpdates() {
+    if (resubscribeTimer) {
+      clearTimeout(resubscribeTimer)
+      resubscribeTimer = null
+    }
+    if (updateSource) {
+      updateSource.close()
+      updateSource = null
+    }
+  }
+
   // ========== Return ==========
 
   return {
@@ -432,6 +529,7 @@ export const useDataStore = defineStore('data', () => {
     premiumRangeData,
     renewalTypeData,
     pieChartsLoading,
+    dataVersion,
 
     // Getters
     hasKpiData,
@@ -452,6 +550,8 @@ export const useDataStore = defineStore('data', () => {
     fetchInsuranceTypeData,
     fetchPremiumRangeData,
     fetchRenewalTypeData,
-    refreshPieCharts
+    refreshPieCharts,
+    subscribeUpdates,
+    unsubscribeUpdates
   }
 })
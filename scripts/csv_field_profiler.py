@@ -12,14 +12,40 @@ CSV 字段分析器
 使用：
 - 直接运行本脚本，会分析项目根目录下的 `车险清单_2025年10-11月_合并.csv` 并在 `开发文档/` 生成同名字段说明文档；
 - 也可通过命令行参数指定输入/输出路径。
+
+大文件：
+- 按块流式读取（--chunk-rows），每列只保留累加器（类型/格式计数、范围、文本取值计数），
+  内存占用与行数无关，只与文本字段的不同取值数相关；
+- --max-distinct 可限制每个文本字段记录的不同取值数（超出部分只计条数），用于取值极多的字段；
+- --workers N 多进程分析：各进程分析不同的数据块，主进程按顺序合并各列累加器，结果与单进程一致；
+- --engine 选择识别引擎：vectorized 按列批量识别（每个不同取值只识别一次，标准写法的日期/数字批量解析，
+  依赖 pandas），python 逐值识别；默认 auto（可用 pandas 时使用 vectorized），两种引擎输出的文档完全一致；
+- --approximate 近似模式（大文件快速初查）：类型/格式/值域基于每字段固定大小的蓄水池样本估计，
+  不同取值数使用 HyperLogLog 估计，文本取值只保留高频取值摘要（Misra-Gries，计数低估有上限），
+  误差由 --distinct-error / --top-error 配置，内存与行数及不同取值数均无关。
 """
 
 import csv
+import hashlib
+import heapq
+import math
 import os
+import random
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from collections import Counter, defaultdict
-from typing import List, Dict, Tuple, Optional, Any, Type, Union
+from collections import Counter, defaultdict, deque
+from typing import List, Dict, Iterator, Tuple, Optional, Any, Type, Union, NamedTuple, Sequence
+
+
+# 流式读取的默认每块行数
+DEFAULT_CHUNK_ROWS = 50000
+
+# 多进程模式的默认每块行数（块越小，各进程负载越均衡）
+DEFAULT_PARALLEL_CHUNK_ROWS = 10000
+
+# 识别引擎：auto（可用 pandas 时向量化）/ vectorized / python
+ENGINES = ("auto", "vectorized", "python")
 
 
 # -----------------------------
@@ -171,6 +197,342 @@ def _classify_numeric(value: str) -> Optional[Dict[str, Any]]:
     return None
 
 
+def _classify_value(s: str) -> Tuple[str, Any]:
+    """按识别顺序对单个已去空白的非缺失值归类（中文函数级注释）
+
+    返回：
+    - ("date", (datetime, format, has_time))：日期/时间；
+    - ("numeric", num_info)：数值/百分比/货币（见 `_classify_numeric`）；
+    - ("text", None)：文本。
+    """
+    d = _detect_date(s)
+    if d:
+        return "date", d
+    num_info = _classify_numeric(s)
+    if num_info:
+        return "numeric", num_info
+    return "text", None
+
+
+# -----------------------------
+# 向量化识别（批量快速路径）
+# -----------------------------
+
+_MISSING_MARKERS = ["", "na", "n/a", "null", "none", "-"]
+
+# 日期/数值/百分比/货币写法可能用到的全部字符（含 Unicode 数字、空白、分隔符与货币符号/单位，
+# 以及忽略大小写匹配时等同于 K 的开尔文符号）；含其他任何字符的取值不可能被识别为日期或数值，必为文本
+_NON_TEXT_CHARS = r"[^\d\s\-/.:+,%¥￥$元人民币RMBCNYHKrmbcnyhk\u212a]"
+
+# 不含千分位与符号的普通数字：`_classify_numeric` 将其识别为“货币（含符号/单位）”；
+# 6~8 位无符号纯数字可能被 %Y%m%d 识别为日期，不走快速路径
+_PLAIN_NUMBER = r"[-+]?[0-9]+(?:\.[0-9]+)?"
+_DIGITS_MAYBE_DATE = r"[0-9]{6,8}"
+_PLAIN_NUMBER_FORMAT = "货币（含符号/单位）"
+
+# 补零的标准日期/时间写法及 `_detect_date` 中能匹配它的首个格式（各写法互斥）；
+# 批量解析失败（如非法日期）的取值回到逐值识别
+_STRICT_DATE_PATTERNS = [
+    (r"[0-9]{4}-[0-9]{2}-[0-9]{2}", "%Y-%m-%d", False),
+    (r"[0-9]{4}/[0-9]{2}/[0-9]{2}", "%Y/%m/%d", False),
+    (r"[0-9]{4}\.[0-9]{2}\.[0-9]{2}", "%Y.%m.%d", False),
+    (r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}", "%Y-%m-%d %H:%M", True),
+    (r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}", "%Y-%m-%d %H:%M:%S", True),
+    (r"[0-9]{4}/[0-9]{2}/[0-9]{2} [0-9]{2}:[0-9]{2}", "%Y/%m/%d %H:%M", True),
+    (r"[0-9]{4}/[0-9]{2}/[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}", "%Y/%m/%d %H:%M:%S", True),
+]
+
+
+def _stripped_counts(values: Sequence[str]) -> Dict[str, int]:
+    """统计去除首尾空白后的各取值条数（按首次出现顺序；先对原始值计数，只对不同取值去空白）"""
+    counts: Dict[str, int] = {}
+    for value, count in Counter(values).items():
+        key = value.strip()
+        counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def _vectorized_available() -> bool:
+    """是否可用向量化识别（依赖 pandas）"""
+    try:
+        import pandas  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ColumnProfile:
+    """单列流式累加器（中文函数级注释）
+
+    说明：
+    - 逐个值更新类型计数、格式计数、货币符号、数值/日期/文本长度范围与文本取值计数，
+      不保存原始列数据，内存占用与行数无关，只与文本字段的不同取值数相关；
+    - keep_values=False 时不记录文本取值明细（敏感字段章节删除、隐私字段屏蔽明细，文档中不会用到）；
+    - max_distinct 限制文本取值计数器的大小：达到上限后新出现的取值只计入 text_overflow，
+      已记录取值的计数仍然准确；默认不限制（穷举全部取值）；
+    - 可合并（merge）：计数相加、范围取并、has_time 取或，满足结合律。按数据顺序依次合并各块的
+      累加器时，结果（含计数器中取值的先后顺序）与顺序逐行累加完全一致，可用于多进程分块分析；
+    - add 逐值累加；add_values 按列批量累加（向量化引擎），两者结果完全一致。
+    """
+
+    def __init__(self, keep_values: bool = True, max_distinct: Optional[int] = None):
+        self.keep_values = keep_values
+        self.max_distinct = max_distinct
+        self.total = 0
+        self.missing = 0
+        self.type_counts: Counter = Counter()
+        self.formats: Counter = Counter()
+        self.currency_symbols: Counter = Counter()
+        self.numeric_min: Optional[float] = None
+        self.numeric_max: Optional[float] = None
+        self.date_min: Optional[datetime] = None
+        self.date_max: Optional[datetime] = None
+        self.has_time = False
+        self.text_counter: Counter = Counter()
+        self.text_overflow = 0
+        self.text_len_min: Optional[int] = None
+        self.text_len_max: Optional[int] = None
+
+    def add(self, raw: str) -> None:
+        """累加单个原始值（识别顺序：缺失 → 日期/时间 → 数值/百分比/货币 → 文本）"""
+        self.total += 1
+        if _is_missing(raw):
+            self.missing += 1
+            return
+        s = str(raw).strip()
+        kind, info = _classify_value(s)
+        if kind == "date":
+            self._add_date(info, 1)
+        elif kind == "numeric":
+            self._add_numeric(info, 1)
+        else:
+            self._add_text(s, 1)
+
+    def _add_date(self, info: Tuple[datetime, str, bool], count: int) -> None:
+        """累加日期/时间取值（info 为 `_detect_date` 的返回值）"""
+        dt, fmt, has_time = info
+        self.type_counts["datetime" if has_time else "date"] += count
+        self.formats[fmt] += count
+        self.has_time = self.has_time or has_time
+        self.date_min = dt if self.date_min is None or dt < self.date_min else self.date_min
+        self.date_max = dt if self.date_max is None or dt > self.date_max else self.date_max
+
+    def _add_numeric(self, num_info: Dict[str, Any], count: int) -> None:
+        """累加数值/百分比/货币取值（num_info 为 `_classify_numeric` 的返回值）"""
+        cat = num_info["category"]
+        self.type_counts[cat] += count
+        self.formats[num_info["format"]] += count
+        if cat == "currency" and num_info.get("currency_symbol"):
+            self.currency_symbols[num_info["currency_symbol"]] += count
+        val = num_info["numeric_value"]
+        self.numeric_min = val if self.numeric_min is None or val < self.numeric_min else self.numeric_min
+        self.numeric_max = val if self.numeric_max is None or val > self.numeric_max else self.numeric_max
+
+    def add_values(self, values: Sequence[str]) -> None:
+        """向量化累加一批原始值（结果与逐个 add 完全一致）（中文函数级注释）
+
+        步骤：
+        - 去除首尾空白后按取值计数（保持首次出现顺序），每个不同取值只识别一次；
+        - 批量判定：缺失标记、含日期/数值不可能出现的字符（必为文本）、普通数字、
+          补零的标准日期/时间写法（按对应格式批量解析）；
+        - 其余取值（千分位/货币符号/百分比/非补零日期/6~8 位纯数字等）逐个调用原有识别函数；
+        - 格式与货币符号按首次出现顺序计入，Markdown 中同频次格式的先后顺序与逐值累加一致。
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not values:
+            return
+        value_counts = _stripped_counts(values)
+        distinct = pd.Series(list(value_counts), dtype=object)
+        counts = np.fromiter(value_counts.values(), dtype=np.int64, count=len(value_counts))
+        size = len(distinct)
+        self.total += len(values)
+
+        # 每个不同取值的归类：MISSING / TEXT / PLAIN（普通数字）/ DATE / NUMERIC（逐值识别的数值）/ OPEN（待识别）
+        MISSING, TEXT, PLAIN, DATE, NUMERIC, OPEN = range(6)
+        kind = np.full(size, OPEN, dtype=np.int8)
+        kind[distinct.str.lower().isin(_MISSING_MARKERS).to_numpy()] = MISSING
+        kind[(kind == OPEN) & distinct.str.contains(_NON_TEXT_CHARS, regex=True).to_numpy()] = TEXT
+        kind[(kind == OPEN) & distinct.str.fullmatch(_PLAIN_NUMBER).to_numpy()
+             & ~distinct.str.fullmatch(_DIGITS_MAYBE_DATE).to_numpy()] = PLAIN
+
+        labels = np.empty(size, dtype=object)
+        dates = np.full(size, np.datetime64("NaT"), dtype="datetime64[us]")
+        with_time = np.zeros(size, dtype=bool)
+        for pattern, fmt, has_time in _STRICT_DATE_PATTERNS:
+            candidates = np.flatnonzero((kind == OPEN) & distinct.str.fullmatch(pattern).to_numpy())
+            if not len(candidates):
+                continue
+            stamps = pd.to_datetime(distinct.iloc[candidates], format=fmt, errors="coerce").to_numpy()
+            ok = ~np.isnat(stamps)
+            hit = candidates[ok]
+            kind[hit] = DATE
+            labels[hit] = fmt
+            dates[hit] = stamps[ok].astype("datetime64[us]")
+            with_time[hit] = has_time
+
+        # 逐值识别剩余取值
+        numeric_info = {}
+        for i in np.flatnonzero(kind == OPEN):
+            category, info = _classify_value(distinct.iat[i])
+            if category == "date":
+                dt, fmt, has_time = info
+                kind[i] = DATE
+                labels[i] = fmt
+                dates[i] = np.datetime64(dt, "us")
+                with_time[i] = has_time
+            elif category == "numeric":
+                kind[i] = NUMERIC
+                labels[i] = info["format"]
+                numeric_info[i] = info
+            else:
+                kind[i] = TEXT
+
+        self.missing += int(counts[kind == MISSING].sum())
+
+        # 类型与格式计数：按首次出现顺序分组求和后计入（计数器中的先后顺序与逐值累加一致）
+        plain = kind == PLAIN
+        is_date = kind == DATE
+        categories = np.full(size, "text", dtype=object)
+        categories[plain] = "currency"  # `_classify_numeric` 将普通数字归为无符号货币
+        categories[is_date & with_time] = "datetime"
+        categories[is_date & ~with_time] = "date"
+        for i, info in numeric_info.items():
+            categories[i] = info["category"]
+        labels[plain] = _PLAIN_NUMBER_FORMAT
+        present = np.flatnonzero(kind != MISSING)
+        labelled = np.flatnonzero(plain | is_date | (kind == NUMERIC))
+        for counter, keys, idx in ((self.type_counts, categories, present), (self.formats, labels, labelled)):
+            if len(idx):
+                grouped = pd.Series(counts[idx]).groupby(keys[idx], sort=False).sum()
+                counter.update(dict(zip(grouped.index, grouped.to_numpy().tolist())))
+
+        if plain.any():
+            numbers = distinct[plain].to_numpy().astype(float)
+            self._merge_range("numeric", float(numbers.min()), float(numbers.max()))
+        if is_date.any():
+            self.has_time = self.has_time or bool((is_date & with_time).any())
+            self._merge_range("date", dates[is_date].min().item(), dates[is_date].max().item())
+
+        # 逐值识别出的数值/百分比/货币：范围与货币符号
+        symbols: Dict[str, int] = {}
+        for i, info in numeric_info.items():
+            cat = info["category"]
+            if cat == "currency" and info.get("currency_symbol"):
+                symbol = info["currency_symbol"]
+                symbols[symbol] = symbols.get(symbol, 0) + int(counts[i])
+            self._merge_range("numeric", info["numeric_value"], info["numeric_value"])
+        self.currency_symbols.update(symbols)
+
+        # 文本（保持首次出现顺序，max_distinct 的截断结果与逐值累加一致）
+        text_idx = np.flatnonzero(kind == TEXT)
+        if len(text_idx):
+            text_values = distinct.iloc[text_idx]
+            lengths = text_values.str.len().to_numpy()
+            self.text_len_min = _merge_bound(self.text_len_min, int(lengths.min()), min)
+            self.text_len_max = _merge_bound(self.text_len_max, int(lengths.max()), max)
+            if self.keep_values:
+                for value, count in zip(text_values.tolist(), counts[text_idx].tolist()):
+                    if value in self.text_counter or self.max_distinct is None or len(self.text_counter) < self.max_distinct:
+                        self.text_counter[value] += count
+                    else:
+                        self.text_overflow += count
+
+    def _merge_range(self, name: str, low: Any, high: Any) -> None:
+        """以 [low, high] 更新数值或日期范围"""
+        setattr(self, f"{name}_min", _merge_bound(getattr(self, f"{name}_min"), low, min))
+        setattr(self, f"{name}_max", _merge_bound(getattr(self, f"{name}_max"), high, max))
+
+    def _add_text(self, s: str, count: int) -> None:
+        """累加文本取值（count 为该取值出现次数）"""
+        self.type_counts["text"] += count
+        if self.keep_values:
+            if s in self.text_counter or self.max_distinct is None or len(self.text_counter) < self.max_distinct:
+                self.text_counter[s] += count
+            else:
+                self.text_overflow += count
+        l = len(s)
+        self.text_len_min = l if self.text_len_min is None or l < self.text_len_min else self.text_len_min
+        self.text_len_max = l if self.text_len_max is None or l > self.text_len_max else self.text_len_max
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        """合并另一累加器（other 对应的数据位于本累加器之后），返回自身
+
+        说明：
+        - 未设置 max_distinct 时结果与顺序累加一致；设置上限时，各块各自截断后再合并，
+          记录的取值集合可能与顺序累加不同（计数与条数合计仍然准确）。
+        """
+        self.total += other.total
+        self.missing += other.missing
+        self.type_counts.update(other.type_counts)
+        self.formats.update(other.formats)
+        self.currency_symbols.update(other.currency_symbols)
+        self.numeric_min = _merge_bound(self.numeric_min, other.numeric_min, min)
+        self.numeric_max = _merge_bound(self.numeric_max, other.numeric_max, max)
+        self.date_min = _merge_bound(self.date_min, other.date_min, min)
+        self.date_max = _merge_bound(self.date_max, other.date_max, max)
+        self.has_time = self.has_time or other.has_time
+        self.text_len_min = _merge_bound(self.text_len_min, other.text_len_min, min)
+        self.text_len_max = _merge_bound(self.text_len_max, other.text_len_max, max)
+        self.text_overflow += other.text_overflow
+        if self.max_distinct is None:
+            self.text_counter.update(other.text_counter)
+        else:
+            for value, count in other.text_counter.items():
+                if value in self.text_counter or len(self.text_counter) < self.max_distinct:
+                    self.text_counter[value] += count
+                else:
+                    self.text_overflow += count
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """生成列摘要（字段与 `_summarize_column` 一致，另含 text_overflow）"""
+        type_counts = self.type_counts
+        non_missing = self.total - self.missing
+
+        # 最终类型判定优先级
+        final_type = None
+        if type_counts["date"] + type_counts["datetime"] == non_missing and non_missing > 0:
+            final_type = "日期时间" if type_counts["datetime"] > 0 else "日期"
+        elif type_counts["percentage"] == non_missing and non_missing > 0:
+            final_type = "百分比"
+        elif type_counts["currency"] == non_missing and non_missing > 0:
+            final_type = "货币"
+        elif (type_counts["integer"] + type_counts["float"]) == non_missing and non_missing > 0:
+            final_type = "数值（整数/浮点）" if (type_counts["integer"] > 0 and type_counts["float"] > 0) else ("整数" if type_counts["integer"] > 0 else "浮点数")
+        else:
+            final_type = "文本"
+
+        return {
+            "total": self.total,
+            "missing": self.missing,
+            "non_missing": non_missing,
+            "type_counts": type_counts,
+            "final_type": final_type,
+            "formats": self.formats,
+            "currency_symbols": self.currency_symbols,
+            "numeric_min": self.numeric_min,
+            "numeric_max": self.numeric_max,
+            "date_min": self.date_min,
+            "date_max": self.date_max,
+            "has_time": self.has_time,
+            "text_counter": self.text_counter,
+            "text_overflow": self.text_overflow,
+            "text_len_min": self.text_len_min,
+            "text_len_max": self.text_len_max,
+        }
+
+
+def _merge_bound(a: Any, b: Any, pick) -> Any:
+    """合并两个可能为空的范围端点（pick 为 min 或 max）"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return pick(a, b)
+
+
 def _summarize_column(values: List[str]) -> Dict[str, Any]:
     """对单列数据进行类型归类与统计（中文函数级注释）
 
@@ -180,85 +542,257 @@ def _summarize_column(values: List[str]) -> Dict[str, Any]:
     输出：
     - 包含类型计数、格式集合、范围（数值/日期/文本长度）、唯一值等的综合摘要
     """
-    missing = 0
-    type_counts = Counter()
-    formats = Counter()
-    currency_symbols = Counter()
-    numeric_min, numeric_max = None, None
-    date_min, date_max = None, None
-    has_time_flag = False
-    text_counter = Counter()
-    text_len_min, text_len_max = None, None
-
+    profile = ColumnProfile()
     for raw in values:
-        if _is_missing(raw):
-            missing += 1
-            continue
-        # 日期/时间识别
-        d = _detect_date(str(raw))
-        if d:
-            dt, fmt, has_time = d
-            type_counts["datetime" if has_time else "date"] += 1
-            formats[fmt] += 1
-            has_time_flag = has_time_flag or has_time
-            date_min = dt if date_min is None or dt < date_min else date_min
-            date_max = dt if date_max is None or dt > date_max else date_max
-            continue
+        profile.add(raw)
+    return profile.summary()
+
+
+# -----------------------------
+# 近似模式：蓄水池样本 / HyperLogLog / 高频取值摘要
+# -----------------------------
+
+# 近似模式默认参数：每字段样本条数、不同取值数相对误差、高频取值计数误差（占总条数比例）
+DEFAULT_SAMPLE_SIZE = 5000
+DEFAULT_DISTINCT_ERROR = 0.01
+DEFAULT_TOP_ERROR = 0.001
+
+# HyperLogLog 精度（寄存器数为 2^p）范围
+_HLL_MIN_PRECISION = 4
+_HLL_MAX_PRECISION = 18
 
-        # 数值/百分比/货币识别
-        num_info = _classify_numeric(str(raw))
-        if num_info:
-            cat = num_info["category"]
-            type_counts[cat] += 1
-            formats[num_info["format"]] += 1
-            if cat == "currency" and num_info.get("currency_symbol"):
-                currency_symbols[num_info["currency_symbol"]] += 1
-            val = num_info["numeric_value"]
-            numeric_min = val if numeric_min is None or val < numeric_min else numeric_min
-            numeric_max = val if numeric_max is None or val > numeric_max else numeric_max
-            continue
 
-        # 文本
+class ApproxConfig(NamedTuple):
+    """近似模式参数（中文函数级注释）
+
+    - sample_size：每字段蓄水池样本条数（类型/格式/值域基于样本估计）；
+    - distinct_error：不同取值数的目标相对标准误差（决定 HyperLogLog 寄存器数）；
+    - top_error：高频取值计数的误差上限（占总条数的比例，决定摘要保留的取值数）；
+    - seed：随机种子（同一参数与分块下结果可复现）。
+    """
+
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+    distinct_error: float = DEFAULT_DISTINCT_ERROR
+    top_error: float = DEFAULT_TOP_ERROR
+    seed: int = 0
+
+    @property
+    def hll_precision(self) -> int:
+        """满足相对误差 1.04/sqrt(2^p) ≤ distinct_error 的最小精度 p"""
+        p = math.ceil(math.log2((1.04 / self.distinct_error) ** 2))
+        return min(max(p, _HLL_MIN_PRECISION), _HLL_MAX_PRECISION)
+
+    @property
+    def top_capacity(self) -> int:
+        """高频取值摘要保留的取值数 k（低估上限为 总条数/(k+1) < 总条数 × top_error）"""
+        return math.ceil(1 / self.top_error)
+
+
+def _hash64(value: str) -> int:
+    """字符串的 64 位哈希（逐值引擎使用；向量化引擎使用 pandas 的批量哈希）"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _HyperLogLog:
+    """HyperLogLog 不同取值数估计（2^p 个 8 位寄存器，可按寄存器取最大值合并）"""
+
+    def __init__(self, precision: int):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hash(self, h: int) -> None:
+        p = self.precision
+        rest = h & ((1 << (64 - p)) - 1)
+        rank = 64 - p - rest.bit_length() + 1
+        idx = h >> (64 - p)
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add_hashes(self, hashes) -> None:
+        """批量累加 uint64 哈希数组（numpy）"""
+        import numpy as np
+
+        p = self.precision
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        high = (rest >> np.uint64(32)).astype(np.float64)
+        low = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        # 32 位以内的整数可由 float64 精确表示，frexp 的指数即二进制位数
+        bits = np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+        ranks = (64 - p - bits + 1).astype(np.uint8)
+        idx = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        np.maximum.at(np.frombuffer(self.registers, dtype=np.uint8), idx, ranks)
+
+    def merge(self, other: "_HyperLogLog") -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))  # 小基数修正（线性计数）
+        return round(raw)
+
+
+class ApproxColumnProfile:
+    """单列近似累加器（中文函数级注释）
+
+    说明：
+    - 总条数与缺失数精确统计；
+    - 类型/格式/货币符号/值域/文本长度：对蓄水池样本（每个取值赋随机键，保留键最小的 k 条，
+      即无放回均匀抽样，可直接合并）做精确识别后按比例折算，识别成本与行数无关；
+    - 不同取值数：HyperLogLog，内存 2^p 字节；
+    - 高频取值：Misra-Gries 摘要，最多保留 k 个取值，计数为下界，低估量不超过 top_error_bound
+      （出现次数超过该值的取值一定被保留）；未发生裁剪时即为精确的取值全集；
+    - 可合并（merge）：样本取两侧随机键最小的 k 条、寄存器取最大值、摘要相加后裁剪，误差上限仍然成立；
+    - 内存上限：样本条数 + 寄存器数 + 2k 个摘要取值，与行数及不同取值数无关。
+    """
+
+    def __init__(self, keep_values: bool, config: ApproxConfig, seed: Any = 0, vectorized: bool = False):
+        self.keep_values = keep_values
+        self.config = config
+        self.vectorized = vectorized
+        self.total = 0
+        self.missing = 0
+        self._rng = random.Random(seed)
+        self._np_rng = None
+        self._seed = seed
+        # 样本以 (-随机键, 取值) 的堆保存：保留随机键最小的 k 条，即无放回均匀样本
+        self._sample: List[Tuple[float, str]] = []
+        self.hll = _HyperLogLog(config.hll_precision)
+        self.top: Dict[str, int] = {}
+        self.top_error_bound = 0
+        self._pending: Counter = Counter()
+
+    # 高频取值摘要
+    def _update_top(self, counts: Dict[str, int]) -> None:
+        """合并一批取值计数并裁剪到 k 个取值（减去第 k+1 大的计数，低估上限相应增加）"""
+        top = self.top
+        for value, count in counts.items():
+            top[value] = top.get(value, 0) + count
+        k = self.config.top_capacity
+        if len(top) > k:
+            threshold = sorted(top.values(), reverse=True)[k]
+            self.top = {v: c - threshold for v, c in top.items() if c > threshold}
+            self.top_error_bound += threshold
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._update_top(self._pending)
+            self._pending = Counter()
+
+    def add(self, raw: str) -> None:
+        """累加单个原始值"""
         s = str(raw).strip()
-        type_counts["text"] += 1
-        text_counter[s] += 1
-        l = len(s)
-        text_len_min = l if text_len_min is None or l < text_len_min else text_len_min
-        text_len_max = l if text_len_max is None or l > text_len_max else text_len_max
-
-    total = len(values)
-    non_missing = total - missing
-
-    # 最终类型判定优先级
-    final_type = None
-    if type_counts["date"] + type_counts["datetime"] == non_missing and non_missing > 0:
-        final_type = "日期时间" if type_counts["datetime"] > 0 else "日期"
-    elif type_counts["percentage"] == non_missing and non_missing > 0:
-        final_type = "百分比"
-    elif type_counts["currency"] == non_missing and non_missing > 0:
-        final_type = "货币"
-    elif (type_counts["integer"] + type_counts["float"]) == non_missing and non_missing > 0:
-        final_type = "数值（整数/浮点）" if (type_counts["integer"] > 0 and type_counts["float"] > 0) else ("整数" if type_counts["integer"] > 0 else "浮点数")
-    else:
-        final_type = "文本"
-
-    return {
-        "total": total,
-        "missing": missing,
-        "non_missing": non_missing,
-        "type_counts": type_counts,
-        "final_type": final_type,
-        "formats": formats,
-        "currency_symbols": currency_symbols,
-        "numeric_min": numeric_min,
-        "numeric_max": numeric_max,
-        "date_min": date_min,
-        "date_max": date_max,
-        "has_time": has_time_flag,
-        "text_counter": text_counter,
-        "text_len_min": text_len_min,
-        "text_len_max": text_len_max,
-    }
+        self.total += 1
+        key = -self._rng.random()
+        if len(self._sample) < self.config.sample_size:
+            heapq.heappush(self._sample, (key, s))
+        elif key > self._sample[0][0]:
+            heapq.heapreplace(self._sample, (key, s))
+        if s.lower() in _MISSING_MARKERS:
+            self.missing += 1
+            return
+        self.hll.add_hash(_hash64(s))
+        if self.keep_values:
+            self._pending[s] += 1
+            if len(self._pending) >= 2 * self.config.top_capacity:
+                self._flush()
+
+    def _sample_array(self, values) -> None:
+        """为一批原始取值批量生成随机键，键小于当前样本最大键的取值入样（通常只有少数）"""
+        import numpy as np
+
+        if self._np_rng is None:
+            digest = hashlib.blake2b(str(self._seed).encode("utf-8"), digest_size=8).digest()
+            self._np_rng = np.random.default_rng(int.from_bytes(digest, "little"))
+        k = self.config.sample_size
+        heap = self._sample
+        keys = self._np_rng.random(len(values))
+        picked = np.flatnonzero(keys < -heap[0][0]) if len(heap) >= k else np.arange(len(values))
+        if len(picked) > k:
+            picked = picked[np.argpartition(keys[picked], k - 1)[:k]]
+        for key, i in zip(keys[picked].tolist(), picked.tolist()):
+            if len(heap) < k:
+                heapq.heappush(heap, (-key, values[i].strip()))
+            elif -key > heap[0][0]:
+                heapq.heapreplace(heap, (-key, values[i].strip()))
+
+    def add_values(self, values: Sequence[str]) -> None:
+        """按列批量累加一批原始值（向量化引擎）"""
+        import numpy as np
+        import pandas as pd
+
+        if not values:
+            return
+        self.total += len(values)
+        self._sample_array(values)
+        counts = _stripped_counts(values)
+        missing = [v for v in counts if v.lower() in _MISSING_MARKERS]
+        for value in missing:
+            self.missing += counts.pop(value)
+        if not counts:
+            return
+        self.hll.add_hashes(pd.util.hash_array(np.array(list(counts), dtype=object)))
+        if self.keep_values:
+            self._update_top(counts)
+
+    def merge(self, other: "ApproxColumnProfile") -> "ApproxColumnProfile":
+        """合并另一累加器（other 对应的数据位于本累加器之后），返回自身"""
+        self._sample = heapq.nlargest(self.config.sample_size, self._sample + other._sample)
+        heapq.heapify(self._sample)
+        self.total += other.total
+        self.missing += other.missing
+        self.hll.merge(other.hll)
+        self._flush()
+        other._flush()
+        self.top_error_bound += other.top_error_bound
+        self._update_top(other.top)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """生成列摘要：样本识别结果按非缺失条数折算，另含不同取值数估计与高频取值"""
+        self._flush()
+        profile = ColumnProfile(keep_values=False)
+        present = [v for _, v in sorted(self._sample, reverse=True) if v.lower() not in _MISSING_MARKERS]
+        if self.vectorized:
+            profile.add_values(present)
+        else:
+            for value in present:
+                profile.add(value)
+        base = profile.summary()
+        non_missing = self.total - self.missing
+        scale = non_missing / len(present) if present else 0.0
+
+        def scaled(counter: Counter) -> Counter:
+            return Counter({key: round(count * scale) for key, count in counter.items()})
+
+        top_exact = self.keep_values and self.top_error_bound == 0
+        # 估计值可能超过非缺失值个数（如主键列），按上界截断；摘要中保留的取值均真实出现，作为下界
+        distinct = len(self.top) if top_exact else max(len(self.top), min(self.hll.estimate(), non_missing))
+        return {
+            **base,
+            "total": self.total,
+            "missing": self.missing,
+            "non_missing": non_missing,
+            "type_counts": scaled(base["type_counts"]),
+            "formats": scaled(base["formats"]),
+            "currency_symbols": scaled(base["currency_symbols"]),
+            "text_counter": Counter(self.top),
+            "text_overflow": 0,
+            "approximate": True,
+            "sample_count": len(present),
+            "distinct_count": distinct,
+            "distinct_exact": top_exact,
+            "distinct_error": self.hll.relative_error,
+            "top_exact": top_exact,
+            "top_error_bound": self.top_error_bound,
+        }
 
 
 def _is_sensitive_field(name: str) -> bool:
@@ -342,30 +876,43 @@ def _sniff_dialect(file_path: str) -> Union[str, csv.Dialect, Type[csv.Dialect]]
         return "excel"
 
 
-def _read_csv(file_path: str) -> Tuple[List[str], List[List[str]]]:
-    """读取 CSV 文件并返回表头与数据行（中文函数级注释）
+def _iter_csv_chunks(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[List[str], List[List[str]]]]:
+    """分块读取 CSV 文件（中文函数级注释）
 
     输入：
     - file_path：CSV 文件路径
+    - chunk_rows：每块的数据行数
 
     输出：
-    - (headers, rows)：表头列表与数据行列表（每行为字符串列表）
+    - 逐块产出 (headers, rows)：表头列表与本块数据行（每行为字符串列表）；
+    - 仅有表头的文件产出一次空块，空文件不产出任何块。
+
+    说明：
+    - 任意时刻只持有一块数据行，读取大文件的内存占用与总行数无关。
     """
     dialect = _sniff_dialect(file_path)
     with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
         reader = csv.reader(f, dialect)
-        rows = list(reader)
-    if not rows:
-        return [], []
-    headers = rows[0]
-    data_rows = rows[1:]
-    return headers, data_rows
+        headers = next(reader, None)
+        if not headers:
+            return
+        chunk: List[List[str]] = []
+        emitted = False
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield headers, chunk
+                emitted = True
+                chunk = []
+        if chunk or not emitted:
+            yield headers, chunk
 
 
 def _generate_markdown(
     file_name: str,
     headers: List[str],
     column_summaries: Dict[str, Dict[str, Any]],
+    approx: Optional[ApproxConfig] = None,
 ) -> str:
     """生成 Markdown 文档内容（中文函数级注释）
 
@@ -382,6 +929,10 @@ def _generate_markdown(
     lines.append("")
     lines.append(f"- 总行数：{total_rows}")
     lines.append(f"- 字段数：{len(headers)}")
+    if approx is not None:
+        lines.append(f"- 近似模式：类型、格式与值域基于每字段至多 {approx.sample_size} 条随机样本估计（次数按比例折算）；"
+                     f"不同取值数为 HyperLogLog 估计；文本取值为高频取值摘要（计数为下界，"
+                     f"低估不超过总行数的 {approx.top_error:.4%}）")
     lines.append("")
 
     for col in headers:
@@ -391,41 +942,67 @@ def _generate_markdown(
         s = column_summaries[col]
         lines.append(f"## 字段：{col}")
         lines.append("")
-        lines.append(f"- 类型：{s['final_type']}")
+        approximate = s.get("approximate", False)
+        about = "约" if approximate else ""
+        if approximate:
+            lines.append(f"- 类型：{s['final_type']}（样本 {s['sample_count']} 条）")
+        else:
+            lines.append(f"- 类型：{s['final_type']}")
         # 格式集合
         if s["formats"]:
-            fmt_list = [f"{fmt}（{cnt}次）" for fmt, cnt in s["formats"].most_common()]
+            fmt_list = [f"{fmt}（{about}{cnt}次）" for fmt, cnt in s["formats"].most_common()]
             lines.append(f"- 格式：{'；'.join(fmt_list)}")
         else:
             lines.append("- 格式：无明显格式特征")
         # 货币符号
         if s["currency_symbols"]:
-            sym_list = [f"{sym}（{cnt}次）" for sym, cnt in s["currency_symbols"].most_common()]
+            sym_list = [f"{sym}（{about}{cnt}次）" for sym, cnt in s["currency_symbols"].most_common()]
             lines.append(f"- 货币符号/单位：{'；'.join(sym_list)}")
         # 缺失值
         miss_pct = (s["missing"] / s["total"] * 100) if s["total"] > 0 else 0.0
         lines.append(f"- 缺失值：{s['missing']}（{miss_pct:.2f}%）")
+        if approximate:
+            if s["distinct_exact"]:
+                lines.append(f"- 不同取值数：{s['distinct_count']}")
+            else:
+                lines.append(f"- 不同取值数：约 {s['distinct_count']}（相对误差约 ±{s['distinct_error']:.1%}）")
         # 范围
+        range_label = "值域范围（样本）" if approximate else "值域范围"
         if s["final_type"] in {"整数", "浮点数", "数值（整数/浮点）", "百分比", "货币"}:
             if s["numeric_min"] is not None and s["numeric_max"] is not None:
-                lines.append(f"- 值域范围：{s['numeric_min']} ~ {s['numeric_max']}")
+                lines.append(f"- {range_label}：{s['numeric_min']} ~ {s['numeric_max']}")
         elif s["final_type"] in {"日期", "日期时间"}:
             if s["date_min"] is not None and s["date_max"] is not None:
                 dt_min = s["date_min"].strftime("%Y-%m-%d %H:%M:%S") if s["has_time"] else s["date_min"].strftime("%Y-%m-%d")
                 dt_max = s["date_max"].strftime("%Y-%m-%d %H:%M:%S") if s["has_time"] else s["date_max"].strftime("%Y-%m-%d")
-                lines.append(f"- 值域范围：{dt_min} ~ {dt_max}")
+                lines.append(f"- {range_label}：{dt_min} ~ {dt_max}")
         else:  # 文本
             if s["text_len_min"] is not None and s["text_len_max"] is not None:
-                lines.append(f"- 文本长度范围：{s['text_len_min']} ~ {s['text_len_max']}")
+                len_label = "文本长度范围（样本）" if approximate else "文本长度范围"
+                lines.append(f"- {len_label}：{s['text_len_min']} ~ {s['text_len_max']}")
 
         # 文本穷举
         if s["final_type"] == "文本":
             if _is_detail_masked_field(col):
                 # 合规：仅屏蔽文本明细，但保留章节与统计信息
                 lines.append("- 隐私字段：已省略具体取值明细。")
+            elif approximate and not s["top_exact"]:
+                bound = s["top_error_bound"]
+                if s["text_counter"]:
+                    lines.append(f"- 高频取值（共 {len(s['text_counter'])} 项，计数为下界，低估不超过 {bound} 条；"
+                                 f"出现超过 {bound} 次的取值均已列出）：")
+                    for val, cnt in sorted(s["text_counter"].items(), key=lambda x: (-x[1], x[0])):
+                        safe_val = val if val != "" else "<空字符串>"
+                        lines.append(f"  - {safe_val}（≥{cnt}）")
+                else:
+                    lines.append(f"- 高频取值：无出现超过 {bound} 次的取值")
             else:
                 unique_count = len(s["text_counter"]) 
-                lines.append(f"- 取值全集（共 {unique_count} 项，含计数）：")
+                if s.get("text_overflow"):
+                    lines.append(f"- 取值明细（不同取值超过 {unique_count} 项，仅列出最先出现的 {unique_count} 项，"
+                                 f"其余 {s['text_overflow']} 条未计入明细，含计数）：")
+                else:
+                    lines.append(f"- 取值全集（共 {unique_count} 项，含计数）：")
                 # 为避免单行过长，按字典序输出：值（计数）
                 for val in sorted(s["text_counter"].items(), key=lambda x: (x[0])):
                     safe_val = val[0] if val[0] != "" else "<空字符串>"
@@ -436,31 +1013,147 @@ def _generate_markdown(
     return "\n".join(lines)
 
 
-def _analyze_csv(file_path: str) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+def _new_profiles(
+    headers: List[str],
+    max_distinct: Optional[int] = None,
+    approx: Optional[ApproxConfig] = None,
+    engine: str = "python",
+    chunk_index: int = 0,
+) -> Dict[str, Any]:
+    """为每个字段创建累加器（同名字段共用一个累加器；文档不输出明细的字段不记录取值）
+
+    近似模式下创建 ApproxColumnProfile，随机种子由 (seed, 块序号, 字段名) 确定，各块抽样相互独立。
+    """
+    profiles: Dict[str, Any] = {}
+    for h in headers:
+        keep_values = not (_is_sensitive_field(h) or _is_detail_masked_field(h))
+        if approx is None:
+            profiles[h] = ColumnProfile(keep_values=keep_values, max_distinct=max_distinct)
+        else:
+            profiles[h] = ApproxColumnProfile(keep_values, approx, seed=f"{approx.seed}:{chunk_index}:{h}",
+                                              vectorized=engine == "vectorized")
+    return profiles
+
+
+def _resolve_engine(engine: str) -> str:
+    """确定实际使用的识别引擎（auto 时按 pandas 是否可用选择）"""
+    if engine not in ENGINES:
+        raise ValueError(f"不支持的识别引擎: {engine}")
+    if engine == "auto":
+        return "vectorized" if _vectorized_available() else "python"
+    return engine
+
+
+def _profile_rows(
+    profiles: Dict[str, Any],
+    headers: List[str],
+    rows: List[List[str]],
+    engine: str = "python",
+) -> None:
+    """累加一块数据（长度不足的行以空串补齐，多出的列忽略）
+
+    - python：按行逐值累加；
+    - vectorized：按列取出整块取值批量累加；同名字段的多列按行优先交错拼接，与逐值累加的顺序一致。
+    """
+    width = len(headers)
+    if engine == "vectorized":
+        rows = [row if len(row) >= width else row + [""] * (width - len(row)) for row in rows]
+        positions: Dict[str, List[int]] = defaultdict(list)
+        for i, h in enumerate(headers):
+            positions[h].append(i)
+        columns = list(zip(*rows)) if rows else [()] * width
+        for h, idxs in positions.items():
+            if len(idxs) == 1:
+                values = columns[idxs[0]]
+            else:
+                values = [row[k] for row in rows for k in idxs]
+            profiles[h].add_values(values)
+        return
+    columns = [profiles[h] for h in headers]
+    for row in rows:
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        for profile, value in zip(columns, row):
+            profile.add(value)
+
+
+def _profile_chunk(
+    headers: List[str],
+    rows: List[List[str]],
+    max_distinct: Optional[int],
+    engine: str = "python",
+    approx: Optional[ApproxConfig] = None,
+    chunk_index: int = 0,
+) -> Dict[str, Any]:
+    """分析一块数据并返回各列累加器（多进程模式下在工作进程中执行）"""
+    profiles = _new_profiles(headers, max_distinct, approx, engine, chunk_index)
+    _profile_rows(profiles, headers, rows, engine)
+    return profiles
+
+
+def _merge_profiles(target: Dict[str, Any], part: Dict[str, Any]) -> Dict[str, Any]:
+    """将一块的累加器按列合并到 target（part 对应的数据位于 target 之后）"""
+    if not target:
+        return part
+    for name, profile in part.items():
+        target[name].merge(profile)
+    return target
+
+
+def _analyze_csv(
+    file_path: str,
+    chunk_rows: Optional[int] = None,
+    max_distinct: Optional[int] = None,
+    workers: int = 1,
+    engine: str = "auto",
+    approx: Optional[ApproxConfig] = None,
+) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
     """对 CSV 文件执行列级分析并返回摘要（中文函数级注释）
 
     输入：
     - file_path：CSV 文件路径
+    - chunk_rows：流式读取的每块行数（默认单进程 50000 行，多进程 10000 行）
+    - max_distinct：文本字段记录的不同取值数上限（默认不限制）
+    - workers：并行进程数（1 为单进程；0 表示使用全部 CPU 核心）
+    - engine：识别引擎（auto / vectorized / python）
+    - approx：近似模式参数（None 为精确模式）
 
     输出：
     - (headers, column_summaries)：表头与每列摘要字典
+
+    说明：
+    - 分块读取并逐块更新各列累加器，不再整表读入与按列转置，内存占用与行数无关；
+    - 多进程模式：主进程读取并分发数据块，各工作进程独立分析（日期/数值识别为主要耗时），
+      主进程按数据顺序合并各块累加器，结果与单进程一致；在途块数不超过进程数的两倍，内存仍与行数无关；
+    - 向量化引擎按列批量识别，每块内每个不同取值只识别一次，结果与逐值识别一致；
+    - 近似模式只对样本做类型识别，不同取值数与高频取值由固定大小的摘要估计，内存有上限。
     """
-    headers, rows = _read_csv(file_path)
+    engine = _resolve_engine(engine)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if chunk_rows is None:
+        chunk_rows = DEFAULT_PARALLEL_CHUNK_ROWS if workers > 1 else DEFAULT_CHUNK_ROWS
+
+    headers: List[str] = []
+    profiles: Dict[str, Any] = {}
+    if workers <= 1:
+        for headers, rows in _iter_csv_chunks(file_path, chunk_rows):
+            if not profiles:
+                profiles = _new_profiles(headers, max_distinct, approx, engine)
+            _profile_rows(profiles, headers, rows, engine)
+    else:
+        pending: deque = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for index, (headers, rows) in enumerate(_iter_csv_chunks(file_path, chunk_rows)):
+                pending.append(pool.submit(_profile_chunk, headers, rows, max_distinct, engine, approx, index))
+                # 限制在途块数，按提交顺序合并
+                while len(pending) >= workers * 2:
+                    profiles = _merge_profiles(profiles, pending.popleft().result())
+            while pending:
+                profiles = _merge_profiles(profiles, pending.popleft().result())
     if not headers:
         return [], {}
-
-    columns: Dict[str, List[str]] = {h: [] for h in headers}
-    for row in rows:
-        # 对齐长度不足的行（填充空串）
-        if len(row) < len(headers):
-            row = row + [""] * (len(headers) - len(row))
-        for i, h in enumerate(headers):
-            columns[h].append(row[i])
-
-    summaries: Dict[str, Dict[str, Any]] = {}
-    for h, vals in columns.items():
-        summaries[h] = _summarize_column(vals)
-    return headers, summaries
+    return headers, {h: p.summary() for h, p in profiles.items()}
 
 
 def write_markdown(output_path: str, content: str) -> None:
@@ -475,12 +1168,25 @@ def write_markdown(output_path: str, content: str) -> None:
         f.write(content)
 
 
-def main(input_path: Optional[str] = None, output_path: Optional[str] = None) -> None:
+def main(
+    input_path: Optional[str] = None,
+    output_path: Optional[str] = None,
+    chunk_rows: Optional[int] = None,
+    max_distinct: Optional[int] = None,
+    workers: int = 1,
+    engine: str = "auto",
+    approx: Optional[ApproxConfig] = None,
+) -> None:
     """主入口：执行 CSV 分析并生成字段说明文档（中文函数级注释）
 
     参数：
     - input_path：输入 CSV 路径，默认使用项目根目录下的车险清单文件；
-    - output_path：输出 Markdown 文档路径，默认写入开发文档目录。
+    - output_path：输出 Markdown 文档路径，默认写入开发文档目录；
+    - chunk_rows：流式读取的每块行数（默认单进程 50000 行，多进程 10000 行）；
+    - max_distinct：文本字段记录的不同取值数上限（默认不限制，穷举全部取值）；
+    - workers：并行进程数（1 为单进程，0 表示使用全部 CPU 核心）；
+    - engine：识别引擎（auto / vectorized / python，默认 auto：可用 pandas 时向量化）；
+    - approx：近似模式参数（默认 None，精确分析）。
 
     行为：
     - 分析每列的数据类型、格式、范围；
@@ -498,21 +1204,81 @@ def main(input_path: Optional[str] = None, output_path: Optional[str] = None) ->
         print(f"[错误] 找不到输入文件：{input_file}")
         return
 
-    headers, summaries = _analyze_csv(input_file)
+    headers, summaries = _analyze_csv(input_file, chunk_rows=chunk_rows, max_distinct=max_distinct, workers=workers,
+                                     engine=engine, approx=approx)
     if not headers:
         print("[警告] CSV 文件为空或无表头，未生成文档。")
         return
 
-    md = _generate_markdown(os.path.basename(input_file), headers, summaries)
+    md = _generate_markdown(os.path.basename(input_file), headers, summaries, approx)
     write_markdown(output_file, md)
     total_rows = next(iter(summaries.values())).get("total", 0) if summaries else 0
     print(f"[完成] 文档已生成：{output_file} ；总行数：{total_rows}，字段数：{len(headers)}")
 
 
+def _parse_args(argv: Optional[List[str]] = None):
+    """解析命令行参数（中文函数级注释）
+
+    用法：python3 scripts/csv_field_profiler.py [input_csv] [output_md] [--chunk-rows N] [--max-distinct N] [--workers N]
+           [--engine auto|vectorized|python]
+           [--approximate [--sample-size N] [--distinct-error E] [--top-error E] [--seed N]]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CSV 字段分析器：生成字段类型、格式与值域的 Markdown 文档")
+    parser.add_argument("input_csv", nargs="?", help="输入 CSV 路径（默认项目根目录车险清单）")
+    parser.add_argument("output_md", nargs="?", help="输出 Markdown 路径（默认写入开发文档目录）")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help=f"流式读取的每块行数（默认单进程 {DEFAULT_CHUNK_ROWS}，多进程 {DEFAULT_PARALLEL_CHUNK_ROWS}）")
+    parser.add_argument("--max-distinct", type=int, default=None,
+                        help="文本字段记录的不同取值数上限（默认不限制，穷举全部取值）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="并行进程数（默认 1；0 表示使用全部 CPU 核心）")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="识别引擎（默认 auto：可用 pandas 时按列向量化识别，否则逐值识别）")
+    approx = parser.add_argument_group("近似模式（大文件快速初查，内存有上限）")
+    approx.add_argument("--approximate", action="store_true",
+                        help="启用近似模式：样本识别类型/格式，HyperLogLog 估计不同取值数，摘要统计高频取值")
+    approx.add_argument("--sample-size", type=int, default=None,
+                        help=f"每字段样本条数（默认 {DEFAULT_SAMPLE_SIZE}）")
+    approx.add_argument("--distinct-error", type=float, default=None,
+                        help=f"不同取值数的目标相对误差（默认 {DEFAULT_DISTINCT_ERROR}）")
+    approx.add_argument("--top-error", type=float, default=None,
+                        help=f"高频取值计数误差上限，占总行数比例（默认 {DEFAULT_TOP_ERROR}）")
+    approx.add_argument("--seed", type=int, default=None, help="随机种子（默认 0）")
+    args = parser.parse_args(argv)
+    if args.chunk_rows is not None and args.chunk_rows < 1:
+        parser.error("--chunk-rows 必须为正整数")
+    if args.max_distinct is not None and args.max_distinct < 1:
+        parser.error("--max-distinct 必须为正整数")
+    if args.workers < 0:
+        parser.error("--workers 不能为负数")
+    if args.engine == "vectorized" and not _vectorized_available():
+        parser.error("--engine vectorized 需要安装 pandas")
+    approx_options = {
+        "sample_size": args.sample_size,
+        "distinct_error": args.distinct_error,
+        "top_error": args.top_error,
+        "seed": args.seed,
+    }
+    given = {k: v for k, v in approx_options.items() if v is not None}
+    args.approx = None
+    if args.approximate:
+        if args.max_distinct is not None:
+            parser.error("--max-distinct 仅用于精确模式，近似模式以 --top-error 控制高频取值摘要大小")
+        if args.sample_size is not None and args.sample_size < 1:
+            parser.error("--sample-size 必须为正整数")
+        for name in ("distinct_error", "top_error"):
+            if name in given and not 0 < given[name] < 1:
+                parser.error(f"--{name.replace('_', '-')} 需在 0~1 之间")
+        args.approx = ApproxConfig(**given)
+    elif given:
+        parser.error("--sample-size/--distinct-error/--top-error/--seed 需与 --approximate 一起使用")
+    return args
+
+
 if __name__ == "__main__":
-    # 支持从命令行传参：python3 scripts/csv_field_profiler.py [input_csv] [output_md]
-    import sys
-    args = sys.argv[1:]
-    inp = args[0] if len(args) >= 1 else None
-    outp = args[1] if len(args) >= 2 else None
-    main(inp, outp)
\ No newline at end of file
+    # 支持从命令行传参：python3 scripts/csv_field_profiler.py [input_csv] [output_md] [选项]
+    args = _parse_args()
+    main(args.input_csv, args.output_md, chunk_rows=args.chunk_rows, max_distinct=args.max_distinct,
+         workers=args.workers, engine=args.engine, approx=args.approx)
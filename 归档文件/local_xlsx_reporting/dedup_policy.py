@@ -1,98 +1,214 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+"""
+按保单号去重：同一保单号保留『出单日期』最晚、签单保费绝对值最大的一条。
+
+设计说明：
+- 支持多个输入文件（xlsx 或 csv），按给定顺序视为一张连续的表；
+- 不对整表排序：每个保单号的保留行通过分组取最大值确定（日期 → |保费| → 行序），
+  与原『按 (日期, |保费|) 排序后 drop_duplicates(keep="last")』的结果一致
+  （日期无法解析的行与排序时一样视为最晚；完全相同时保留靠后的行）；
+- 逐个文件（csv 按块）读取，只保留当前各保单号的胜出行，内存与保单数相关而与输入总行数无关；
+- 出单日期按候选格式逐值识别（backend/date_parsing.py），结果与 csv 分块大小无关；
+- 输出按扩展名或 --format 选择：csv（默认）/ parquet（需 pyarrow 或 fastparquet）/ xlsx（可选）；
+  兼容旧接口 dedup_by_policy 仍固定输出 xlsx。
+
+使用示例：
+python3 local_xlsx_reporting/dedup_policy.py \
+  --input 保批单业务报表-20250301.xlsx 保批单业务报表-20250302.xlsx \
+  --output 去重结果.csv
+"""
+
 import argparse
 import os
 import sys
-from typing import Optional
+from typing import Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
 # 兼容作为脚本直接执行时的导入路径
 try:
     from .generate_daily_report import (
-        standardize_columns,
-        assign_signed_premium,
+        standardize_columns_inplace,
+        assign_signed_premium_inplace,
         pick_best_sheet,
+        parse_dates,
     )
 except ImportError:
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from generate_daily_report import (  # type: ignore
-        standardize_columns,
-        assign_signed_premium,
+        standardize_columns_inplace,
+        assign_signed_premium_inplace,
         pick_best_sheet,
+        parse_dates,
     )
 
 
-def dedup_by_policy(input_path: str, output_path: Optional[str] = None) -> str:
-    xls = pd.ExcelFile(input_path)
-    sheet = pick_best_sheet(xls)
-    df = xls.parse(sheet)
-
-    original_rows = len(df)
-    df = standardize_columns(df)
-
-    # 如果没有保单号列，直接输出原表到新文件
-    if "保单号" not in df.columns:
-        out = (
-            output_path
-            if output_path
-            else os.path.join(
-                os.path.dirname(input_path),
-                os.path.splitext(os.path.basename(input_path))[0] + "_dedup.xlsx",
-            )
-        )
-        with pd.ExcelWriter(out, engine="xlsxwriter") as w:
-            df.to_excel(w, index=False, sheet_name=sheet)
-        print(f"OUTPUT={out}")
-        print(f"ORIGINAL_ROWS={original_rows}")
-        print(f"NEW_ROWS={len(df)}")
-        print("REMOVED_DUPLICATES=0")
-        return out
+# 输出格式（按输出文件扩展名推断，默认 csv）
+OUTPUT_FORMATS = {".csv": "csv", ".parquet": "parquet", ".xlsx": "xlsx"}
 
-    df = assign_signed_premium(df)
+# csv 输入的每块行数
+DEFAULT_CHUNK_ROWS = 200_000
+
+# 辅助列：日期键（无法解析视为最晚）、|保费|、全局行序
+_DT, _ABS, _POS = "_dt", "_abs", "_pos"
+_NAT_LAST = np.iinfo(np.int64).max
 
-    # 排序规则：先按出单日期，后按签单保费绝对值，保留最后一条
-    if "出单日期" in df.columns:
-        df["_dt"] = pd.to_datetime(df["出单日期"], errors="coerce")
-    else:
-        df["_dt"] = pd.NaT
 
-    signed = pd.to_numeric(df.get("签单保费", 0.0), errors="coerce").fillna(0.0)
-    df["_abs"] = signed.abs()
+def _read_frames(path: str, chunk_rows: int) -> Iterator[Tuple[pd.DataFrame, Optional[str]]]:
+    """逐块读取输入文件，产出 (DataFrame, 工作表名)；csv 按块读取，xlsx 自动选择工作表整表读取。"""
+    if os.path.splitext(path)[1].lower() == ".csv":
+        for chunk in pd.read_csv(path, encoding="utf-8-sig", dtype=str, chunksize=chunk_rows):
+            yield chunk, None
+        return
+    xls = pd.ExcelFile(path)
+    sheet = pick_best_sheet(xls)
+    yield xls.parse(sheet), sheet
 
-    df = df.sort_values(["_dt", "_abs"], ascending=[True, True])
-    df_dedup = df.drop_duplicates(subset=["保单号"], keep="last")
 
-    removed = original_rows - len(df_dedup)
-    df_dedup = df_dedup.drop(columns=["_dt", "_abs"], errors="ignore")
+def _with_keys(df: pd.DataFrame, offset: int) -> pd.DataFrame:
+    """补充去重所需的辅助列（日期键、|保费|、全局行序）。"""
+    if "出单日期" in df.columns:
+        # 多格式逐值识别：不按每块首个取值推断格式，结果与分块方式无关
+        dt = parse_dates(df["出单日期"])
+        keys = np.where(dt.isna(), _NAT_LAST, dt.to_numpy(dtype="datetime64[ns]").view(np.int64))
+    else:
+        keys = np.full(len(df), _NAT_LAST, dtype=np.int64)
+    signed = pd.to_numeric(df["签单保费"], errors="coerce")
+    return df.assign(**{
+        _DT: keys,
+        _ABS: signed.fillna(0.0).abs().to_numpy(),
+        _POS: np.arange(offset, offset + len(df), dtype=np.int64),
+    })
+
+
+def select_winners(df: pd.DataFrame) -> pd.DataFrame:
+    """按保单号分组选出保留行（不排序整表）。
+
+    说明：
+    - 依次在每组内取日期键最大、|保费|最大、行序最大的行，等价于按 (日期, |保费|) 稳定排序后保留每组最后一条；
+    - 保单号为空的行视为同一组（与 drop_duplicates 一致）；
+    - 返回的胜出行按 (日期, |保费|, 行序) 排列，与原排序去重的输出顺序一致（只对胜出行排序）。
+    """
+    codes, uniques = pd.factorize(df["保单号"], use_na_sentinel=False)
+    groups = len(uniques)
+    dt = df[_DT].to_numpy()
+    ab = df[_ABS].to_numpy()
+    pos = df[_POS].to_numpy()
+
+    best_dt = np.full(groups, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(best_dt, codes, dt)
+    cand = dt == best_dt[codes]
+    best_abs = np.full(groups, -np.inf)
+    np.maximum.at(best_abs, codes[cand], ab[cand])
+    cand &= ab == best_abs[codes]
+    best_pos = np.full(groups, -1, dtype=np.int64)
+    np.maximum.at(best_pos, codes[cand], pos[cand])
+
+    rows = np.flatnonzero(pos == best_pos[codes])
+    order = np.lexsort((pos[rows], ab[rows], dt[rows]))
+    return df.iloc[rows[order]]
+
+
+def _default_output(input_path: str, fmt: str) -> str:
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(os.path.dirname(input_path), f"{base}_dedup.{fmt}")
+
+
+def write_output(df: pd.DataFrame, output_path: str, fmt: str, sheet: Optional[str] = None) -> None:
+    """按格式写出结果：csv（UTF-8 BOM，分块写入）/ parquet / xlsx（引擎由 pandas 自动选择）。"""
+    if fmt == "csv":
+        df.to_csv(output_path, index=False, encoding="utf-8-sig", chunksize=DEFAULT_CHUNK_ROWS)
+    elif fmt == "parquet":
+        # 混合类型的文本列统一转为字符串，避免列式格式类型推断失败
+        text_cols = {c: "string" for c in df.columns if df[c].dtype == object}
+        try:
+            df.astype(text_cols).to_parquet(output_path, index=False)
+        except ImportError as e:
+            raise RuntimeError(f"写出 parquet 需要安装 pyarrow 或 fastparquet: {e}")
+    else:
+        with pd.ExcelWriter(output_path) as w:
+            df.to_excel(w, index=False, sheet_name=sheet or "去重结果")
+
+
+def dedup_policies(
+    input_paths: Sequence[str],
+    output_path: Optional[str] = None,
+    fmt: Optional[str] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Tuple[str, int, int]:
+    """多文件按保单号去重并写出结果。
+
+    参数：
+    - input_paths: 输入文件（xlsx/csv），按顺序视为连续数据（相同条件下保留靠后的行）
+    - output_path: 输出路径（默认第一个输入文件同目录下『<文件名>_dedup.<格式>』）
+    - fmt: 输出格式 csv/parquet/xlsx（默认按输出扩展名推断，无法推断时为 csv）
+    - chunk_rows: csv 输入的每块行数
+
+    返回：
+    - (输出路径, 原始行数, 去重后行数)
+
+    说明：
+    - 缺少『保单号』列的文件无法去重，其行原样保留并追加在结果之后；
+    - 每读入一块，将其与当前胜出行合并后重新选出胜出行，常驻内存为『保单数 + 一块数据』。
+    """
+    if not input_paths:
+        raise ValueError("至少需要一个输入文件")
+    if fmt is None:
+        ext = os.path.splitext(output_path)[1].lower() if output_path else ""
+        fmt = OUTPUT_FORMATS.get(ext, "csv")
+    out = output_path or _default_output(input_paths[0], fmt)
+
+    winners: Optional[pd.DataFrame] = None
+    passthrough: List[pd.DataFrame] = []
+    first_sheet: Optional[str] = None
+    original_rows = 0
+    for path in input_paths:
+        for frame, sheet in _read_frames(path, chunk_rows):
+            first_sheet = first_sheet or sheet
+            frame = standardize_columns_inplace(frame)
+            if "保单号" not in frame.columns:
+                passthrough.append(frame)
+                original_rows += len(frame)
+                continue
+            frame = _with_keys(assign_signed_premium_inplace(frame), original_rows)
+            original_rows += len(frame)
+            combined = frame if winners is None else pd.concat([winners, frame], ignore_index=True)
+            winners = select_winners(combined)
+
+    parts = [] if winners is None else [winners.drop(columns=[_DT, _ABS, _POS])]
+    result = pd.concat(parts + passthrough, ignore_index=True) if parts or passthrough else pd.DataFrame()
+    write_output(result, out, fmt, first_sheet)
+    return out, original_rows, len(result)
 
-    out = (
-        output_path
-        if output_path
-        else os.path.join(
-            os.path.dirname(input_path),
-            os.path.splitext(os.path.basename(input_path))[0] + "_dedup.xlsx",
-        )
-    )
-    with pd.ExcelWriter(out, engine="xlsxwriter") as w:
-        df_dedup.to_excel(w, index=False, sheet_name=sheet)
 
+def dedup_by_policy(input_path: str, output_path: Optional[str] = None) -> str:
+    """单文件去重（兼容旧接口）：与原实现一致输出 xlsx（默认『<文件名>_dedup.xlsx』）并打印统计。"""
+    out, original_rows, new_rows = dedup_policies([input_path], output_path, fmt="xlsx")
     print(f"OUTPUT={out}")
     print(f"ORIGINAL_ROWS={original_rows}")
-    print(f"NEW_ROWS={len(df_dedup)}")
-    print(f"REMOVED_DUPLICATES={removed}")
+    print(f"NEW_ROWS={new_rows}")
+    print(f"REMOVED_DUPLICATES={original_rows - new_rows}")
     return out
 
 
 def main():
     parser = argparse.ArgumentParser(description="按保单号去重并保存副本")
-    parser.add_argument("--input", required=True, help="输入xlsx文件路径")
-    parser.add_argument("--output", required=False, help="输出xlsx文件路径")
+    parser.add_argument("--input", required=True, nargs="+", help="输入文件路径（xlsx/csv，可多个，按顺序合并）")
+    parser.add_argument("--output", required=False, help="输出文件路径（扩展名决定格式，默认 csv）")
+    parser.add_argument("--format", choices=sorted(set(OUTPUT_FORMATS.values())), help="输出格式（覆盖扩展名推断）")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="csv 输入的每块行数")
     args = parser.parse_args()
 
     try:
-        out = dedup_by_policy(args.input, args.output)
+        out, original_rows, new_rows = dedup_policies(args.input, args.output, args.format, args.chunk_rows)
+        print(f"OUTPUT={out}")
+        print(f"INPUT_FILES={len(args.input)}")
+        print(f"ORIGINAL_ROWS={original_rows}")
+        print(f"NEW_ROWS={new_rows}")
+        print(f"REMOVED_DUPLICATES={original_rows - new_rows}")
         print("STATUS=OK")
     except Exception as e:
         print(f"STATUS=ERROR: {e}")
@@ -100,4 +216,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -15,17 +15,34 @@ python3 local_xlsx_reporting/generate_daily_report.py \
   --start-date 2025-03-08 --end-date 2025-03-25 \
   --output "日报汇总-20250308-20250325.xlsx"
 
-支持 --per-day-files 单独输出每日文件；支持 --dry-run 仅扫描列名与文件。
+支持 --per-day-files 单独输出每日文件；支持 --dry-run 仅扫描列名与文件；
+支持 --workers N 多进程并行读取文件与导出每日文件（0 表示使用全部 CPU 核心）。
+
+内存说明：
+- 读取后的变换按『阶段』组织（*_inplace），由 run_stages 依次在同一个自有DataFrame上原地执行，
+  每个文件只保留一份数据；
+- 同名的非原地函数（standardize_columns 等）保留原语义：先复制再变换，供外部调用方使用。
 """
 
 import argparse
 import os
 import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
-from typing import List, Optional, Dict, Tuple
+from functools import partial
+from typing import Callable, List, Optional, Dict, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+# 日期解析与入库清洗共用仓库 backend/date_parsing.py
+_BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "backend"))
+if _BACKEND_DIR not in sys.path:
+    sys.path.append(_BACKEND_DIR)
+from date_parsing import parse_dates, parse_days  # noqa: E402
+
 
 # =========================
 # 配置与列名映射
@@ -49,6 +66,13 @@ COLUMN_SYNONYMS: Dict[str, List[str]] = {
 }
 
 
+# 变换阶段：接收自有DataFrame，原地修改后返回同一对象
+Stage = Callable[[pd.DataFrame], pd.DataFrame]
+
+# 工作表选择缓存：{绝对路径: ((mtime_ns, 大小), 选中sheet, 该sheet列名)}，文件变更后自动失效
+_SHEET_CHOICE_CACHE: Dict[str, Tuple[Tuple[int, int], str, Optional[List[str]]]] = {}
+
+
 # =========================
 # 工具函数
 # =========================
@@ -87,14 +111,10 @@ def parse_date_from_filename(filename: str) -> Optional[date]:
         return None
 
 
-def pick_best_sheet(xls: pd.ExcelFile) -> str:
-    """选择最可能的数据工作表。
-
-    策略：
-    - 优先选择名称包含『业务』『数据』『报表』的sheet。
-    - 其次选择列数最多的sheet。
-    """
+def _rank_sheets(xls: pd.ExcelFile) -> Tuple[str, Dict[str, List[str]]]:
+    """为各工作表打分并返回 (最佳sheet, 各sheet列名)；列名来自打分时读取的前5行，供调用方复用。"""
     candidates = []
+    columns: Dict[str, List[str]] = {}
     for name in xls.sheet_names:
         low = name.lower()
         score = 0
@@ -103,11 +123,58 @@ def pick_best_sheet(xls: pd.ExcelFile) -> str:
         try:
             df = xls.parse(name, nrows=5)
             score += df.shape[1]
+            columns[name] = list(df.columns)
         except Exception:
             pass
         candidates.append((name, score))
     candidates.sort(key=lambda x: x[1], reverse=True)
-    return candidates[0][0] if candidates else xls.sheet_names[0]
+    return (candidates[0][0] if candidates else xls.sheet_names[0]), columns
+
+
+def pick_best_sheet(xls: pd.ExcelFile) -> str:
+    """选择最可能的数据工作表。
+
+    策略：
+    - 优先选择名称包含『业务』『数据』『报表』的sheet。
+    - 其次选择列数最多的sheet。
+    """
+    return _rank_sheets(xls)[0]
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """文件签名（修改时间纳秒, 大小），读取失败返回 None（不缓存）。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def select_sheet(path: str, xls: Optional[pd.ExcelFile] = None) -> Tuple[str, Optional[List[str]]]:
+    """选择文件的数据工作表，返回 (sheet名, 该sheet列名)。
+
+    说明：
+    - 结果按文件签名缓存，同一进程内重复读取同一文件（dry-run 后读取、看板重新加载等）不再逐表试读；
+    - 列名取自打分时已读取的前5行，无法读取时为 None。
+    """
+    key = os.path.abspath(path)
+    sig = _file_signature(path)
+    hit = _SHEET_CHOICE_CACHE.get(key)
+    if sig is not None and hit is not None and hit[0] == sig:
+        return hit[1], hit[2]
+    if xls is None:
+        xls = pd.ExcelFile(path)
+    sheet, columns = _rank_sheets(xls)
+    if sig is not None:
+        _SHEET_CHOICE_CACHE[key] = (sig, sheet, columns.get(sheet))
+    return sheet, columns.get(sheet)
+
+
+def _resolve_workers(workers: int, tasks: int) -> int:
+    """并行进程数：0 表示使用全部 CPU 核心，且不超过任务数。"""
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, tasks))
 
 
 def find_excel_files(input_dir: str) -> List[str]:
@@ -152,21 +219,28 @@ def _match_column(columns: List[str], synonyms: List[str]) -> Optional[str]:
     return None
 
 
-def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """将DataFrame列统一映射为标准字段名。
+def standardize_columns_inplace(df: pd.DataFrame) -> pd.DataFrame:
+    """将DataFrame列统一映射为标准字段名（原地重命名，不复制数据）。
 
-    返回：新DataFrame，包含尽可能多的标准列；保留原列以便溯源。
+    返回：传入的同一DataFrame，包含尽可能多的标准列。
     """
-    df2 = df.copy()
     col_map = {}
-    cols = list(df2.columns)
+    cols = list(df.columns)
     for std_name, syns in COLUMN_SYNONYMS.items():
         m = _match_column(cols, syns)
         if m:
             col_map[m] = std_name
     if col_map:
-        df2.rename(columns=col_map, inplace=True)
-    return df2
+        df.rename(columns=col_map, inplace=True)
+    return df
+
+
+def standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """将DataFrame列统一映射为标准字段名。
+
+    返回：新DataFrame，包含尽可能多的标准列；保留原列以便溯源。
+    """
+    return standardize_columns_inplace(df.copy())
 
 
 def to_numeric_safe(series: pd.Series) -> pd.Series:
@@ -175,50 +249,53 @@ def to_numeric_safe(series: pd.Series) -> pd.Series:
     return pd.to_numeric(series, errors="coerce").fillna(0.0)
 
 
-def classify_risk(df: pd.DataFrame) -> pd.DataFrame:
-    """根据『险种名称』粗略分类为『交强险』『商业险』『未知险种』。
+def classify_risk_inplace(df: pd.DataFrame) -> pd.DataFrame:
+    """根据『险种名称』粗略分类为『交强险』『商业险』『未知险种』（原地新增『险种类别』列）。
 
     规则：
     - 含『交强』视为交强险
     - 含『商业』视为商业险
     - 其他为未知险种
     """
-    df2 = df.copy()
-    if "险种名称" in df2.columns:
-        low = df2["险种名称"].astype(str).str.lower()
-        df2["险种类别"] = pd.Series("未知险种", index=df2.index)
-        df2.loc[low.str.contains("交强"), "险种类别"] = "交强险"
-        df2.loc[low.str.contains("商业"), "险种类别"] = "商业险"
+    if "险种名称" in df.columns:
+        low = df["险种名称"].astype(str).str.lower()
+        df["险种类别"] = pd.Series("未知险种", index=df.index)
+        df.loc[low.str.contains("交强"), "险种类别"] = "交强险"
+        df.loc[low.str.contains("商业"), "险种类别"] = "商业险"
     else:
-        df2["险种类别"] = "未知险种"
-    return df2
+        df["险种类别"] = "未知险种"
+    return df
 
 
-def assign_signed_premium(df: pd.DataFrame) -> pd.DataFrame:
-    """生成签单保费（带符号），批单退保/作废为负，批增/加费为正，其余按原值。
+def classify_risk(df: pd.DataFrame) -> pd.DataFrame:
+    """根据『险种名称』粗略分类，返回新DataFrame（规则见 classify_risk_inplace）。"""
+    return classify_risk_inplace(df.copy())
+
+
+def assign_signed_premium_inplace(df: pd.DataFrame) -> pd.DataFrame:
+    """生成签单保费（带符号），批单退保/作废为负，批增/加费为正，其余按原值（原地新增『签单保费』列）。
 
     说明：
     - 基础保费列优先使用『承保保费』，若不存在则尝试『保费』『实收保费』等同义列。
     - 批单类型含『退』『注销』『作废』 -> 负；含『批增』『加费』『调整增加』 -> 正。
     - 无批单类型时，业务类型为『保单』按正值处理。
     """
-    df2 = df.copy()
     base_col = None
     for c in ["承保保费", "保费", "保费金额", "实收保费", "保费合计"]:
-        if c in df2.columns:
+        if c in df.columns:
             base_col = c
             break
     if base_col is None:
         # 若完全找不到保费列，创建为0
-        df2["签单保费"] = 0.0
-        return df2
+        df["签单保费"] = 0.0
+        return df
 
-    premium = to_numeric_safe(df2[base_col])
-    signed = premium.copy()
+    premium = to_numeric_safe(df[base_col])
+    signed = premium
 
     # 优先依据批单类型
-    if "批单类型" in df2.columns:
-        t = df2["批单类型"].astype(str)
+    if "批单类型" in df.columns:
+        t = df["批单类型"].astype(str)
         neg_mask = t.str.contains("退|注销|作废|撤销|退保")
         pos_mask = t.str.contains("批增|加费|增加|调整增加|上调")
         signed = premium
@@ -226,43 +303,60 @@ def assign_signed_premium(df: pd.DataFrame) -> pd.DataFrame:
         signed = signed.where(~pos_mask, premium.abs())
 
     # 其次依据业务类型
-    elif "业务类型" in df2.columns:
-        bt = df2["业务类型"].astype(str)
+    elif "业务类型" in df.columns:
+        bt = df["业务类型"].astype(str)
         is_policy = bt.str.contains("保单")
         is_endorse = bt.str.contains("批")
         signed = premium.where(is_policy, premium)
         signed = signed.where(~is_endorse, premium)  # 无批单类型，批单默认按原值
 
-    df2["签单保费"] = signed.fillna(0.0)
-    return df2
+    df["签单保费"] = signed.fillna(0.0)
+    return df
 
 
-def tag_report_date(df: pd.DataFrame, file_date: Optional[date]) -> pd.DataFrame:
-    """打上『报告日期』，优先使用『出单日期』，否则使用文件名日期。
+def assign_signed_premium(df: pd.DataFrame) -> pd.DataFrame:
+    """生成签单保费（带符号），返回新DataFrame（规则见 assign_signed_premium_inplace）。"""
+    return assign_signed_premium_inplace(df.copy())
+
+
+def tag_report_date_inplace(df: pd.DataFrame, file_date: Optional[date]) -> pd.DataFrame:
+    """打上『报告日期』（原地新增列），优先使用『出单日期』，否则使用文件名日期。
 
     日期格式统一为日期型（YYYY-MM-DD）。
     """
-    df2 = df.copy()
-    if "出单日期" in df2.columns:
-        # 尝试多格式解析
-        def parse_dt(x):
-            if pd.isna(x):
-                return None
-            try:
-                return pd.to_datetime(x).date()
-            except Exception:
-                for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%m/%d/%Y"):
-                    try:
-                        return datetime.strptime(str(x), fmt).date()
-                    except Exception:
-                        continue
-                return None
-
-        dates = df2["出单日期"].apply(parse_dt)
-        df2["报告日期"] = dates.fillna(file_date if file_date else pd.NaT)
+    if "出单日期" in df.columns:
+        # 多格式整列解析（按候选格式逐轮向量化解析，其余交给通用解析兜底；超出范围的占位日期逐值识别）
+        dates = parse_days(df["出单日期"])
+        df["报告日期"] = dates.fillna(file_date if file_date else pd.NaT)
     else:
-        df2["报告日期"] = file_date
-    return df2
+        df["报告日期"] = file_date
+    return df
+
+
+def tag_report_date(df: pd.DataFrame, file_date: Optional[date]) -> pd.DataFrame:
+    """打上『报告日期』，返回新DataFrame（规则见 tag_report_date_inplace）。"""
+    return tag_report_date_inplace(df.copy(), file_date)
+
+
+def load_stages(file_date: Optional[date]) -> List[Stage]:
+    """单个文件读取后的变换阶段：标准化列名 → 险种分类 → 签单保费 → 报告日期。"""
+    return [
+        standardize_columns_inplace,
+        classify_risk_inplace,
+        assign_signed_premium_inplace,
+        partial(tag_report_date_inplace, file_date=file_date),
+    ]
+
+
+def run_stages(df: pd.DataFrame, stages: Sequence[Stage]) -> pd.DataFrame:
+    """依次执行原地变换阶段并返回结果。
+
+    说明：各阶段直接修改传入对象，调用方需保证 df 为自身持有（不与缓存等其他引用共享），
+    否则请先自行 copy()。
+    """
+    for stage in stages:
+        df = stage(df)
+    return df
 
 
 def load_one_file(path: str) -> Tuple[pd.DataFrame, Optional[date]]:
@@ -272,25 +366,43 @@ def load_one_file(path: str) -> Tuple[pd.DataFrame, Optional[date]]:
     fdate = parse_date_from_filename(fname)
     try:
         xls = pd.ExcelFile(path)
-        sheet = pick_best_sheet(xls)
+        sheet, _ = select_sheet(path, xls)
         df = xls.parse(sheet, dtype=str)
     except Exception as e:
         raise RuntimeError(f"读取Excel失败: {path}, 错误: {e}")
 
-    df = standardize_columns(df)
-    df = classify_risk(df)
-    df = assign_signed_premium(df)
-    df = tag_report_date(df, fdate)
+    # 解析结果由本函数独占，变换阶段直接在其上原地执行
+    df = run_stages(df, load_stages(fdate))
     return df, fdate
 
 
+def load_files(paths: Sequence[str], workers: int = 1) -> List[pd.DataFrame]:
+    """读取多个文件，按输入顺序返回各文件的DataFrame。
+
+    说明：workers > 1 时多进程并行读取（Excel解析为主要耗时，受GIL限制需多进程）；0 表示使用全部 CPU 核心。
+    """
+    workers = _resolve_workers(workers, len(paths))
+    if workers <= 1:
+        return [load_one_file(p)[0] for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [df for df, _ in pool.map(load_one_file, paths)]
+
+
+def _report_dates(df: pd.DataFrame) -> pd.Series:
+    """将『报告日期』列转换为日期对象序列（不修改原DataFrame）。"""
+    return pd.to_datetime(df["报告日期"]).dt.date
+
+
 def filter_by_date_range(df: pd.DataFrame, start: date, end: date) -> pd.DataFrame:
     """按闭区间[start, end]过滤『报告日期』。
+
+    说明：不复制整表，仅取出区间内的行（结果为新对象，『报告日期』已转换为日期型），原DataFrame不被修改。
     """
-    d = df.copy()
-    d["报告日期"] = pd.to_datetime(d["报告日期"]).dt.date
-    mask = (d["报告日期"] >= start) & (d["报告日期"] <= end)
-    return d.loc[mask]
+    dates = _report_dates(df)
+    mask = ((dates >= start) & (dates <= end)).to_numpy()
+    out = df.take(np.flatnonzero(mask))
+    out["报告日期"] = dates.to_numpy()[mask]
+    return out
 
 
 def compute_daily_metrics(df: pd.DataFrame) -> pd.DataFrame:
@@ -309,8 +421,9 @@ def compute_daily_metrics(df: pd.DataFrame) -> pd.DataFrame:
             "交强保费", "商业保费"
         ])
 
-    d = df.copy()
-    d["报告日期"] = pd.to_datetime(d["报告日期"]).dt.date
+    # 仅按转换后的日期序列分组，不复制整表
+    d = df
+    report_dates = _report_dates(d)
 
     # 件数统计
     is_policy = d["业务类型"].astype(str).str.contains("保单") if "业务类型" in d.columns else pd.Series(False, index=d.index)
@@ -324,7 +437,7 @@ def compute_daily_metrics(df: pd.DataFrame) -> pd.DataFrame:
     comp_mask = risk.str.contains("商业")
     mtpl_mask = risk.str.contains("交强")
 
-    grp = d.groupby("报告日期")
+    grp = d.groupby(report_dates)
     out = pd.DataFrame({
         "原保件数": grp.apply(lambda g: is_policy.loc[g.index].sum()),
         "批单件数": grp.apply(lambda g: is_endorse.loc[g.index].sum()),
@@ -350,15 +463,15 @@ def aggregate_dimensions(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         empty = pd.DataFrame(columns=["日期", "维度", "件数", "保费"])
         return {"机构": empty.copy(), "渠道": empty.copy(), "险种": empty.copy()}
 
-    d = df.copy()
-    d["报告日期"] = pd.to_datetime(d["报告日期"]).dt.date
+    d = df
+    report_dates = _report_dates(d)
     premium_signed = to_numeric_safe(d["签单保费"]) if "签单保费" in d.columns else pd.Series(0.0, index=d.index)
 
     def agg_by(col: str, title: str) -> pd.DataFrame:
         dim_col = col if col in d.columns else None
         if dim_col is None:
             return pd.DataFrame(columns=["日期", "维度", "件数", "保费"])
-        g = d.groupby(["报告日期", dim_col])
+        g = d.groupby([report_dates, d[dim_col]])
         res = pd.DataFrame({
             "件数": g.size(),
             "保费": g.apply(lambda g_: premium_signed.loc[g_.index].sum()),
@@ -394,18 +507,39 @@ def export_report(
         dims.get("险种", pd.DataFrame()).sort_values(["日期", "维度"]).to_excel(writer, sheet_name="险种", index=False)
 
 
-def export_per_day_files(df: pd.DataFrame, output_dir: str) -> None:
+def _write_day_file(fname: str, day_df: pd.DataFrame) -> None:
+    """写出单日明细文件。"""
+    with pd.ExcelWriter(fname, engine="openpyxl") as writer:
+        day_df.to_excel(writer, sheet_name="明细", index=False)
+
+
+def export_per_day_files(df: pd.DataFrame, output_dir: str, workers: int = 1) -> None:
     """为每一天单独导出一个Excel明细文件，便于日常流转与复核。
 
     文件命名：『日报明细-YYYYMMDD.xlsx』。
+    workers > 1 时多进程并行写出，在途的日数据不超过进程数的两倍。
     """
     ensure_dir(output_dir)
-    df2 = df.copy()
-    df2["报告日期"] = pd.to_datetime(df2["报告日期"]).dt.date
-    for rdate, g in df2.groupby("报告日期"):
-        fname = os.path.join(output_dir, f"日报明细-{rdate.strftime('%Y%m%d')}.xlsx")
-        with pd.ExcelWriter(fname, engine="openpyxl") as writer:
-            g.to_excel(writer, sheet_name="明细", index=False)
+    report_dates = _report_dates(df)
+    # 分组结果本身是副本，仅替换该组的日期列
+    days = (
+        (os.path.join(output_dir, f"日报明细-{rdate.strftime('%Y%m%d')}.xlsx"),
+         g.assign(报告日期=report_dates.loc[g.index]))
+        for rdate, g in df.groupby(report_dates)
+    )
+    workers = _resolve_workers(workers, report_dates.nunique())
+    if workers <= 1:
+        for fname, day_df in days:
+            _write_day_file(fname, day_df)
+        return
+    pending: deque = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for fname, day_df in days:
+            pending.append(pool.submit(_write_day_file, fname, day_df))
+            while len(pending) >= workers * 2:
+                pending.popleft().result()
+        while pending:
+            pending.popleft().result()
 
 
 def dry_run(input_dir: str, start: Optional[date], end: Optional[date]) -> None:
@@ -421,13 +555,13 @@ def dry_run(input_dir: str, start: Optional[date], end: Optional[date]) -> None:
         fdate = parse_date_from_filename(fname)
         print(f"- {fname} (日期: {fdate})")
         try:
-            xls = pd.ExcelFile(p)
-            sheet = pick_best_sheet(xls)
-            df = xls.parse(sheet, nrows=5, dtype=str)
-            df_std = standardize_columns(df)
-            merged_cols = sorted(set(df.columns) | set(df_std.columns))
+            # 复用选择工作表时已读取的列名，不再重复解析选中的sheet
+            sheet, columns = select_sheet(p)
+            if columns is None:
+                columns = list(pd.read_excel(p, sheet_name=sheet, nrows=5, dtype=str).columns)
+            df_std = standardize_columns_inplace(pd.DataFrame(columns=columns))
             print(f"  选中Sheet: {sheet}")
-            print(f"  原始列: {list(df.columns)}")
+            print(f"  原始列: {columns}")
             print(f"  标准化后含标准列: {[c for c in df_std.columns if c in COLUMN_SYNONYMS]}")
         except Exception as e:
             print(f"  读取失败: {e}")
@@ -435,26 +569,35 @@ def dry_run(input_dir: str, start: Optional[date], end: Optional[date]) -> None:
         print(f"日期范围: {start} 至 {end}")
 
 
-def run_pipeline(input_dir: str, start: date, end: date, output_path: str, per_day_dir: Optional[str] = None) -> None:
+def run_pipeline(
+    input_dir: str,
+    start: date,
+    end: date,
+    output_path: str,
+    per_day_dir: Optional[str] = None,
+    workers: int = 1,
+) -> None:
     """完整管道：读取全部文件、按日期过滤、计算指标、导出报表与每日文件（可选）。
+
+    workers > 1 时文件读取与每日文件导出使用多进程并行；0 表示使用全部 CPU 核心。
     """
     files = find_excel_files(input_dir)
     if not files:
         raise RuntimeError("未发现任何目标xlsx文件，请检查目录与命名。")
 
-    frames = []
-    for p in files:
-        df, fdate = load_one_file(p)
-        frames.append(df)
+    frames = load_files(files, workers)
     all_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    # 合并后即释放各文件的分片，过滤后释放合并表，常驻内存约为一份数据
+    frames.clear()
     rng_df = filter_by_date_range(all_df, start, end)
+    del all_df
 
     daily = compute_daily_metrics(rng_df)
     dims = aggregate_dimensions(rng_df)
     export_report(daily, dims, output_path)
 
     if per_day_dir:
-        export_per_day_files(rng_df, per_day_dir)
+        export_per_day_files(rng_df, per_day_dir, workers)
 
 
 def parse_args() -> argparse.Namespace:
@@ -466,7 +609,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--output", required=False, default="日报汇总.xlsx", help="输出汇总Excel文件路径")
     parser.add_argument("--per-day-files", required=False, help="每日明细输出目录（可选）")
     parser.add_argument("--dry-run", action="store_true", help="仅扫描文件与列名，不导出")
-    return parser.parse_args()
+    parser.add_argument("--workers", type=int, default=1,
+                        help="并行进程数，用于读取文件与导出每日文件（默认 1；0 表示使用全部 CPU 核心）")
+    args = parser.parse_args()
+    if args.workers < 0:
+        parser.error("--workers 不能为负数")
+    return args
 
 
 def main():
@@ -489,6 +637,7 @@ def main():
         end=end,
         output_path=args.output,
         per_day_dir=args.per_day_files,
+        workers=args.workers,
     )
     print(f"已完成：{args.output}")
 
@@ -14,18 +14,27 @@ python3 web_dashboard/app.py
 
 环境变量：
 - REPORT_INPUT_DIR：可选，指定xlsx输入目录；未提供时使用默认工作目录。
+- REPORT_FILE_CACHE_MB：单文件解析结果缓存的内存上限（MB），默认 512。
+- REPORT_RANGE_CACHE_MB：日期区间数据（合并并过滤后）缓存的内存上限（MB），默认 256；0 表示不缓存。
+- REPORT_AGG_CACHE_ENTRIES：接口聚合结果缓存的条目数上限，默认 256；0 表示不缓存。
+
+缓存说明：
+- 两级缓存均按 DataFrame 实际占用字节数（含文本对象）限制总量，超出时淘汰最久未使用的条目；
+- 区间缓存以（起止日期, 所涉文件及其签名）为键，文件变更后自动失效，重复查询同一区间时跳过合并与过滤；
+- 聚合结果缓存以（接口, 起止日期, 文件签名）为键，与区间缓存同步失效，条目数有上限（LRU）；
+- 缓存中的 DataFrame 为多个请求共享，接口只读不改（需要派生列时在局部变量上计算）。
 """
 
 import os
 import sys
+import threading
+from collections import OrderedDict
 from datetime import datetime, date
 from typing import Dict, List, Optional, Tuple
 
 from flask import Flask, jsonify, request, render_template
 from flask_cors import CORS
 import pandas as pd
-import os
-from typing import Tuple
 
 # 为了复用已实现的读取与聚合逻辑，将工作根目录加入Python路径
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -48,10 +57,126 @@ except Exception as e:
 app = Flask(__name__, template_folder="templates", static_folder="static")
 CORS(app)
 
-# 内存缓存：按文件与结果集加速
-PER_FILE_CACHE: Dict[str, pd.DataFrame] = {}
-PER_FILE_META: Dict[str, Tuple[float, int]] = {}
-AGG_CACHE: Dict[Tuple[str, str, str], object] = {}
+
+def _cache_budget(name: str, default_mb: int) -> int:
+    """读取缓存内存上限（环境变量，单位MB），返回字节数。"""
+    try:
+        mb = float(os.environ.get(name, default_mb))
+    except ValueError:
+        mb = default_mb
+    return max(0, int(mb * 1024 * 1024))
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrame 实际占用字节数（deep=True 计入文本对象本身）。"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class FrameCache:
+    """按占用字节数限制总量的 LRU DataFrame 缓存（线程安全）。
+
+    说明：
+    - 条目可附带签名（如文件修改时间与大小），读取时签名不一致视为未命中；
+    - 单个条目超过上限时不缓存，避免挤掉其余全部条目。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[object, Tuple[object, pd.DataFrame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, sig=None) -> Optional[pd.DataFrame]:
+        """读取缓存并标记为最近使用；未命中或签名不一致时返回 None。"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != sig:
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, df: pd.DataFrame, sig=None) -> None:
+        """写入缓存（替换同键旧条目），并按最久未使用顺序淘汰至上限以内。"""
+        size = frame_nbytes(df)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if size > self.max_bytes:
+                return
+            self._items[key] = (sig, df, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class ResultCache:
+    """条目数有上限的 LRU 结果缓存（线程安全），保存接口序列化后的聚合结果。
+
+    说明：键为 None 表示不可缓存（读取恒未命中，写入忽略）。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[object, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """读取缓存并标记为最近使用；未命中返回 None。"""
+        if key is None:
+            return None
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        """写入缓存，超出条目上限时淘汰最久未使用的条目。"""
+        if key is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，无效时使用默认值。"""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# 内存缓存：单文件解析结果、日期区间数据、聚合结果
+PER_FILE_CACHE = FrameCache(_cache_budget("REPORT_FILE_CACHE_MB", 512))
+RANGE_CACHE = FrameCache(_cache_budget("REPORT_RANGE_CACHE_MB", 256))
+AGG_CACHE = ResultCache(_env_int("REPORT_AGG_CACHE_ENTRIES", 256))
+
+# 区间引用：(起始日期, 截止日期, ((文件路径, 文件签名), ...))
+RangeRef = Tuple[date, date, Tuple[Tuple[str, Optional[Tuple[float, int]]], ...]]
 
 
 def get_input_dir() -> str:
@@ -104,40 +229,75 @@ def list_files_in_range(input_dir: str, start: date, end: date) -> List[str]:
     return selected
 
 
-def load_file_cached(path: str) -> pd.DataFrame:
+def file_signature(path: str) -> Optional[Tuple[float, int]]:
+    """文件签名（修改时间, 大小）；无法读取时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+def load_file_cached(path: str, sig: Optional[Tuple[float, int]] = None) -> pd.DataFrame:
     """
     读取单个xlsx文件并进行缓存：
     - 以文件的修改时间与大小作为签名；若未变更则复用缓存的DataFrame。
-    - 显著减少重复请求时的解析时间。
+    - 显著减少重复请求时的解析时间；缓存总量受 REPORT_FILE_CACHE_MB 限制。
     """
-    try:
-        st = os.stat(path)
-        sig = (st.st_mtime, st.st_size)
-    except Exception:
-        sig = None
-    if sig and (path in PER_FILE_META) and (PER_FILE_META[path] == sig) and (path in PER_FILE_CACHE):
-        return PER_FILE_CACHE[path]
+    if sig is None:
+        sig = file_signature(path)
+    if sig is not None:
+        df = PER_FILE_CACHE.get(path, sig)
+        if df is not None:
+            return df
     df, _ = load_one_file(path)
-    PER_FILE_META[path] = sig
-    PER_FILE_CACHE[path] = df
+    if sig is not None:
+        PER_FILE_CACHE.put(path, df, sig)
     return df
 
 
-def build_dataframe(start_date: str, end_date: str):
+def resolve_range(start_date: str, end_date: str) -> RangeRef:
+    """解析日期区间（YYYY-MM-DD），返回区间引用：起止日期与区间内文件及其当前签名。"""
+    input_dir = get_input_dir()
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    files = tuple((p, file_signature(p)) for p in list_files_in_range(input_dir, start, end))
+    return start, end, files
+
+
+def _cacheable(rng: RangeRef) -> bool:
+    """区间内所有文件均能读取签名时才可缓存（否则无法判断文件是否变更）。"""
+    return all(sig is not None for _, sig in rng[2])
+
+
+def agg_key(name: str, rng: RangeRef):
+    """聚合结果缓存键：（接口, 起止日期, 文件签名）；不可缓存时返回 None。"""
+    return (name, *rng) if _cacheable(rng) else None
+
+
+def build_dataframe(start_date: str, end_date: str, rng: Optional[RangeRef] = None):
     """
     构建并返回指定日期范围内的标准化DataFrame。
     仅加载文件名日期位于区间内的xlsx，并进行内存缓存。
-    参数格式：YYYY-MM-DD
+    参数格式：YYYY-MM-DD；rng 为调用方已解析的区间引用（可选，避免重复扫描目录）。
+
+    说明：合并并过滤后的结果按（区间, 文件签名）缓存，返回对象可能被多个请求共享，调用方不得修改。
     """
-    input_dir = get_input_dir()
-    start = datetime.strptime(start_date, "%Y-%m-%d").date()
-    end = datetime.strptime(end_date, "%Y-%m-%d").date()
-    selected = list_files_in_range(input_dir, start, end)
-    if not selected:
+    if rng is None:
+        rng = resolve_range(start_date, end_date)
+    start, end, files = rng
+    if not files:
         return pd.DataFrame()
-    frames = [load_file_cached(p) for p in selected]
+    cacheable = _cacheable(rng)
+    if cacheable:
+        cached = RANGE_CACHE.get(rng)
+        if cached is not None:
+            return cached
+    frames = [load_file_cached(p, sig) for p, sig in files]
     all_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     rng_df = filter_by_date_range(all_df, start, end)
+    if cacheable:
+        RANGE_CACHE.put(rng, rng_df)
     return rng_df
 
 
@@ -167,16 +327,18 @@ def api_daily():
     end_str = request.args.get("end")
     if not start_str or not end_str:
         return jsonify({"error": "缺少start或end参数，格式YYYY-MM-DD"}), 400
-    # 结果缓存命中直接返回
-    key = ("daily", start_str, end_str)
-    if key in AGG_CACHE:
-        return jsonify(AGG_CACHE[key])
-    df = build_dataframe(start_str, end_str)
+    # 结果缓存命中直接返回（键含文件签名，文件变更后自动失效）
+    rng = resolve_range(start_str, end_str)
+    key = agg_key("daily", rng)
+    cached = AGG_CACHE.get(key)
+    if cached is not None:
+        return jsonify(cached)
+    df = build_dataframe(start_str, end_str, rng)
     if df is None or df.empty:
         return jsonify([])
-    daily = compute_daily_metrics(df)
-    AGG_CACHE[key] = serialize_df(daily)
-    return jsonify(AGG_CACHE[key])
+    out = serialize_df(compute_daily_metrics(df))
+    AGG_CACHE.put(key, out)
+    return jsonify(out)
 
 
 @app.route("/api/dim")
@@ -187,11 +349,13 @@ def api_dim():
     end_str = request.args.get("end")
     if not start_str or not end_str:
         return jsonify({"error": "缺少start或end参数，格式YYYY-MM-DD"}), 400
-    # 结果缓存命中直接返回
-    key_cache = (f"dim:{dim_type}", start_str, end_str)
-    if key_cache in AGG_CACHE:
-        return jsonify(AGG_CACHE[key_cache])
-    df = build_dataframe(start_str, end_str)
+    # 结果缓存命中直接返回（键含文件签名，文件变更后自动失效）
+    rng = resolve_range(start_str, end_str)
+    key_cache = agg_key(f"dim:{dim_type}", rng)
+    cached = AGG_CACHE.get(key_cache)
+    if cached is not None:
+        return jsonify(cached)
+    df = build_dataframe(start_str, end_str, rng)
     if df is None or df.empty:
         return jsonify([])
     dims = aggregate_dimensions(df)
@@ -206,13 +370,13 @@ def api_dim():
             out_sorted["保费"] = pd.to_numeric(out_sorted["保费"], errors="coerce").fillna(0)
             out_sorted = out_sorted.sort_values(["日期", "保费"], ascending=[True, False])
             out_records = serialize_df(out_sorted)
-            AGG_CACHE[key_cache] = out_records
+            AGG_CACHE.put(key_cache, out_records)
             return jsonify(out_records)
         except Exception:
             out_records = serialize_df(out)
-            AGG_CACHE[key_cache] = out_records
+            AGG_CACHE.put(key_cache, out_records)
             return jsonify(out_records)
-    AGG_CACHE[key_cache] = []
+    AGG_CACHE.put(key_cache, [])
     return jsonify([])
 
 
@@ -227,21 +391,24 @@ def api_kpi():
     end = request.args.get("end")
     if not start or not end:
         return jsonify({"error": "缺少start或end参数，格式YYYY-MM-DD"}), 400
-    # 缓存命中
-    key = ("kpi", start, end)
-    if key in AGG_CACHE:
-        return jsonify(AGG_CACHE[key])
-    df = build_dataframe(start, end)
+    # 缓存命中（键含文件签名，文件变更后自动失效）
+    rng = resolve_range(start, end)
+    key = agg_key("kpi", rng)
+    cached = AGG_CACHE.get(key)
+    if cached is not None:
+        return jsonify(cached)
+    df = build_dataframe(start, end, rng)
     if df is None or df.empty:
-        AGG_CACHE[key] = {}
-        return jsonify(AGG_CACHE[key])
+        AGG_CACHE.put(key, {})
+        return jsonify({})
 
-    # 数值列安全转换
+    # 数值列安全转换（区间数据为缓存共享对象，只在局部变量上计算）
+    nums: Dict[str, pd.Series] = {}
     for col in ["签单保费", "原保保费", "批单保费净额"]:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+            nums[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
         else:
-            df[col] = 0
+            nums[col] = pd.Series(0, index=df.index)
 
     # 件数标记
     is_policy = df.get("是否原保", pd.Series(False, index=df.index))
@@ -250,17 +417,16 @@ def api_kpi():
     endorse_cnt = int(pd.to_numeric(is_endorse, errors="coerce").fillna(0).sum())
     total_cnt = int(len(df))
 
-    net_premium = float(df["签单保费"].sum())
-    orig_premium = float(df["原保保费"].sum())
-    endorse_net = float(df["批单保费净额"].sum())
+    net_premium = float(nums["签单保费"].sum())
+    orig_premium = float(nums["原保保费"].sum())
+    endorse_net = float(nums["批单保费净额"].sum())
 
     # 险种拆分
     risk_col = df.get("险种名称")
     if risk_col is None:
-        df["险种名称"] = "未知"
-        risk_col = df["险种名称"]
-    mtpl_premium = float(df.loc[risk_col == "交强险", "签单保费"].sum())
-    comm_premium = float(df.loc[risk_col == "商业险", "签单保费"].sum())
+        risk_col = pd.Series("未知", index=df.index)
+    mtpl_premium = float(nums["签单保费"][risk_col == "交强险"].sum())
+    comm_premium = float(nums["签单保费"][risk_col == "商业险"].sum())
 
     comm_ratio = float(comm_premium / net_premium) if net_premium else 0.0
     mtpl_ratio = float(mtpl_premium / net_premium) if net_premium else 0.0
@@ -277,7 +443,7 @@ def api_kpi():
         "商业占比": comm_ratio,
         "交强占比": mtpl_ratio
     }
-    AGG_CACHE[key] = out
+    AGG_CACHE.put(key, out)
     return jsonify(out)
 
 
@@ -337,24 +503,28 @@ def api_monthly():
     end = request.args.get("end")
     if not start or not end:
         return jsonify({"error": "缺少start或end参数，格式YYYY-MM-DD"}), 400
-    key = ("monthly", start, end)
-    if key in AGG_CACHE:
-        return jsonify(AGG_CACHE[key])
-    df = build_dataframe(start, end)
+    rng = resolve_range(start, end)
+    key = agg_key("monthly", rng)
+    cached = AGG_CACHE.get(key)
+    if cached is not None:
+        return jsonify(cached)
+    df = build_dataframe(start, end, rng)
     if df is None or df.empty:
-        AGG_CACHE[key] = []
-        return jsonify(AGG_CACHE[key])
+        AGG_CACHE.put(key, [])
+        return jsonify([])
 
-    # 数值列与月份列
-    df["签单保费"] = pd.to_numeric(df.get("签单保费"), errors="coerce").fillna(0)
+    # 数值列与月份列（区间数据为缓存共享对象，在局部表上计算）
     date_col = pd.to_datetime(df.get("报告日期"), errors="coerce")
-    df["月份"] = date_col.dt.to_period("M").astype(str)
+    work = pd.DataFrame({
+        "月份": date_col.dt.to_period("M").astype(str),
+        "签单保费": pd.to_numeric(df.get("签单保费"), errors="coerce").fillna(0),
+    })
 
     monthly = (
-        df.groupby("月份", as_index=False)["签单保费"].sum().sort_values("月份")
+        work.groupby("月份", as_index=False)["签单保费"].sum().sort_values("月份")
     )
     out = serialize_df(monthly)
-    AGG_CACHE[key] = out
+    AGG_CACHE.put(key, out)
     return jsonify(out)
 
 